@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Декларативные правила оповещения, компилируемые в быстрый матчер
+
+Файл правил (JSON):
+
+    {
+      "rules": [
+        {"name": "крупная", "min_amount": 15000, "require_event_and_time": true},
+        {"name": "баскетбол", "min_amount": 5000, "max_amount": 15000,
+         "event_pattern": "basket|баскет"},
+        {"name": "серия", "min_amount": 1000, "window_seconds": 300, "min_count": 5,
+         "region": "desk1"}
+      ]
+    }
+
+Поля правила (все, кроме name, необязательны):
+- min_amount / max_amount — сумма строго больше min_amount и не больше max_amount;
+- event_pattern — регулярное выражение по тексту события (без учёта регистра);
+- require_event_and_time — у строки должны быть распознаны событие и время;
+- region — правило действует только для этой области;
+- window_seconds + min_count — правило срабатывает, когда за последние
+  window_seconds набралось не меньше min_count подходящих строк.
+
+При компиляции границы сумм сортируются, и для каждого интервала между
+соседними границами заранее считается битовая маска подходящих правил
+(поиск — bisect), регулярные выражения объединяются в одну альтернативу
+для быстрого отсева, а счётчики окон обновляются инкрементально. В альтернативу
+попадают только шаблоны без групп, которые компилируются внутри (?:...): шаблон
+с флагом в начале ("(?s)...") или с обратной ссылкой ("(a)\\1") в объединении
+сломался бы или поменял смысл, поэтому проверяется отдельно.
+"""
+
+import json
+import re
+import time
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from row_store import DEFAULT_REGION
+
+
+class AlertRule:
+    """Одно правило оповещения (описание из файла правил)"""
+
+    def __init__(self, name: str,
+                 min_amount: Optional[float] = None,
+                 max_amount: Optional[float] = None,
+                 event_pattern: Optional[str] = None,
+                 require_event_and_time: bool = False,
+                 region: Optional[str] = None,
+                 window_seconds: Optional[float] = None,
+                 min_count: int = 1):
+        if window_seconds is not None and window_seconds <= 0:
+            raise ValueError(f"Правило '{name}': window_seconds должно быть больше 0")
+        if min_amount is not None and max_amount is not None and max_amount <= min_amount:
+            raise ValueError(f"Правило '{name}': max_amount должно быть больше min_amount")
+        self.name = name
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        try:
+            self.event_pattern = re.compile(event_pattern, re.IGNORECASE) if event_pattern else None
+        except re.error as e:
+            raise ValueError(f"Правило '{name}': неверный event_pattern: {e}") from None
+        self.require_event_and_time = require_event_and_time
+        self.region = region
+        self.window_seconds = window_seconds
+        self.min_count = max(1, int(min_count))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AlertRule":
+        known = {"name", "min_amount", "max_amount", "event_pattern", "require_event_and_time",
+                 "region", "window_seconds", "min_count"}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Неизвестные поля правила {data.get('name', '?')}: {', '.join(sorted(unknown))}")
+        if "name" not in data:
+            raise ValueError(f"У правила нет имени: {data}")
+        return cls(**data)
+
+
+class RuleEngine:
+    """
+    Скомпилированный набор правил.
+
+    Вызов engine(row) -> bool совместим с WatchRegion.alert_rule;
+    engine.evaluate(row) возвращает имена сработавших правил.
+    """
+
+    def __init__(self, rules: List[AlertRule]):
+        names = [rule.name for rule in rules]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Имена правил должны быть уникальными: {names}")
+        self.rules = rules
+        self._all = (1 << len(rules)) - 1
+
+        # Границы сумм и маски правил для каждого интервала.
+        # Интервал i — суммы в (bounds[i-1], bounds[i]]; bisect_left даёт его номер.
+        bounds = sorted({b for rule in rules for b in (rule.min_amount, rule.max_amount) if b is not None})
+        self._bounds = bounds
+        self._amount_masks = []
+        for i in range(len(bounds) + 1):
+            low = bounds[i - 1] if i > 0 else None
+            high = bounds[i] if i < len(bounds) else None
+            mask = 0
+            for bit, rule in enumerate(rules):
+                if rule.min_amount is not None and (low is None or low < rule.min_amount):
+                    continue
+                if rule.max_amount is not None and (high is None or high > rule.max_amount):
+                    continue
+                mask |= 1 << bit
+            self._amount_masks.append(mask)
+
+        self._region_masks: Dict[str, int] = {}
+        self._any_region_mask = 0
+        self._pattern_mask = 0
+        self._event_time_mask = 0
+        self._window_mask = 0
+        for bit, rule in enumerate(rules):
+            if rule.region is None:
+                self._any_region_mask |= 1 << bit
+            else:
+                self._region_masks[rule.region] = self._region_masks.get(rule.region, 0) | 1 << bit
+            if rule.event_pattern is not None:
+                self._pattern_mask |= 1 << bit
+            if rule.require_event_and_time:
+                self._event_time_mask |= 1 << bit
+            if rule.window_seconds is not None or rule.min_count > 1:
+                self._window_mask |= 1 << bit
+
+        # Объединяемые регулярные выражения — одна альтернатива: если она не нашла
+        # ничего, ни одно из этих правил не подходит, и их шаблоны не проверяются
+        self._combined_mask = 0
+        patterns = []
+        for bit, rule in enumerate(rules):
+            wrapped = _combinable(rule.event_pattern)
+            if wrapped is not None:
+                self._combined_mask |= 1 << bit
+                patterns.append(wrapped)
+        try:
+            self._combined = re.compile("|".join(patterns), re.IGNORECASE) if patterns else None
+        except re.error:
+            self._combined, self._combined_mask = None, 0
+
+        self._windows: Dict[int, deque] = {bit: deque() for bit, rule in enumerate(rules)
+                                           if self._window_mask >> bit & 1}
+
+    def _candidates(self, row: Dict) -> int:
+        mask = self._amount_masks[bisect_left(self._bounds, row["amount"])]
+        mask &= self._any_region_mask | self._region_masks.get(row.get("region", DEFAULT_REGION), 0)
+        if mask & self._event_time_mask and not (row["event"].strip() and row["time"].strip()):
+            mask &= ~self._event_time_mask
+        if mask & self._combined_mask and not self._combined.search(row["event"]):
+            mask &= ~self._combined_mask
+        for bit in _bits(mask & self._pattern_mask):
+            if not self.rules[bit].event_pattern.search(row["event"]):
+                mask &= ~(1 << bit)
+        return mask
+
+    def evaluate(self, row: Dict, now: Optional[float] = None) -> List[str]:
+        """
+        Проверить строку по всем правилам и обновить счётчики окон.
+
+        Returns:
+            Имена сработавших правил (пустой список — оповещение не нужно)
+        """
+        mask = self._candidates(row)
+        if not mask:
+            return []
+        fired = []
+        if mask & self._window_mask:
+            if now is None:
+                now = row.get("captured_at", time.time())
+            for bit in _bits(mask & self._window_mask):
+                rule = self.rules[bit]
+                window = self._windows[bit]
+                window.append(now)
+                if rule.window_seconds is not None:
+                    while window and window[0] <= now - rule.window_seconds:
+                        window.popleft()
+                if len(window) >= rule.min_count:
+                    fired.append(bit)
+                    window.clear()  # следующее срабатывание — после новой серии
+        fired.extend(_bits(mask & ~self._window_mask))
+        return [self.rules[bit].name for bit in sorted(fired)]
+
+    def __call__(self, row: Dict) -> bool:
+        return bool(self.evaluate(row))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+def _combinable(pattern: Optional["re.Pattern"]) -> Optional[str]:
+    """Шаблон в виде (?:...) для общей альтернативы или None, если его туда нельзя"""
+    if pattern is None or pattern.groups or pattern.flags & ~(re.IGNORECASE | re.UNICODE):
+        return None
+    wrapped = f"(?:{pattern.pattern})"
+    try:
+        re.compile(wrapped, re.IGNORECASE)
+    except re.error:
+        return None
+    return wrapped
+
+
+def _bits(mask: int):
+    """Номера установленных битов маски"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def compile_rules(rules: List[Union[AlertRule, Dict]]) -> RuleEngine:
+    """Скомпилировать список правил (объекты или словари)"""
+    return RuleEngine([r if isinstance(r, AlertRule) else AlertRule.from_dict(r) for r in rules])
+
+
+def load_rules(path: Union[str, Path]) -> RuleEngine:
+    """Загрузить и скомпилировать файл правил ({"rules": [...]} или просто массив)"""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get("rules", [])
+    if not isinstance(data, list):
+        raise ValueError(f"Файл правил {path} должен содержать массив правил")
+    engine = compile_rules(data)
+    print(f"Загружено {len(engine)} правил оповещения из {path}.")
+    return engine
+
+
+def threshold_engine(min_amount: float, require_event_and_time: bool = True) -> RuleEngine:
+    """Одно правило «сумма больше порога» — поведение наблюдателя по умолчанию"""
+    return compile_rules([{
+        "name": f"сумма > {min_amount:g}",
+        "min_amount": min_amount,
+        "require_event_and_time": require_event_and_time,
+    }])
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Асинхронный фасад над MouseAutomation для сервисов на asyncio
+
+Синхронный MouseAutomation блокирует цикл событий: паузы внутри кликов,
+subprocess.run для cliclick, requests.post к OCR.space с таймаутом 60 c
+и паузы между повторами. AsyncMouseAutomation делает то же самое, не блокируя цикл:
+
+- ожидания (плавное перемещение, интервалы между кликами, пауза после действия,
+  ожидание стабильного экрана, паузы между повторами) — asyncio.sleep;
+- cliclick (запасной вариант на macOS) — asyncio.create_subprocess_exec;
+- OCR.space — aiohttp;
+- снимок экрана, кодирование PNG, поиск по шаблону и tesseract — в пулах потоков.
+
+Действия с мышью и снимки экрана выполняются по одному в отдельном потоке
+(экран один), а распознавание — параллельно, так что один цикл событий
+может вести много сканирований одновременно.
+
+Пример:
+    async with AsyncMouseAutomation() as auto:
+        before = await auto.capture()
+        await auto.click(500, 300)
+        await auto.wait_for_stable(before=before)
+        results = await asyncio.gather(*(auto.screenshot_and_ocr(region=r, ocr_method="tesseract")
+                                         for r in regions))
+"""
+
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from automation import (CHANGE_TIMEOUT, OCRSPACE_TIMEOUT, OCRSPACE_URL, OCRSPACE_URL_ENV, MouseAutomation,
+                        _ocrspace_fields, _reduced_frame, _same_frame)
+
+# Шаг плавного перемещения курсора, в секундах (около 50 событий в секунду)
+MOVE_STEP = 0.02
+
+
+class AsyncMouseAutomation:
+    """Асинхронная автоматизация мыши, скриншотов и OCR"""
+
+    def __init__(self, auto: Optional[MouseAutomation] = None,
+                 ocr_workers: Optional[int] = None,
+                 executor: Optional[Executor] = None,
+                 pause: float = 0.1):
+        """
+        Args:
+            auto: Синхронный MouseAutomation (по умолчанию создаётся без пауз pyautogui —
+                  паузы делает сам фасад через asyncio.sleep)
+            ocr_workers: Размер пула для tesseract, PNG и поиска по шаблону (по умолчанию — по числу CPU)
+            executor: Свой пул для этой работы вместо создаваемого
+            pause: Пауза после каждого действия с мышью (как pyautogui.PAUSE), в секундах
+        """
+        self.sync = auto or MouseAutomation(pause=0)
+        self.pause = pause
+        # Все обращения к pyautogui — из одного потока и строго по очереди
+        self._ui = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ui")
+        self._ui_lock: Optional[asyncio.Lock] = None
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=ocr_workers or os.cpu_count() or 1,
+                                                        thread_name_prefix="ocr")
+        self._session = None
+
+    async def __aenter__(self) -> "AsyncMouseAutomation":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Закрыть HTTP-сессию и пулы потоков"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._ui.shutdown(wait=False)
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    # --- запуск блокирующей работы ---
+
+    async def _in_ui(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._ui, partial(func, *args, **kwargs))
+
+    async def _in_pool(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    @property
+    def ui_lock(self) -> asyncio.Lock:
+        """
+        Блокировка для последовательности действий (клик → ожидание → снимок),
+        которую не должны перемежать действия других задач
+        """
+        if self._ui_lock is None:
+            self._ui_lock = asyncio.Lock()
+        return self._ui_lock
+
+    async def _cliclick(self, *commands: str) -> None:
+        """Запасной вариант на macOS: cliclick без блокировки цикла событий"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "cliclick", *commands, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except FileNotFoundError:
+            raise Exception("cliclick не установлен. Установите: brew install cliclick")
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=5)
+        except asyncio.TimeoutError:
+            process.kill()
+            raise Exception("cliclick не ответил за 5 c")
+        if process.returncode != 0:
+            raise Exception(f"cliclick завершился с кодом {process.returncode}: {stderr.decode(errors='replace')}")
+
+    # --- мышь ---
+
+    @property
+    def screen_size(self) -> Tuple[int, int]:
+        return self.sync.screen_size
+
+    async def get_cursor_position(self) -> Tuple[int, int]:
+        """Текущая позиция курсора"""
+        pos = await self._in_ui(lambda: self.sync._gui.position())
+        return int(pos[0]), int(pos[1])
+
+    def _gui_call(self, name: str, *args, **kwargs):
+        # Под той же блокировкой, что у MouseAutomation: фоновое движение (keep_alive) не вклинится
+        with self.sync.input_lock:
+            return getattr(self.sync._gui, name)(*args, **kwargs)
+
+    async def _move_to(self, x: int, y: int) -> None:
+        try:
+            await self._in_ui(self._gui_call, 'moveTo', x, y, duration=0)
+        except Exception:
+            if not self.sync.is_macos:
+                raise
+            await self._cliclick(f"m:{x},{y}")
+
+    async def move_cursor(self, x: int, y: int, duration: float = 0.5) -> None:
+        """
+        Переместить курсор; при duration > 0 — плавно, шагами с asyncio.sleep между ними
+
+        Args:
+            x: Координата X
+            y: Координата Y
+            duration: Время перемещения в секундах (0 = мгновенно)
+        """
+        steps = int(duration / MOVE_STEP)
+        if steps > 1:
+            start_x, start_y = await self.get_cursor_position()
+            started = time.monotonic()
+            for n in range(1, steps):
+                t = n / steps
+                # Сглаживание как у pyautogui.easeInOutQuad
+                k = 2 * t * t if t < 0.5 else -1 + (4 - 2 * t) * t
+                await self._move_to(round(start_x + (x - start_x) * k), round(start_y + (y - start_y) * k))
+                await asyncio.sleep(max(0.0, started + n * duration / steps - time.monotonic()))
+        await self._move_to(x, y)
+        if self.pause:
+            await asyncio.sleep(self.pause)
+
+    async def click(self, x: Optional[int] = None, y: Optional[int] = None,
+                    button: str = 'left', clicks: int = 1, interval: float = 0.1) -> None:
+        """
+        Клик по координатам (или по текущей позиции); интервал между кликами — asyncio.sleep
+
+        Args:
+            x: Координата X (если None, клик по текущей позиции)
+            y: Координата Y (если None, клик по текущей позиции)
+            button: Кнопка мыши ('left', 'right', 'middle')
+            clicks: Количество кликов
+            interval: Интервал между кликами (в секундах)
+        """
+        if x is None or y is None:
+            x, y = await self.get_cursor_position()
+        for n in range(clicks):
+            if n:
+                await asyncio.sleep(interval)
+            try:
+                await self._in_ui(self._gui_call, 'click', x, y, button=button, clicks=1)
+            except Exception:
+                if not self.sync.is_macos:
+                    raise
+                click_type = {'left': 'c', 'right': 'rc', 'middle': 'mc'}.get(button, 'c')
+                await self._cliclick(f"{click_type}:{x},{y}")
+        if self.pause:
+            await asyncio.sleep(self.pause)
+
+    async def double_click(self, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        await self.click(x, y, clicks=2)
+
+    async def right_click(self, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        await self.click(x, y, button='right')
+
+    # --- экран ---
+
+    async def capture(self, region: Optional[Tuple[int, int, int, int]] = None):
+        """Скриншот в памяти (PIL.Image); снимает поток интерфейса"""
+        return await self._in_ui(self.sync.capture, region)
+
+    async def save_image(self, image, filename: Optional[str] = None) -> str:
+        """Сохранить изображение в папку скриншотов (кодирование PNG — в пуле)"""
+        return await self._in_pool(self.sync.save_image, image, filename)
+
+    async def screenshot(self, filename: Optional[str] = None,
+                         region: Optional[Tuple[int, int, int, int]] = None) -> str:
+        """Сделать скриншот и сохранить его; Returns: путь к файлу"""
+        return await self.save_image(await self.capture(region), filename)
+
+    async def wait_for_stable(self, region: Optional[Tuple[int, int, int, int]] = None,
+                              timeout: float = 2.0,
+                              interval: float = 0.05,
+                              stable_frames: int = 2,
+                              scale: int = 8,
+                              tolerance: float = 1.0,
+                              before=None,
+                              change_timeout: float = CHANGE_TIMEOUT) -> bool:
+        """
+        Дождаться, пока экран перестанет меняться (см. MouseAutomation.wait_for_stable:
+        с `before` — сначала отличия от снимка до действия, потом покоя);
+        между снимками цикл событий свободен
+
+        Returns:
+            True, если экран успокоился; False, если истек timeout
+        """
+        def frame():
+            return _reduced_frame(self.sync.capture(region), scale)
+
+        deadline = time.monotonic() + timeout
+        previous = None
+        if before is not None:
+            reference = _reduced_frame(before, scale)
+            change_deadline = min(deadline, time.monotonic() + change_timeout)
+            while True:
+                previous = await self._in_ui(frame)
+                remaining = change_deadline - time.monotonic()
+                if not _same_frame(previous, reference, tolerance) or remaining <= 0:
+                    break
+                await asyncio.sleep(min(interval, remaining))
+        matches = 0
+        while True:
+            current = await self._in_ui(frame)
+            if previous is not None:
+                matches = matches + 1 if _same_frame(current, previous, tolerance) else 0
+                if matches >= stable_frames:
+                    return True
+            previous = current
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"⚠️  Экран не перестал меняться за {timeout} c")
+                return False
+            await asyncio.sleep(min(interval, remaining))
+
+    async def locate(self, template, region: Optional[Tuple[int, int, int, int]] = None,
+                     threshold: Optional[float] = None,
+                     name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Найти элемент по шаблону (см. MouseAutomation.locate); поиск — в пуле"""
+        offset = (region[0], region[1]) if region else (0, 0)
+        image = await self.capture(region)
+        return await self._in_pool(self.sync.locator.locate, image, template, name, offset, threshold)
+
+    async def locate_all(self, templates: Dict[str, Any],
+                         region: Optional[Tuple[int, int, int, int]] = None,
+                         threshold: Optional[float] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Найти несколько шаблонов по одному скриншоту; поиск — в пуле"""
+        offset = (region[0], region[1]) if region else (0, 0)
+        image = await self.capture(region)
+        return await self._in_pool(self.sync.locator.locate_all, image, templates, offset, threshold)
+
+    # --- OCR ---
+
+    async def recognize(self, image_path: str,
+                        ocr_method: str = 'ocrspace',
+                        ocr_api_key: Optional[str] = None) -> str:
+        """
+        Распознать текст из файла (OCR.space — через aiohttp, tesseract — в пуле)
+
+        Args:
+            image_path: Путь к файлу изображения
+            ocr_method: Метод OCR ('ocrspace', 'tesseract' или 'hedged')
+            ocr_api_key: API ключ для OCR.space (опционально)
+
+        Returns:
+            Распознанный текст
+        """
+        if ocr_method == 'ocrspace':
+            return await self._ocr_ocrspace(image_path, ocr_api_key)
+        if ocr_method == 'tesseract':
+            return await self._in_pool(self.sync._ocr_tesseract, image_path)
+        if ocr_method == 'hedged':
+            # Движки HedgedOCR работают в своих потоках; здесь только ожидание результата
+            return await self._in_pool(self.sync.recognize, image_path, ocr_method, ocr_api_key)
+        raise ValueError(f"Неизвестный метод OCR: {ocr_method}")
+
+    async def _http(self):
+        if self._session is None:
+            try:
+                # Импорт aiohttp занимает ~0,1–0,2 c — делаем его не в цикле событий
+                aiohttp = await asyncio.to_thread(importlib.import_module, "aiohttp")
+            except ImportError:
+                raise ImportError("Для асинхронного OCR.space нужен aiohttp. Установите: pip install aiohttp")
+            if self._session is None:  # пока шёл импорт, сессию могла создать другая задача
+                self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=OCRSPACE_TIMEOUT))
+        return self._session
+
+    async def _ocr_ocrspace(self, image_path: str, api_key: Optional[str] = None, max_retries: int = 3) -> str:
+        """OCR.space без блокировки цикла событий; повторы — как у MouseAutomation._ocr_ocrspace"""
+        session = await self._http()
+        import aiohttp
+
+        url = os.getenv(OCRSPACE_URL_ENV) or OCRSPACE_URL
+        content = await asyncio.to_thread(Path(image_path).read_bytes)
+        if len(content) > 1024 * 1024:
+            print(f"⚠️  Внимание: размер файла {len(content) / 1024 / 1024:.2f}MB, может быть слишком большим")
+
+        for attempt in range(max_retries):
+            if attempt > 0:
+                await asyncio.sleep(2 * attempt)  # Экспоненциальная задержка
+            form = aiohttp.FormData()
+            for key, value in _ocrspace_fields(api_key).items():
+                form.add_field(key, str(value))
+            form.add_field('file', content, filename=Path(image_path).name)
+            try:
+                async with session.post(url, data=form) as response:
+                    response.raise_for_status()
+                    result = await response.json(content_type=None)
+            except asyncio.TimeoutError:
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception("Таймаут соединения с OCR.space API. Попробуйте позже или используйте Tesseract (локальный OCR)")
+            except aiohttp.ClientError as e:
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception(f"Ошибка соединения с OCR.space API: {e}")
+
+            if result.get('OCRExitCode') == 1:
+                parsed_results = result.get('ParsedResults', [])
+                return parsed_results[0].get('ParsedText', '').strip() if parsed_results else ''
+            error_message = result.get('ErrorMessage', 'Неизвестная ошибка OCR')
+            if attempt == max_retries - 1:
+                raise Exception(f"OCR.space ошибка: {error_message}")
+
+    async def screenshot_and_ocr(self, filename: Optional[str] = None,
+                                 region: Optional[Tuple[int, int, int, int]] = None,
+                                 ocr_method: str = 'ocrspace',
+                                 ocr_api_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Сделать скриншот и распознать текст (без вывода текста в консоль)
+
+        Returns:
+            Словарь {'screenshot_path': str, 'text': str, 'success': bool, 'error': str}
+        """
+        screenshot_path = await self.screenshot(filename, region)
+        result = {'screenshot_path': screenshot_path, 'text': '', 'success': False, 'error': None}
+        try:
+            result['text'] = await self.recognize(screenshot_path, ocr_method, ocr_api_key)
+            result['success'] = True
+        except Exception as e:
+            result['error'] = str(e)
+        return result
@@ -4,22 +4,128 @@
 Функции для движения курсора, кликов и создания скриншотов
 """
 
-import pyautogui
+import functools
+import os
+import threading
 import time
-import requests
-import base64
-import subprocess
 import platform
-import sys
 from typing import Tuple, Optional, Dict, Any
 from pathlib import Path
-from PIL import Image
+
+# Тяжёлые зависимости (pyautogui, requests, PIL, subprocess) импортируются при первом
+# использовании: импорт модуля и создание MouseAutomation не должны стоить сотни миллисекунд.
+
+# Адрес OCR.space; переменная окружения OCRSPACE_URL задаёт другой (например, локальную заглушку)
+OCRSPACE_URL = "https://api.ocr.space/parse/image"
+OCRSPACE_URL_ENV = "OCRSPACE_URL"
+# Таймаут запроса к OCR.space, в секундах
+OCRSPACE_TIMEOUT = 60
+# Таймаут одного запуска tesseract, в секундах (раньше его не было вовсе)
+TESSERACT_TIMEOUT = 60
+# Сколько wait_for_stable(before=...) ждёт, что экран вообще отреагирует на действие, в секундах
+CHANGE_TIMEOUT = 0.5
+
+
+def _reduced_frame(image, scale: int):
+    """Снимок для сравнения: оттенки серого, уменьшенный в scale раз"""
+    frame = image.convert('L')
+    return frame.reduce(scale) if scale > 1 else frame
+
+
+def _same_frame(a, b, tolerance: float) -> bool:
+    """Совпадают ли снимки с точностью до средней разницы яркости tolerance"""
+    from PIL import ImageChops, ImageStat
+
+    if a.size != b.size:
+        return False
+    if tolerance <= 0:
+        return a.tobytes() == b.tobytes()
+    return ImageStat.Stat(ImageChops.difference(a, b)).mean[0] <= tolerance
+
+
+def _ocrspace_fields(api_key: Optional[str] = None) -> Dict[str, Any]:
+    """Поля формы запроса к OCR.space (общие для MouseAutomation и AsyncMouseAutomation)"""
+    return {
+        'apikey': api_key or 'helloworld',  # Бесплатный ключ по умолчанию
+        'language': 'rus',  # Русский язык
+        'isOverlayRequired': False,
+        'detectOrientation': True,
+        'OCREngine': 2,  # Используем более точный движок для русского
+    }
+
+
+def tesseract_text(image, lang: Optional[str] = None, timeout: float = TESSERACT_TIMEOUT) -> str:
+    """
+    Распознать текст через Tesseract OCR (без MouseAutomation: подходит для пакетной
+    обработки файлов, см. bulk_ocr)
+
+    Args:
+        image: Путь к изображению или PIL.Image
+        lang: Язык tesseract. Если не задан — русский, при его отсутствии английский
+              и затем язык по умолчанию
+        timeout: Предел одного запуска tesseract, в секундах (0 — без предела)
+
+    Returns:
+        Распознанный текст
+    """
+    try:
+        import pytesseract
+        from PIL import Image
+    except ImportError:
+        raise ImportError(
+            "pytesseract не установлен. Установите: pip install pytesseract\n"
+            "Также установите Tesseract OCR: brew install tesseract (macOS)"
+        )
+
+    try:
+        if not isinstance(image, Image.Image):
+            image = Image.open(image)
+        if lang:
+            return pytesseract.image_to_string(image, lang=lang, timeout=timeout).strip()
+        # Пробуем сначала русский язык
+        try:
+            text = pytesseract.image_to_string(image, lang='rus', timeout=timeout)
+            return text.strip()
+        except Exception as rus_error:
+            if 'timeout' in str(rus_error).lower():
+                raise
+            # Если русский язык не установлен, пробуем английский
+            print("⚠️  Русский языковой пакет не найден, использую английский")
+            print("💡 Для установки русского языка: brew install tesseract-lang")
+            try:
+                text = pytesseract.image_to_string(image, lang='eng', timeout=timeout)
+                return text.strip()
+            except Exception as eng_error:
+                # Если и английский не работает, пробуем без указания языка
+                print("⚠️  Пробую без указания языка...")
+                text = pytesseract.image_to_string(image, timeout=timeout)
+                return text.strip()
+    except Exception as e:
+        error_msg = str(e)
+        if 'rus.traineddata' in error_msg or 'Failed loading language' in error_msg:
+            raise Exception(
+                f"Русский языковой пакет не установлен.\n"
+                f"Установите: brew install tesseract-lang\n"
+                f"Или используйте OCR.space (он поддерживает русский без установки): ocr_method='ocrspace'\n"
+                f"Ошибка: {e}"
+            )
+        raise Exception(f"Ошибка Tesseract OCR: {e}")
+
+
+def _exclusive(method):
+    """Выполнять действие под input_lock, чтобы оно не перемешалось с другими (см. keep_alive)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.input_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class MouseAutomation:
     """Класс для автоматизации работы с мышью и скриншотами"""
     
-    def __init__(self, fail_safe: bool = True, pause: float = 0.1, use_applescript: bool = None):
+    def __init__(self, fail_safe: bool = True, pause: float = 0.1, use_applescript: bool = None,
+                 archive=None):
         """
         Инициализация автоматизации
         
@@ -27,10 +133,13 @@ class MouseAutomation:
             fail_safe: Если True, перемещение мыши в угол экрана прервет выполнение
             pause: Пауза между действиями (в секундах)
             use_applescript: Использовать AppleScript для macOS (True/False/None=автоопределение)
+            archive: Архив скриншотов (screen_archive.ScreenArchive). Если задан, save_image()
+                     и screenshot() сохраняют в него, а не в ~/Desktop/screen-scan
         """
-        pyautogui.FAILSAFE = fail_safe
-        pyautogui.PAUSE = pause
-        self.screen_size = pyautogui.size()
+        self.fail_safe = fail_safe
+        self.pause = pause
+        self._gui_module = None
+        self._screen_size = None
         self.is_macos = platform.system() == 'Darwin'
         
         # Для macOS по умолчанию используем pyautogui, но с fallback на cliclick
@@ -40,13 +149,42 @@ class MouseAutomation:
         else:
             self.use_applescript = use_applescript and self.is_macos
         
-        print(f"Размер экрана: {self.screen_size}")
-        if self.is_macos:
-            print(f"Система: macOS")
-            print(f"Метод управления мышью: {'cliclick (fallback)' if self.use_applescript else 'pyautogui (с fallback на cliclick)'}")
-        
-        # Проверяем разрешения
-        self._check_permissions()
+        self._locator = None
+        self.archive = archive
+        # Общая блокировка действий с мышью: фоновое движение (keep_alive)
+        # не вклинивается в клик, а последовательность действий можно взять целиком:
+        #     with auto.input_lock: before = auto.capture(r); auto.click(...); auto.wait_for_stable(r, before=before)
+        self.input_lock = threading.RLock()
+        self._hedged = None
+        self._hedged_lock = threading.Lock()
+    
+    @property
+    def _gui(self):
+        """
+        Модуль pyautogui, импортируется и настраивается при первом обращении
+        (вместе с выводом размера экрана и проверкой разрешений)
+        """
+        if self._gui_module is None:
+            import pyautogui
+            pyautogui.FAILSAFE = self.fail_safe
+            pyautogui.PAUSE = self.pause
+            self._gui_module = pyautogui
+            
+            print(f"Размер экрана: {self.screen_size}")
+            if self.is_macos:
+                print(f"Система: macOS")
+                print(f"Метод управления мышью: {'cliclick (fallback)' if self.use_applescript else 'pyautogui (с fallback на cliclick)'}")
+            
+            # Проверяем разрешения
+            self._check_permissions()
+        return self._gui_module
+    
+    @property
+    def screen_size(self) -> Tuple[int, int]:
+        """Размер экрана (запрашивается один раз, при первом обращении)"""
+        if self._screen_size is None:
+            self._screen_size = self._gui.size()
+        return self._screen_size
     
     def _check_permissions(self) -> None:
         """Проверка разрешений для macOS"""
@@ -60,12 +198,13 @@ class MouseAutomation:
         """Перемещение курсора через AppleScript (для macOS)"""
         # Сначала пробуем pyautogui (может работать если есть разрешения)
         try:
-            pyautogui.moveTo(x, y, duration=0)
+            self._gui.moveTo(x, y, duration=0)
             return
         except Exception:
             pass
         
         # Если pyautogui не работает, пробуем cliclick (если установлен)
+        import subprocess
         try:
             subprocess.run(['cliclick', f'm:{x},{y}'], 
                          check=True, capture_output=True, timeout=5)
@@ -80,6 +219,7 @@ class MouseAutomation:
                 "  Системные настройки → Конфиденциальность и безопасность → Управление компьютером"
             )
     
+    @_exclusive
     def move_cursor(self, x: int, y: int, duration: float = 0.5) -> None:
         """
         Переместить курсор мыши в указанные координаты
@@ -93,7 +233,7 @@ class MouseAutomation:
         
         # Сначала пробуем pyautogui
         try:
-            pyautogui.moveTo(x, y, duration=duration)
+            self._gui.moveTo(x, y, duration=duration)
             return
         except Exception as e1:
             # Если pyautogui не работает, пробуем cliclick (для macOS)
@@ -114,6 +254,22 @@ class MouseAutomation:
             else:
                 raise e1
     
+    def nudge_cursor(self, x: int, y: int) -> bool:
+        """
+        Мгновенно передвинуть курсор одним событием, без вывода и без паузы pyautogui
+        (для фонового движения против простоя).
+
+        Returns:
+            False, если сейчас выполняется другое действие с мышью (движение пропущено)
+        """
+        if not self.input_lock.acquire(blocking=False):
+            return False
+        try:
+            self._gui.moveTo(x, y, duration=0, _pause=False)
+            return True
+        finally:
+            self.input_lock.release()
+    
     def _click_applescript(self, x: int, y: int, button: str = 'left', clicks: int = 1) -> None:
         """Клик через AppleScript (для macOS)"""
         # Сначала перемещаем курсор
@@ -122,12 +278,13 @@ class MouseAutomation:
         
         # Сначала пробуем pyautogui
         try:
-            pyautogui.click(x, y, button=button, clicks=clicks)
+            self._gui.click(x, y, button=button, clicks=clicks)
             return
         except Exception:
             pass
         
         # Если pyautogui не работает, пробуем cliclick (если установлен)
+        import subprocess
         try:
             button_map = {
                 'left': 'c',      # click
@@ -151,6 +308,7 @@ class MouseAutomation:
                 f"  Системные настройки → Конфиденциальность и безопасность → Управление компьютером"
             )
     
+    @_exclusive
     def click(self, x: Optional[int] = None, y: Optional[int] = None, 
               button: str = 'left', clicks: int = 1, interval: float = 0.1) -> None:
         """
@@ -168,7 +326,7 @@ class MouseAutomation:
                 print(f"Кликаю по координатам ({x}, {y}) кнопкой {button}")
                 # Сначала пробуем pyautogui
                 try:
-                    pyautogui.click(x, y, button=button, clicks=clicks, interval=interval)
+                    self._gui.click(x, y, button=button, clicks=clicks, interval=interval)
                     return
                 except Exception as e1:
                     # Если pyautogui не работает, пробуем cliclick (для macOS)
@@ -193,9 +351,9 @@ class MouseAutomation:
             else:
                 print(f"Кликаю по текущей позиции кнопкой {button}")
                 # Получаем текущую позицию
-                pos = pyautogui.position()
+                pos = self._gui.position()
                 try:
-                    pyautogui.click(button=button, clicks=clicks, interval=interval)
+                    self._gui.click(button=button, clicks=clicks, interval=interval)
                     return
                 except Exception as e1:
                     # Если pyautogui не работает, пробуем cliclick (для macOS)
@@ -246,27 +404,174 @@ class MouseAutomation:
         Returns:
             Путь к сохраненному файлу
         """
+        print("Делаю скриншот")
+        
+        screenshot = self.capture(region)
+        
+        filepath = self.save_image(screenshot, filename)
+        print(f"Скриншот сохранен: {filepath}")
+        return filepath
+    
+    @property
+    def screenshots_dir(self) -> Path:
+        """Каталог, куда save_image() пишет скриншоты (корень архива, если он задан)"""
+        if self.archive is not None:
+            return Path(self.archive.root)
+        return Path.home() / "Desktop" / "screen-scan"
+
+    def save_image(self, image, filename: Optional[str] = None) -> str:
+        """
+        Сохранить изображение в папку скриншотов (~/Desktop/screen-scan)
+        или в архив, если он задан (повторы не сохраняются второй раз)
+        
+        Args:
+            image: Изображение PIL.Image (например, результат capture())
+            filename: Имя файла (если None, генерируется автоматически)
+        
+        Returns:
+            Путь к сохраненному файлу
+        """
+        if self.archive is not None:
+            return self.archive.put(image, label=filename).result()["path"]
+        
         if filename is None:
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             filename = f"screenshot_{timestamp}.png"
         
         # Создаем директорию screen-scan на рабочем столе если её нет
-        desktop_path = Path.home() / "Desktop"
-        screenshots_dir = desktop_path / "screen-scan"
-        screenshots_dir.mkdir(exist_ok=True)
+        screenshots_dir = self.screenshots_dir
+        screenshots_dir.mkdir(parents=True, exist_ok=True)
         filepath = screenshots_dir / filename
         
-        print(f"Делаю скриншот: {filepath}")
+        image.save(str(filepath))
+        return str(filepath)
+    
+    def capture(self, region: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Сделать скриншот в памяти, без сохранения на диск
         
+        Args:
+            region: Область для скриншота (x, y, width, height) или None для всего экрана
+        
+        Returns:
+            Изображение PIL.Image
+        """
         if region:
-            screenshot = pyautogui.screenshot(region=region)
-        else:
-            screenshot = pyautogui.screenshot()
+            return self._gui.screenshot(region=region)
+        return self._gui.screenshot()
+    
+    @property
+    def locator(self):
+        """Поиск шаблонов (template_locator.TemplateLocator), создается при первом обращении"""
+        if self._locator is None:
+            try:
+                from template_locator import TemplateLocator
+            except ImportError:
+                raise ImportError("Для поиска по шаблону нужен numpy. Установите: pip install numpy")
+            self._locator = TemplateLocator()
+        return self._locator
+    
+    def locate(self, template, region: Optional[Tuple[int, int, int, int]] = None,
+               threshold: Optional[float] = None,
+               name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Найти элемент интерфейса на экране по шаблону
         
-        screenshot.save(str(filepath))
-        print(f"Скриншот сохранен: {filepath}")
-        return str(filepath)
+        Сначала проверяется окрестность последней найденной позиции, затем весь экран
+        (или область). Масштабы и порог по умолчанию задаются в self.locator.
+        
+        Args:
+            template: Путь к картинке-шаблону, PIL.Image или массив numpy
+            region: Область поиска (x, y, width, height) или None для всего экрана
+            threshold: Минимальное совпадение (NCC, от -1 до 1)
+            name: Имя шаблона для кэша (по умолчанию путь к файлу)
+        
+        Returns:
+            Словарь {'x', 'y', 'width', 'height', 'center', 'score', 'scale', 'name'}
+            в координатах экрана или None, если элемент не найден
+        """
+        offset = (region[0], region[1]) if region else (0, 0)
+        return self.locator.locate(self.capture(region), template, name, offset, threshold)
+    
+    def locate_all(self, templates: Dict[str, Any],
+                   region: Optional[Tuple[int, int, int, int]] = None,
+                   threshold: Optional[float] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Найти несколько шаблонов по одному скриншоту
+        
+        Args:
+            templates: Словарь {имя: путь, PIL.Image или массив}
+            region: Область поиска (x, y, width, height) или None для всего экрана
+            threshold: Минимальное совпадение (NCC, от -1 до 1)
+        
+        Returns:
+            Словарь {имя: результат locate() или None}
+        """
+        offset = (region[0], region[1]) if region else (0, 0)
+        return self.locator.locate_all(self.capture(region), templates, offset, threshold)
     
+    def wait_for_stable(self, region: Optional[Tuple[int, int, int, int]] = None,
+                        timeout: float = 2.0,
+                        interval: float = 0.05,
+                        stable_frames: int = 2,
+                        scale: int = 8,
+                        tolerance: float = 1.0,
+                        before=None,
+                        change_timeout: float = CHANGE_TIMEOUT) -> bool:
+        """
+        Дождаться, пока изображение на экране перестанет меняться
+        (вместо фиксированной паузы после клика)
+
+        Область снимается, переводится в оттенки серого и уменьшается в `scale` раз;
+        ожидание заканчивается, как только `stable_frames` сравнений подряд
+        не показали изменений.
+
+        Сразу после клика экран может ещё не начать меняться — тогда два одинаковых
+        снимка означают не «успокоился», а «ещё не отреагировал». Поэтому после
+        действия передайте снимок той же области, сделанный до него (`before`):
+        сначала ожидается отличие от него (не дольше `change_timeout`), и только
+        потом — покой.
+
+        Args:
+            region: Область (x, y, width, height) или None для всего экрана
+            timeout: Максимальное время ожидания (в секундах)
+            interval: Пауза между снимками (в секундах)
+            stable_frames: Сколько сравнений подряд должны совпасть
+            scale: Во сколько раз уменьшать снимок перед сравнением
+            tolerance: Допустимая средняя разница яркости (0-255) между снимками,
+                       чтобы мигающий курсор и сглаживание не мешали
+            before: Снимок области (PIL.Image), сделанный до действия
+            change_timeout: Сколько ждать отличия от `before`; если экран так и не
+                            изменился, дальше ожидается просто покой
+
+        Returns:
+            True, если экран успокоился; False, если истек timeout
+        """
+        deadline = time.monotonic() + timeout
+        previous = None
+        if before is not None:
+            reference = _reduced_frame(before, scale)
+            change_deadline = min(deadline, time.monotonic() + change_timeout)
+            while True:
+                previous = _reduced_frame(self.capture(region), scale)
+                remaining = change_deadline - time.monotonic()
+                if not _same_frame(previous, reference, tolerance) or remaining <= 0:
+                    break
+                time.sleep(min(interval, remaining))
+        matches = 0
+        while True:
+            frame = _reduced_frame(self.capture(region), scale)
+            if previous is not None:
+                matches = matches + 1 if _same_frame(frame, previous, tolerance) else 0
+                if matches >= stable_frames:
+                    return True
+            previous = frame
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"⚠️  Экран не перестал меняться за {timeout} c")
+                return False
+            time.sleep(min(interval, remaining))
+
     def get_cursor_position(self) -> Tuple[int, int]:
         """
         Получить текущую позицию курсора
@@ -275,13 +580,14 @@ class MouseAutomation:
             Кортеж (x, y) с координатами курсора
         """
         try:
-            pos = pyautogui.position()
+            pos = self._gui.position()
             print(f"Текущая позиция курсора: {pos}")
             return pos
         except Exception as e:
             print(f"❌ Ошибка при получении позиции курсора: {e}")
             raise
     
+    @_exclusive
     def drag(self, start_x: int, start_y: int, end_x: int, end_y: int, 
              duration: float = 1.0) -> None:
         """
@@ -295,7 +601,7 @@ class MouseAutomation:
             duration: Время перетаскивания в секундах
         """
         print(f"Перетаскиваю от ({start_x}, {start_y}) к ({end_x}, {end_y})")
-        pyautogui.drag(start_x, start_y, end_x, end_y, duration=duration, button='left')
+        self._gui.drag(start_x, start_y, end_x, end_y, duration=duration, button='left')
     
     def screenshot_and_ocr(self, filename: Optional[str] = None,
                            region: Optional[Tuple[int, int, int, int]] = None,
@@ -307,7 +613,7 @@ class MouseAutomation:
         Args:
             filename: Имя файла для сохранения (если None, генерируется автоматически)
             region: Область для скриншота (x, y, width, height) или None для всего экрана
-            ocr_method: Метод OCR ('ocrspace' или 'tesseract')
+            ocr_method: Метод OCR ('ocrspace', 'tesseract' или 'hedged')
             ocr_api_key: API ключ для OCR.space (опционально, можно использовать бесплатный)
         
         Returns:
@@ -329,12 +635,7 @@ class MouseAutomation:
             print("🔍 Начинаю распознавание текста (русский язык)...")
             print(f"{'='*60}")
             
-            if ocr_method == 'ocrspace':
-                text = self._ocr_ocrspace(screenshot_path, ocr_api_key)
-            elif ocr_method == 'tesseract':
-                text = self._ocr_tesseract(screenshot_path)
-            else:
-                raise ValueError(f"Неизвестный метод OCR: {ocr_method}")
+            text = self.recognize(screenshot_path, ocr_method, ocr_api_key)
             
             result['text'] = text
             result['success'] = True
@@ -361,6 +662,41 @@ class MouseAutomation:
         
         return result
     
+    def recognize(self, image_path: str,
+                  ocr_method: str = 'ocrspace',
+                  ocr_api_key: Optional[str] = None) -> str:
+        """
+        Распознать текст из файла без вывода результата в консоль
+        (можно вызывать из нескольких потоков одновременно)
+        
+        Args:
+            image_path: Путь к файлу изображения
+            ocr_method: Метод OCR ('ocrspace', 'tesseract' или 'hedged')
+            ocr_api_key: API ключ для OCR.space (опционально)
+        
+        Returns:
+            Распознанный текст
+        """
+        if ocr_method == 'ocrspace':
+            return self._ocr_ocrspace(image_path, ocr_api_key)
+        if ocr_method == 'tesseract':
+            return self._ocr_tesseract(image_path)
+        if ocr_method == 'hedged':
+            return self.hedged_ocr().recognize(image_path, api_key=ocr_api_key)
+        raise ValueError(f"Неизвестный метод OCR: {ocr_method}")
+    
+    def hedged_ocr(self):
+        """
+        Распознавание с бюджетом времени и запасным движком (см. hedged_ocr),
+        настройки — из OCR_BUDGET, OCR_HEDGE_DELAY и OCR_ENGINES.
+        Создаётся при первом обращении; статистика движков — hedged_ocr().stats()
+        """
+        with self._hedged_lock:
+            if self._hedged is None:
+                from hedged_ocr import HedgedOCR
+                self._hedged = HedgedOCR()
+            return self._hedged
+    
     def _ocr_ocrspace(self, image_path: str, api_key: Optional[str] = None, max_retries: int = 3) -> str:
         """
         Распознавание текста через OCR.space API (бесплатный)
@@ -373,8 +709,10 @@ class MouseAutomation:
         Returns:
             Распознанный текст
         """
-        # OCR.space бесплатный API endpoint
-        url = "https://api.ocr.space/parse/image"
+        import requests
+        
+        # OCR.space бесплатный API endpoint (или заглушка из OCRSPACE_URL)
+        url = os.getenv(OCRSPACE_URL_ENV) or OCRSPACE_URL
         
         # Проверяем размер файла (OCR.space имеет лимит ~1MB для бесплатного API)
         file_size = Path(image_path).stat().st_size
@@ -385,16 +723,10 @@ class MouseAutomation:
             try:
                 with open(image_path, 'rb') as image_file:
                     files = {'file': image_file}
-                    data = {
-                        'apikey': api_key or 'helloworld',  # Бесплатный ключ по умолчанию
-                        'language': 'rus',  # Русский язык
-                        'isOverlayRequired': False,
-                        'detectOrientation': True,
-                        'OCREngine': 2,  # Используем более точный движок для русского
-                    }
+                    data = _ocrspace_fields(api_key)
                     
                     # Увеличиваем таймаут до 60 секунд и добавляем retry
-                    timeout = 60
+                    timeout = OCRSPACE_TIMEOUT
                     if attempt > 0:
                         print(f"🔄 Попытка {attempt + 1}/{max_retries}...")
                         time.sleep(2 * attempt)  # Экспоненциальная задержка
@@ -446,42 +778,7 @@ class MouseAutomation:
         Returns:
             Распознанный текст
         """
-        try:
-            import pytesseract
-        except ImportError:
-            raise ImportError(
-                "pytesseract не установлен. Установите: pip install pytesseract\n"
-                "Также установите Tesseract OCR: brew install tesseract (macOS)"
-            )
-        
-        try:
-            image = Image.open(image_path)
-            # Пробуем сначала русский язык
-            try:
-                text = pytesseract.image_to_string(image, lang='rus')
-                return text.strip()
-            except Exception as rus_error:
-                # Если русский язык не установлен, пробуем английский
-                print("⚠️  Русский языковой пакет не найден, использую английский")
-                print("💡 Для установки русского языка: brew install tesseract-lang")
-                try:
-                    text = pytesseract.image_to_string(image, lang='eng')
-                    return text.strip()
-                except Exception as eng_error:
-                    # Если и английский не работает, пробуем без указания языка
-                    print("⚠️  Пробую без указания языка...")
-                    text = pytesseract.image_to_string(image)
-                    return text.strip()
-        except Exception as e:
-            error_msg = str(e)
-            if 'rus.traineddata' in error_msg or 'Failed loading language' in error_msg:
-                raise Exception(
-                    f"Русский языковой пакет не установлен.\n"
-                    f"Установите: brew install tesseract-lang\n"
-                    f"Или используйте OCR.space (он поддерживает русский без установки): ocr_method='ocrspace'\n"
-                    f"Ошибка: {e}"
-                )
-            raise Exception(f"Ошибка Tesseract OCR: {e}")
+        return tesseract_text(image_path)
     
     def ocr_from_file(self, image_path: str, 
                       ocr_method: str = 'ocrspace',
@@ -491,7 +788,7 @@ class MouseAutomation:
         
         Args:
             image_path: Путь к файлу изображения
-            ocr_method: Метод OCR ('ocrspace' или 'tesseract')
+            ocr_method: Метод OCR ('ocrspace', 'tesseract' или 'hedged')
             ocr_api_key: API ключ для OCR.space (опционально)
         
         Returns:
@@ -503,12 +800,7 @@ class MouseAutomation:
         print(f"{'='*60}")
         
         try:
-            if ocr_method == 'ocrspace':
-                text = self._ocr_ocrspace(image_path, ocr_api_key)
-            elif ocr_method == 'tesseract':
-                text = self._ocr_tesseract(image_path)
-            else:
-                raise ValueError(f"Неизвестный метод OCR: {ocr_method}")
+            text = self.recognize(image_path, ocr_method, ocr_api_key)
             
             # Выводим распознанные данные в консоль
             print(f"\n✅ Текст успешно распознан!")
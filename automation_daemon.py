@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Демон автоматизации: тёплый MouseAutomation и OCR в одном долгоживущем процессе
+
+Каждый запуск scan_and_parse.py платит за старт Python, импорты, инициализацию
+MouseAutomation и прогрев OCR. Демон делает это один раз и принимает запросы
+по HTTP на localhost или через Unix-сокет:
+
+    POST /move        {"x": 500, "y": 300, "duration": 0.2}
+    POST /click       {"x": 500, "y": 300, "button": "left", "clicks": 1}
+    POST /screenshot  {"region": [0, 0, 800, 600], "filename": "a.png"}
+    POST /ocr         {"image_path": "...", "ocr_method": "tesseract"}
+    POST /scan        {"x": 500, "y": 300, "click": true, "region": [...], "ocr_method": "..."}
+    GET  /status
+
+Ответ: {"ok": true, "result": ...} или {"ok": false, "error": "..."}.
+
+Доступ: тело POST — только application/json (простой кросс-сайтовый POST
+из браузера с text/plain отклоняется), а по TCP ещё и заголовок
+X-Scan-Daemon-Token с токеном из SCAN_DAEMON_TOKEN или из файла
+~/.scan-daemon-token, который демон создаёт при запуске (права 0600).
+Unix-сокет защищён правами на файл (0600), токен на нём не нужен.
+Имя файла /screenshot — только имя, без каталогов; /ocr читает только
+файлы из каталога скриншотов.
+
+Действия с мышью и экраном выполняются строго по одному, OCR — не более
+--ocr-workers одновременно, а запросы сверх --max-pending сразу получают 503.
+
+Примеры:
+    python automation_daemon.py                              # 127.0.0.1:8765
+    python automation_daemon.py --listen unix:/tmp/scan-daemon.sock --ocr-workers 4
+    python scan_client.py 500 300 true tesseract             # клиент с аргументами scan_and_parse.py
+"""
+
+import argparse
+import hmac
+import itertools
+import json
+import os
+import secrets
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from automation import MouseAutomation
+from scan_and_parse import OCR_METHODS, normalize_target
+from scan_client import DAEMON_ENV, DEFAULT_ADDRESS, TOKEN_ENV, TOKEN_FILE, TOKEN_HEADER, parse_address
+
+
+class ServiceBusy(Exception):
+    """Очередь запросов заполнена"""
+
+
+class PermissionDenied(Exception):
+    """Запрос не прошёл проверку доступа (путь вне каталога скриншотов)"""
+
+
+class AutomationService:
+    """Тёплый MouseAutomation с очередью запросов и ограничением параллелизма"""
+
+    def __init__(self, auto: Optional[MouseAutomation] = None,
+                 ocr_workers: int = 2, max_pending: int = 16):
+        """
+        Args:
+            auto: Экземпляр MouseAutomation (по умолчанию создается новый)
+            ocr_workers: Сколько распознаваний может идти одновременно
+            max_pending: Сколько запросов может выполняться и ждать в очереди одновременно
+        """
+        self.auto = auto or MouseAutomation(use_applescript=False)
+        self.ocr_workers = max(1, ocr_workers)
+        self.max_pending = max(1, max_pending)
+        self._ui_lock = threading.Lock()
+        self._ocr_slots = threading.BoundedSemaphore(self.ocr_workers)
+        self._admission = threading.BoundedSemaphore(self.max_pending)
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._seconds: Dict[str, float] = {}
+        self._rejected = 0
+        self._seq = itertools.count(1)
+        self.started_at = time.time()
+
+    def warm_up(self, ocr_methods: List[str]) -> None:
+        """Инициализировать pyautogui и загрузить модули OCR заранее, до первого запроса"""
+        print(f"Размер экрана: {self.auto.screen_size}")
+        if "tesseract" in ocr_methods:
+            try:
+                import pytesseract
+                from PIL import Image  # noqa: F401
+                print(f"Tesseract {pytesseract.get_tesseract_version()} готов")
+            except Exception as e:
+                print(f"⚠️  Tesseract недоступен: {e}")
+        if "ocrspace" in ocr_methods:
+            import requests  # noqa: F401
+
+    def handle(self, action: str, params: Dict[str, Any]) -> Any:
+        """
+        Выполнить действие.
+
+        Raises:
+            ServiceBusy: превышен max_pending
+            ValueError: неизвестное действие или неверные параметры
+        """
+        if action == "status":
+            return self.status()
+        method = getattr(self, f"_do_{action}", None)
+        if method is None:
+            raise ValueError(f"Неизвестное действие: {action}")
+        if not self._admission.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise ServiceBusy(f"Очередь заполнена ({self.max_pending} запросов)")
+        with self._stats_lock:
+            self._pending += 1
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = method(**params)
+            failed = False
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self._pending -= 1
+                self._counts[action] = self._counts.get(action, 0) + 1
+                self._seconds[action] = self._seconds.get(action, 0.0) + elapsed
+                if failed:
+                    self._errors[action] = self._errors.get(action, 0) + 1
+            self._admission.release()
+
+    def status(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "ocr_workers": self.ocr_workers,
+                "rejected": self._rejected,
+                "requests": dict(self._counts),
+                "errors": dict(self._errors),
+                "mean_seconds": {k: round(v / self._counts[k], 3) for k, v in self._seconds.items()},
+            }
+
+    def _do_move(self, x: int, y: int, duration: float = 0.0) -> None:
+        with self._ui_lock:
+            self.auto.move_cursor(int(x), int(y), duration=float(duration))
+
+    def _do_click(self, x: Optional[int] = None, y: Optional[int] = None,
+                  button: str = "left", clicks: int = 1) -> None:
+        with self._ui_lock:
+            self.auto.click(x, y, button=button, clicks=int(clicks))
+
+    def _do_screenshot(self, region: Optional[List[int]] = None, filename: Optional[str] = None) -> Dict[str, str]:
+        if filename is not None and (not isinstance(filename, str) or filename in ("", ".", "..")
+                                     or Path(filename).name != filename or "\\" in filename):
+            raise PermissionDenied(f"Имя файла должно быть без каталогов: {filename!r}")
+        with self._ui_lock:
+            image = self.auto.capture(tuple(region) if region else None)
+        return {"screenshot_path": self.auto.save_image(image, filename)}
+
+    def _do_ocr(self, image_path: str, ocr_method: str = "ocrspace",
+                ocr_api_key: Optional[str] = None) -> Dict[str, str]:
+        if ocr_method not in OCR_METHODS:
+            raise ValueError(f"Неизвестный метод OCR: {ocr_method}")
+        image_path = self._screenshot_path(image_path)
+        with self._ocr_slots:
+            return {"text": self.auto.recognize(image_path, ocr_method, ocr_api_key)}
+
+    def _screenshot_path(self, image_path: str) -> str:
+        """Путь к файлу внутри каталога скриншотов (относительный — от этого каталога)"""
+        root = self.auto.screenshots_dir.resolve()
+        path = (root / image_path).resolve()
+        try:
+            path.relative_to(root)
+        except ValueError:
+            raise PermissionDenied(f"Файл вне каталога скриншотов {root}: {image_path}") from None
+        return str(path)
+
+    def _do_scan(self, **params) -> Dict[str, Any]:
+        """Полный цикл scan_and_parse: действия — под общей блокировкой, OCR — в отдельном слоте"""
+        target = normalize_target(params)
+        result = {"screenshot_path": None, "text": "", "success": False, "error": None}
+        try:
+            with self._ui_lock:
+                self.auto.move_cursor(target["x"], target["y"], duration=target["move_duration"])
+                self.auto.wait_for_stable(target["screenshot_region"], timeout=target["wait_before_click"])
+                if target["click"]:
+                    before = self.auto.capture(target["screenshot_region"])
+                    self.auto.click(target["x"], target["y"])
+                    self.auto.wait_for_stable(target["screenshot_region"], timeout=target["wait_after_click"],
+                                              before=before)
+                image = self.auto.capture(target["screenshot_region"])
+            filename = f"daemon_{time.strftime('%Y%m%d_%H%M%S')}_{next(self._seq):04d}.png"
+            result["screenshot_path"] = self.auto.save_image(image, filename)
+            with self._ocr_slots:
+                result["text"] = self.auto.recognize(result["screenshot_path"], target["ocr_method"],
+                                                     target.get("ocr_api_key"))
+            result["success"] = True
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "AutomationDaemon/1.0"
+
+    def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if token is None:
+            return True
+        given = self.headers.get(TOKEN_HEADER) or ""
+        if hmac.compare_digest(given.encode("utf-8"), token.encode("utf-8")):
+            return True
+        self._reply(401, {"ok": False, "error": f"Нужен заголовок {TOKEN_HEADER} с токеном демона"})
+        return False
+
+    def _dispatch(self, action: str, params: Dict[str, Any]) -> None:
+        try:
+            result = self.server.service.handle(action, params)
+        except ServiceBusy as e:
+            self._reply(503, {"ok": False, "error": str(e)})
+        except PermissionDenied as e:
+            self._reply(403, {"ok": False, "error": str(e)})
+        except (ValueError, TypeError, KeyError) as e:
+            self._reply(400, {"ok": False, "error": str(e)})
+        except Exception as e:
+            self._reply(500, {"ok": False, "error": str(e)})
+        else:
+            self._reply(200, {"ok": True, "result": result})
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        self._dispatch(self.path.strip("/"), {})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self._reply(415, {"ok": False, "error": "Тело запроса должно быть application/json"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("тело запроса должно быть JSON-объектом")
+        except ValueError as e:
+            self._reply(400, {"ok": False, "error": f"Неверный JSON: {e}"})
+            return
+        self._dispatch(self.path.strip("/"), params)
+
+    def address_string(self) -> str:
+        # У Unix-сокета нет адреса клиента
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {self.address_string()} {format % args}")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _daemon_token() -> str:
+    """
+    Токен для TCP: из SCAN_DAEMON_TOKEN, иначе новый случайный, записанный
+    в ~/.scan-daemon-token (права 0600), откуда его читает scan_client.
+    """
+    token = os.getenv(TOKEN_ENV)
+    if token:
+        return token.strip()
+    token = secrets.token_urlsafe(32)
+    fd = os.open(str(TOKEN_FILE), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    os.chmod(TOKEN_FILE, 0o600)
+    return token
+
+
+def serve(service: AutomationService, listen: Optional[str] = None):
+    """
+    Запустить HTTP-сервер демона (блокирует до Ctrl+C).
+
+    Args:
+        service: Сервис с тёплым MouseAutomation
+        listen: "host:port" или "unix:/путь/к/сокету" (по умолчанию SCAN_DAEMON или 127.0.0.1:8765)
+    """
+    address = parse_address(listen)
+    if isinstance(address, str):
+        if os.path.exists(address):
+            os.unlink(address)  # сокет от прошлого запуска
+        server = _UnixHTTPServer(address, _Handler)
+        os.chmod(address, 0o600)
+        server.token = None
+        where = f"unix:{address}"
+    else:
+        server = ThreadingHTTPServer(address, _Handler)
+        server.token = _daemon_token()
+        where = f"http://{address[0]}:{server.server_port}"
+    server.service = service
+
+    print("=" * 60)
+    print("🛰️  ДЕМОН АВТОМАТИЗАЦИИ ЗАПУЩЕН")
+    print(f"Адрес: {where}")
+    if server.token is not None:
+        print(f"Токен: {TOKEN_ENV} или {TOKEN_FILE}")
+    print(f"Потоков OCR: {service.ocr_workers}, очередь запросов: {service.max_pending}")
+    print("Нажмите Ctrl+C, чтобы остановить.")
+    print("=" * 60)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Остановлено пользователем (Ctrl+C).")
+    finally:
+        server.server_close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Демон автоматизации с локальным HTTP API")
+    parser.add_argument("--listen", help=f"host:port или unix:/путь (по умолчанию ${DAEMON_ENV} или {DEFAULT_ADDRESS})")
+    parser.add_argument("--ocr-workers", type=int, default=2, help="сколько распознаваний одновременно")
+    parser.add_argument("--max-pending", type=int, default=16, help="сколько запросов может ждать в очереди")
+    parser.add_argument("--warm", default="tesseract,ocrspace",
+                        help="какие движки OCR прогреть при запуске (через запятую, пусто — ни одного)")
+    args = parser.parse_args()
+
+    service = AutomationService(ocr_workers=args.ocr_workers, max_pending=args.max_pending)
+    service.warm_up([m.strip() for m in args.warm.split(",") if m.strip()])
+    serve(service, args.listen)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Замер задержки чтения одной ячейки (сумма или время): шаблоны глифов против tesseract
+
+Ячейки рисуются синтетически шрифтом --font (как в интерфейсе: один шрифт, один кегль).
+Сначала шаблоны (glyph_ocr.GlyphMatcher) обучаются на --train ячейках, прочитанных
+tesseract уверенно — так же, как при работе наблюдателя. Без tesseract для обучения
+берутся заранее известные тексты ячеек. Затем на --cells новых ячейках замеряются:
+- шаблоны глифов: задержка, точность, доля «не уверен»;
+- tesseract (_reocr_cell, как при повторном чтении ячейки в mouse_watchdog);
+- шаблоны с запасным tesseract (как в mouse_watchdog._read_cell).
+
+С tesseract замеряется и то, что экономится на каждом кадре наблюдателя: таблица
+из --rows строк распознаётся полным проходом (_extract_table_rows_from_image: tesseract
+по кадру и повторно по сомнительным ячейкам) и по известным колонкам (TableParser:
+суммы и время — шаблонами, tesseract по кадру — только события).
+
+Примеры:
+    python bench_glyphs.py
+    python bench_glyphs.py --font /Library/Fonts/Arial.ttf --size 13 --cells 500
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from glyph_ocr import ALPHABET, GlyphMatcher
+from mouse_watchdog import (_AMOUNT_PATTERN, _AMOUNT_WHITELIST, _TIME_PATTERN, _TIME_WHITELIST,
+                            GLYPH_CONFIDENCE, REOCR_CONFIDENCE, TableParser,
+                            _extract_table_rows_from_image, _reocr_cell)
+
+EVENTS = ("Deposit", "Withdrawal", "Transfer out", "Card payment", "Refund")
+
+DEFAULT_FONTS = ("DejaVuSans.ttf", "Arial.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+                 "/usr/share/fonts/truetype/DejaVuSans.ttf", "/Library/Fonts/Arial.ttf")
+
+
+def _load_font(path: Optional[str], size: int):
+    for candidate in ([path] if path else DEFAULT_FONTS):
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    if path:
+        raise SystemExit(f"❌ Не удалось открыть шрифт: {path}")
+    return ImageFont.load_default()
+
+
+def _random_cell_text(rng: random.Random) -> Tuple[str, str]:
+    """(текст, вид ячейки: amount или time)"""
+    if rng.random() < 0.5:
+        return "${:,.2f}".format(rng.uniform(0, 250000)), "amount"
+    return f"{rng.randint(1, 12)}:{rng.randint(0, 59):02d} {rng.choice(['AM', 'PM'])}", "time"
+
+
+def _render(text: str, font) -> Tuple[Image.Image, Tuple[int, int, int, int]]:
+    """Строка таблицы с одной ячейкой и рамка ячейки (left, top, width, height)"""
+    image = Image.new("RGB", (260, 32), (248, 248, 248))
+    draw = ImageDraw.Draw(image)
+    draw.text((8, 6), text, font=font, fill=(33, 33, 33))
+    left, top, right, bottom = draw.textbbox((8, 6), text, font=font)
+    return image, (left, top, right - left, bottom - top)
+
+
+def _render_table(rng: random.Random, rows: int, font) -> Tuple[Image.Image, List[Tuple[str, str, float]]]:
+    """Таблица «событие — время — сумма» (сумма выровнена вправо) и её строки"""
+    line = font.size + 12
+    image = Image.new("RGB", (560, line * (rows + 1) + 8), (248, 248, 248))
+    draw = ImageDraw.Draw(image)
+    for x, title in ((10, "Event"), (260, "Time"), (400, "Amount")):
+        draw.text((x, 6), title, font=font, fill=(90, 90, 90))
+    truth = []
+    for i in range(rows):
+        y = 6 + line * (i + 1)
+        event = rng.choice(EVENTS)
+        time_text = f"{rng.randint(1, 12)}:{rng.randint(0, 59):02d} {rng.choice(['AM', 'PM'])}"
+        amount = "${:,.2f}".format(rng.uniform(0, 250000))
+        draw.text((10, y), event, font=font, fill=(33, 33, 33))
+        draw.text((260, y), time_text, font=font, fill=(33, 33, 33))
+        draw.text((540 - draw.textlength(amount, font=font), y), amount, font=font, fill=(33, 33, 33))
+        truth.append((event, time_text, float(amount[1:].replace(",", ""))))
+    return image, truth
+
+
+def _measure_frames(name: str, frames, parse: Callable) -> None:
+    times, correct = [], 0
+    for image, truth in frames:
+        start = time.perf_counter()
+        rows = parse(image)
+        times.append((time.perf_counter() - start) * 1000)
+        correct += [(r["event"], r["time"], r["amount"]) for r in rows] == truth
+    print(f"{name:<24} {statistics.median(times):8.1f} {_percentile(times, 0.95):8.1f} "
+          f"{correct / len(frames):8.1%}")
+
+
+def _crop(image: Image.Image, box: Tuple[int, int, int, int]) -> Image.Image:
+    left, top, width, height = box
+    return image.crop((left - 1, top - 1, left + width + 1, top + height + 1))
+
+
+def _tesseract(image: Image.Image, box, kind: str) -> Tuple[str, float]:
+    text, confidence = _reocr_cell(image, box, _AMOUNT_WHITELIST if kind == "amount" else _TIME_WHITELIST)
+    pattern = _AMOUNT_PATTERN if kind == "amount" else _TIME_PATTERN
+    match = pattern.search(text.replace(" ", "") if kind == "amount" else text)
+    return (match.group() if match else ""), confidence
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _measure(name: str, cells, read: Callable) -> None:
+    times, correct, unsure = [], 0, 0
+    for image, box, text, kind in cells:
+        start = time.perf_counter()
+        result = read(image, box, kind)
+        times.append((time.perf_counter() - start) * 1000)
+        if not result:
+            unsure += 1
+        elif result == text:
+            correct += 1
+    wrong = len(cells) - correct - unsure
+    print(f"{name:<24} {statistics.median(times):8.2f} {_percentile(times, 0.95):8.2f} "
+          f"{correct / len(cells):8.1%} {unsure / len(cells):9.1%} {wrong:7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка чтения ячейки: шаблоны глифов vs tesseract")
+    parser.add_argument("--font", default=None, help="файл шрифта TrueType (по умолчанию DejaVu Sans/Arial)")
+    parser.add_argument("--size", type=int, default=14, help="кегль")
+    parser.add_argument("--train", type=int, default=60, help="ячеек для обучения шаблонов")
+    parser.add_argument("--cells", type=int, default=300, help="ячеек для замера")
+    parser.add_argument("--rows", type=int, default=12, help="строк в таблице для замера кадра целиком")
+    parser.add_argument("--frames", type=int, default=30, help="кадров для замера кадра целиком")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    font = _load_font(args.font, args.size)
+    rng = random.Random(args.seed)
+
+    def cells(count: int):
+        result = []
+        for _ in range(count):
+            text, kind = _random_cell_text(rng)
+            image, box = _render(text, font)
+            result.append((image, box, text, kind))
+        return result
+
+    try:
+        _tesseract(*cells(1)[0][:2], "amount")
+        has_tesseract = True
+    except Exception as e:
+        has_tesseract = False
+        print(f"⚠️  tesseract недоступен ({e}): шаблоны обучаются на известных текстах")
+
+    print("=" * 60)
+    print("🔢 ЧТЕНИЕ ЯЧЕЙКИ: ШАБЛОНЫ ГЛИФОВ vs TESSERACT")
+    print(f"Шрифт: {getattr(font, 'path', 'встроенный')} {args.size}, обучение: {args.train}, замер: {args.cells}")
+    print("=" * 60)
+
+    matcher = GlyphMatcher()
+    confirmed = 0
+    for image, box, text, kind in cells(args.train):
+        if has_tesseract:
+            text, confidence = _tesseract(image, box, kind)
+            if not text or confidence < REOCR_CONFIDENCE:
+                continue
+        confirmed += 1
+        matcher.learn(_crop(image, box), text)
+    print(f"Подтверждённых образцов: {confirmed}, шаблонов: {len(matcher)}")
+    missing = [c for c in ALPHABET if c not in matcher.counts()]
+    if missing:
+        print(f"⚠️  Нет шаблонов для: {' '.join(missing)}")
+
+    test = cells(args.cells)
+
+    def by_glyphs(image, box, kind):
+        text, score = matcher.read(_crop(image, box))
+        return text if score >= GLYPH_CONFIDENCE else ""
+
+    def with_fallback(image, box, kind):
+        return by_glyphs(image, box, kind) or _tesseract(image, box, kind)[0]
+
+    print(f"\n{'способ':<24} {'p50, мс':>8} {'p95, мс':>8} {'точно':>8} {'не уверен':>9} {'ошибок':>7}")
+    _measure("шаблоны глифов", test, by_glyphs)
+    if has_tesseract:
+        _measure("tesseract", test, lambda image, box, kind: _tesseract(image, box, kind)[0])
+        _measure("шаблоны + tesseract", test, with_fallback)
+
+        # Кадр целиком: первый кадр — полный проход, по нему TableParser находит колонки
+        frames = [_render_table(rng, args.rows, font) for _ in range(args.frames + 1)]
+        table = TableParser(glyphs=matcher, refresh_ticks=10 ** 9)
+        table(frames[0][0])
+        print(f"\n{'кадр, ' + str(args.rows) + ' строк':<24} {'p50, мс':>8} {'p95, мс':>8} {'точно':>8}")
+        _measure_frames("полный проход", frames[1:],
+                        lambda image: _extract_table_rows_from_image(image, glyphs=matcher))
+        _measure_frames("по колонкам", frames[1:], table)
+    else:
+        print("⚠️  Без tesseract замер кадра целиком (полный проход vs по колонкам) пропущен")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Замер задержки действий MouseAutomation на виртуальном дисплее (Xvfb)
+
+Для каждой конфигурации (пауза pyautogui.PAUSE) каждое действие выполняется
+--repeat раз, и для него считаются:
+- распределение задержки: среднее, p50, p95, p99, максимум;
+- сколько из этого — сон: time.sleep подменяется счётчиком, так что видно,
+  какая доля уходит на PAUSE, duration движения и встроенные паузы;
+- точность: после движения, клика и перетаскивания позиция курсора читается
+  обратно и сравнивается с целью (доля точных попаданий, максимальная ошибка).
+
+Отчёт пишется в JSON вместе с коммитом и параметрами запуска, чтобы сравнивать
+конфигурации и коммиты между собой (--compare старый_отчёт.json).
+
+По умолчанию запускается свой Xvfb (нужен пакет xvfb); --no-xvfb — работать
+на текущем DISPLAY (курсор будет двигаться по-настоящему).
+
+Примеры:
+    python bench_input.py
+    python bench_input.py --pause 0,0.1 --repeat 50 --output bench_reports/input.json
+    python bench_input.py --compare bench_reports/input.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from automation import MouseAutomation
+
+PROJECT_DIR = Path(__file__).resolve().parent
+REPORTS_DIR = PROJECT_DIR / "bench_reports"
+
+
+class _SleepMeter:
+    """Подмена time.sleep, которая копит суммарное время сна"""
+
+    def __init__(self):
+        self.slept = 0.0
+        self._original = time.sleep
+
+    def _sleep(self, seconds: float) -> None:
+        start = time.perf_counter()
+        self._original(seconds)
+        self.slept += time.perf_counter() - start
+
+    def __enter__(self) -> "_SleepMeter":
+        time.sleep = self._sleep
+        return self
+
+    def __exit__(self, *exc) -> None:
+        time.sleep = self._original
+
+
+def start_xvfb(width: int, height: int, timeout: float = 5.0) -> Tuple[subprocess.Popen, str]:
+    """Запустить Xvfb на свободном номере дисплея. Returns: (процесс, DISPLAY)"""
+    if shutil.which("Xvfb") is None:
+        raise RuntimeError("Xvfb не найден. Установите: sudo apt install xvfb (или запустите с --no-xvfb)")
+    number = 99
+    while Path(f"/tmp/.X{number}-lock").exists() or Path(f"/tmp/.X11-unix/X{number}").exists():
+        number += 1
+    proc = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while not Path(f"/tmp/.X11-unix/X{number}").exists():
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError(f"Xvfb :{number} не запустился")
+        time.sleep(0.05)
+    return proc, f":{number}"
+
+
+def _git_commit() -> Dict[str, object]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(PROJECT_DIR),
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=str(PROJECT_DIR),
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def _summary(times: List[float], sleeps: List[float], errors: List[Optional[float]]) -> Dict[str, object]:
+    ms = [t * 1000 for t in times]
+    result = {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 2),
+        "p50_ms": round(_percentile(ms, 0.50), 2),
+        "p95_ms": round(_percentile(ms, 0.95), 2),
+        "p99_ms": round(_percentile(ms, 0.99), 2),
+        "max_ms": round(max(ms), 2),
+        "sleep_ms": round(statistics.fmean(sleeps) * 1000, 2),
+    }
+    checked = [e for e in errors if e is not None]
+    if checked:
+        result["hit_rate"] = round(sum(e == 0 for e in checked) / len(checked), 4)
+        result["max_error_px"] = round(max(checked), 1)
+    return result
+
+
+def run_config(auto: MouseAutomation, pause: float, args: argparse.Namespace) -> Dict[str, Dict]:
+    """Замерить все действия при данной паузе pyautogui"""
+    gui = auto._gui
+    gui.PAUSE = pause
+    width, height = auto.screen_size
+    rng = random.Random(args.seed)
+    margin = 20  # подальше от углов (fail-safe) и краёв
+
+    def point() -> Tuple[int, int]:
+        return rng.randint(margin, width - margin), rng.randint(margin, height - margin)
+
+    def error(target: Tuple[int, int]) -> float:
+        x, y = gui.position()
+        return math.hypot(x - target[0], y - target[1])
+
+    def move_instant():
+        target = point()
+        auto.move_cursor(*target, duration=0)
+        return target
+
+    def move():
+        target = point()
+        auto.move_cursor(*target, duration=args.move_duration)
+        return target
+
+    def click():
+        target = point()
+        auto.click(*target)
+        return target
+
+    def drag():
+        start, end = point(), point()
+        auto.drag(*start, *end, duration=args.drag_duration)
+        return end
+
+    region = (margin, margin, min(200, width - 2 * margin), min(200, height - 2 * margin))
+    actions: Dict[str, Callable[[], Optional[Tuple[int, int]]]] = {
+        "move_cursor(duration=0)": move_instant,
+        f"move_cursor(duration={args.move_duration})": move,
+        "click": click,
+        f"drag(duration={args.drag_duration})": drag,
+        "capture()": lambda: auto.capture() and None,
+        "capture(200x200)": lambda: auto.capture(region) and None,
+    }
+
+    results = {}
+    for name, action in actions.items():
+        times, sleeps, errors = [], [], []
+        for _ in range(args.repeat):
+            # Действия MouseAutomation печатают каждое движение; в замере это шум
+            with contextlib.redirect_stdout(io.StringIO()), _SleepMeter() as meter:
+                start = time.perf_counter()
+                target = action()
+                elapsed = time.perf_counter() - start
+            times.append(elapsed)
+            sleeps.append(meter.slept)
+            errors.append(error(target) if target is not None else None)
+        results[name] = _summary(times, sleeps, errors)
+    return results
+
+
+def print_run(pause: float, actions: Dict[str, Dict]) -> None:
+    print(f"\nPAUSE = {pause}")
+    print(f"{'действие':<26} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'сон':>8} {'попад.':>7} {'ошибка':>7}")
+    for name, s in actions.items():
+        hit = f"{s['hit_rate']:.0%}" if "hit_rate" in s else "—"
+        err = f"{s['max_error_px']:.0f}px" if "max_error_px" in s else "—"
+        print(f"{name:<26} {s['p50_ms']:8.1f} {s['p95_ms']:8.1f} {s['p99_ms']:8.1f} {s['max_ms']:8.1f} "
+              f"{s['sleep_ms']:8.1f} {hit:>7} {err:>7}")
+
+
+def compare(report: Dict, baseline_path: str) -> None:
+    """Изменение p50/p95 относительно прошлого отчёта (по совпадающим PAUSE и действиям)"""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    old_runs = {run["pause"]: run["actions"] for run in baseline.get("runs", [])}
+    print(f"\nСравнение с {baseline_path} (коммит {baseline.get('commit')}), мс:")
+    for run in report["runs"]:
+        old = old_runs.get(run["pause"])
+        if old is None:
+            print(f"  PAUSE = {run['pause']}: в старом отчёте нет")
+            continue
+        print(f"  PAUSE = {run['pause']}")
+        for name, s in run["actions"].items():
+            if name not in old:
+                continue
+            d50 = s["p50_ms"] - old[name]["p50_ms"]
+            d95 = s["p95_ms"] - old[name]["p95_ms"]
+            print(f"    {name:<26} p50 {old[name]['p50_ms']:8.1f} → {s['p50_ms']:8.1f} ({d50:+.1f})"
+                  f"   p95 {old[name]['p95_ms']:8.1f} → {s['p95_ms']:8.1f} ({d95:+.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка и точность действий MouseAutomation на Xvfb")
+    parser.add_argument("--pause", default="0,0.1", help="значения pyautogui.PAUSE через запятую")
+    parser.add_argument("--repeat", type=int, default=30, help="повторов каждого действия")
+    parser.add_argument("--move-duration", type=float, default=0.2, help="duration плавного движения, с")
+    parser.add_argument("--drag-duration", type=float, default=0.2, help="duration перетаскивания, с")
+    parser.add_argument("--screen", default="1920x1080", help="размер экрана Xvfb")
+    parser.add_argument("--no-xvfb", action="store_true", help="использовать текущий DISPLAY")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", default=None,
+                        help="файл отчёта JSON (по умолчанию bench_reports/input_<коммит>_<время>.json)")
+    parser.add_argument("--compare", default=None, help="отчёт JSON, с которым сравнить")
+    args = parser.parse_args()
+
+    pauses = [float(p) for p in args.pause.split(",")]
+    width, height = (int(v) for v in args.screen.lower().split("x"))
+    xvfb = None
+    if not args.no_xvfb:
+        try:
+            xvfb, display = start_xvfb(width, height)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(2)
+        os.environ["DISPLAY"] = display
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            auto = MouseAutomation(fail_safe=False, use_applescript=False)
+            screen = auto.screen_size
+        print("=" * 60)
+        print("🖱️  ЗАДЕРЖКА ДЕЙСТВИЙ MouseAutomation (мс)")
+        print(f"Дисплей: {os.environ.get('DISPLAY', 'системный')} {screen[0]}x{screen[1]}, "
+              f"повторов: {args.repeat}")
+        print("=" * 60)
+
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **_git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "display": "xvfb" if xvfb else os.environ.get("DISPLAY", "native"),
+            "screen": list(screen),
+            "config": {"repeat": args.repeat, "move_duration": args.move_duration,
+                       "drag_duration": args.drag_duration, "seed": args.seed},
+            "runs": [],
+        }
+        for pause in pauses:
+            actions = run_config(auto, pause, args)
+            report["runs"].append({"pause": pause, "actions": actions})
+            print_run(pause, actions)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait(timeout=5)
+
+    output = Path(args.output) if args.output else \
+        REPORTS_DIR / f"input_{report['commit'] or 'nogit'}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n📄 Отчёт: {output}")
+    if args.compare:
+        compare(report, args.compare)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
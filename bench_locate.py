@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Замер задержки поиска по шаблону (template_locator) в зависимости от размера экрана
+
+Скриншоты генерируются синтетически (шум с размытием, похожий на текстуру интерфейса),
+шаблоны вырезаются из них же. Для каждого размера экрана замеряются:
+- полный поиск в одном масштабе и в трёх масштабах;
+- повторный поиск рядом с последней позицией;
+- пакетный поиск 4 шаблонов по одному снимку против 4 отдельных поисков;
+- по желанию — pyautogui.locate (pyscreeze) для сравнения.
+
+Примеры:
+    python bench_locate.py
+    python bench_locate.py --sizes 1280x800,2560x1440 --repeat 10 --pyautogui
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from template_locator import TemplateLocator
+
+
+def _synthetic_screen(width: int, height: int, seed: int = 0) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    coarse = (rng.random((max(1, height // 8), max(1, width // 8))) * 255).astype(np.uint8)
+    return Image.fromarray(coarse).resize((width, height), Image.BILINEAR).convert("RGB")
+
+
+def _median_ms(func: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def _parse_sizes(value: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for item in value.split(","):
+        w, h = item.lower().split("x")
+        sizes.append((int(w), int(h)))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка поиска по шаблону vs размер экрана")
+    parser.add_argument("--sizes", default="800x600,1280x800,1920x1080,2560x1440,3840x2160",
+                        help="размеры экрана через запятую")
+    parser.add_argument("--template", default="96x32", help="размер шаблона")
+    parser.add_argument("--repeat", type=int, default=5, help="число замеров (берётся медиана)")
+    parser.add_argument("--pyautogui", action="store_true", help="замерить также pyautogui.locate")
+    args = parser.parse_args()
+
+    tw, th = _parse_sizes(args.template)[0]
+
+    print("=" * 60)
+    print("🎯 ПОИСК ПО ШАБЛОНУ: ЗАДЕРЖКА (медиана, мс)")
+    print(f"Шаблон: {tw}x{th}, замеров: {args.repeat}")
+    print("=" * 60)
+    header = f"{'экран':>10} {'полный':>8} {'3 масшт.':>9} {'рядом':>7} {'4 пакет':>8} {'4 по одн.':>10}"
+    if args.pyautogui:
+        header += f" {'pyautogui':>10}"
+    print(header)
+
+    for width, height in _parse_sizes(args.sizes):
+        screen = _synthetic_screen(width, height)
+        boxes = [(width // 5 * (i + 1) - tw // 2, height // 5 * (i + 1) - th // 2) for i in range(4)]
+        templates = {f"t{i}": screen.crop((x, y, x + tw, y + th)) for i, (x, y) in enumerate(boxes)}
+        first = templates["t0"]
+
+        single = TemplateLocator()
+        multi = TemplateLocator(scales=(0.8, 1.0, 1.25))
+        # Прогрев кэша шаблонов, чтобы мерить только поиск
+        single.locate_all(screen, templates)
+        multi.locate(screen, first, "t0")
+
+        def full():
+            single.forget()
+            single.locate(screen, first, "t0")
+
+        def full_multi():
+            multi.forget()
+            multi.locate(screen, first, "t0")
+
+        def near():
+            single.locate(screen, first, "t0")
+
+        def batch():
+            single.forget()
+            single.locate_all(screen, templates)
+
+        def one_by_one():
+            single.forget()
+            for name, template in templates.items():
+                single.locate(screen, template, name)
+
+        found = single.locate(screen, first, "t0")
+        if found is None or (found["x"], found["y"]) != boxes[0]:
+            print(f"⚠️  {width}x{height}: шаблон найден неверно: {found}")
+
+        row = (f"{f'{width}x{height}':>10} {_median_ms(full, args.repeat):8.1f} {_median_ms(full_multi, args.repeat):9.1f} "
+               f"{_median_ms(near, args.repeat):7.1f} {_median_ms(batch, args.repeat):8.1f} "
+               f"{_median_ms(one_by_one, args.repeat):10.1f}")
+        if args.pyautogui:
+            try:
+                import pyautogui
+                row += f" {_median_ms(lambda: pyautogui.locate(first, screen), args.repeat):10.1f}"
+            except Exception as e:
+                row += f" {'н/д':>10}"
+                print(f"⚠️  pyautogui.locate недоступен: {e}")
+        print(row)
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Сравнение памяти и скорости итерации: список словарей vs RowColumns
+
+Примеры:
+    python bench_rows.py            # 200 000 строк
+    python bench_rows.py 500000
+"""
+
+import hashlib
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from row_columns import RowColumns
+
+
+def _make_rows(count: int, seed: int = 42) -> List[Dict]:
+    """Синтетические строки, похожие на реальные (повторяющиеся события и время)"""
+    rng = random.Random(seed)
+    events = ["Buy", "Sell", "@", "®", "CA @", "Transfer #1", "Deposit", "Withdraw"]
+    rows = []
+    for i in range(count):
+        hour, minute = rng.randint(1, 12), rng.randint(0, 59)
+        time_str = f"{hour}:{minute:02d} {rng.choice(['AM', 'PM'])}"
+        amount = round(rng.uniform(0, 50000), 2)
+        # Строки создаются заново, как после json.loads — без общих объектов
+        rows.append({
+            "event": "".join(rng.choice(events)),
+            "time": time_str,
+            "amount": amount,
+            "unique_id": hashlib.md5(f"{time_str}|{amount:.2f}|{i}".encode()).hexdigest(),
+        })
+    return rows
+
+
+def _measure(build: Callable[[], object]) -> Tuple[object, int]:
+    """Построить объект и вернуть (объект, байт выделено)"""
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def _timeit(func: Callable[[], object], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    print("=" * 60)
+    print(f"📊 БЕНЧМАРК ХРАНЕНИЯ СТРОК ({count:,} строк)")
+    print("=" * 60)
+
+    source = _make_rows(count)
+    dict_rows, dict_bytes = _measure(lambda: _make_rows(count))
+    columns, column_bytes = _measure(lambda: RowColumns(source))
+
+    print(f"\nПамять:")
+    print(f"  список словарей: {dict_bytes / 1024 / 1024:8.1f} MB ({dict_bytes / count:6.1f} байт/строка)")
+    print(f"  RowColumns:      {column_bytes / 1024 / 1024:8.1f} MB ({column_bytes / count:6.1f} байт/строка)")
+    print(f"  memory_footprint(): {columns.memory_footprint() / 1024 / 1024:.1f} MB")
+
+    print(f"\nИтерация (сумма amount, лучшая из 3):")
+    t_dicts = _timeit(lambda: sum(row["amount"] for row in dict_rows))
+    t_columns_rows = _timeit(lambda: sum(row["amount"] for row in columns))
+    t_columns_col = _timeit(lambda: sum(columns.amounts()))
+    print(f"  список словарей:          {t_dicts * 1000:8.1f} мс")
+    print(f"  RowColumns (словари):     {t_columns_rows * 1000:8.1f} мс")
+    print(f"  RowColumns (колонка сумм): {t_columns_col * 1000:7.1f} мс")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Замер времени запуска точек входа (аналог `python -X importtime`)
+
+Для каждого модуля запускается отдельный интерпретатор с `-X importtime`,
+из вывода берутся суммарное время импорта и самые тяжёлые импорты.
+
+Примеры:
+    python bench_startup.py
+    python bench_startup.py automation mouse_watchdog --top 15 --repeat 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_DIR = Path(__file__).resolve().parent
+
+# Точки входа: модуль и код, который выполняется при «коротком» запуске
+ENTRY_POINTS: Dict[str, str] = {
+    "automation": "import automation; automation.MouseAutomation()",
+    "scan_and_parse": "import scan_and_parse",
+    "mouse_watchdog": "import mouse_watchdog",
+    "watchdog_coordinator": "import watchdog_coordinator",
+    "row_store": "import row_store",
+    "notify_outbox": "import notify_outbox",
+    "scan_client": "import scan_client",
+    "async_automation": "import async_automation; async_automation.AsyncMouseAutomation()",
+}
+
+
+def _run_importtime(code: str) -> Tuple[float, List[Tuple[int, int, str]], str]:
+    """
+    Запустить код в новом интерпретаторе с -X importtime.
+
+    Returns:
+        (время работы процесса в секундах, [(self_us, cumulative_us, модуль)], текст ошибки)
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=str(PROJECT_DIR), capture_output=True, text=True)
+    wall = time.perf_counter() - start
+
+    imports = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # заголовок таблицы
+        # Первый пробел — разделитель, остальные — отступ вложенного импорта
+        imports.append((int(parts[0]), int(parts[1]), parts[2][1:].rstrip()))
+    error = "\n".join(errors[-3:]) if proc.returncode != 0 else ""
+    return wall, imports, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска точек входа")
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS),
+                        help=f"точки входа (по умолчанию все: {', '.join(ENTRY_POINTS)})")
+    parser.add_argument("--top", type=int, default=10, help="сколько самых тяжёлых импортов показать")
+    parser.add_argument("--repeat", type=int, default=3, help="число запусков (берётся медиана)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  ВРЕМЯ ЗАПУСКА ТОЧЕК ВХОДА")
+    print("=" * 60)
+
+    baseline_runs = [_run_importtime("pass") for _ in range(args.repeat)]
+    baseline = statistics.median(run[0] for run in baseline_runs)
+    # Модули, которые импортирует сам интерпретатор при старте (site, .pth-файлы), не учитываем
+    startup_modules = {imp[2] for imp in baseline_runs[-1][1]}
+    print(f"Пустой интерпретатор: {baseline * 1000:.1f} мс\n")
+
+    for name in args.modules:
+        code = ENTRY_POINTS.get(name, f"import {name}")
+        runs = [_run_importtime(code) for _ in range(args.repeat)]
+        wall = statistics.median(run[0] for run in runs)
+        _, imports, error = runs[-1]
+        imports = [imp for imp in imports if imp[2] not in startup_modules]
+
+        # Модули верхнего уровня (без отступа) — их cumulative суммируется без двойного счёта
+        top_level = [imp for imp in imports if not imp[2].startswith(" ")]
+        total_import_us = sum(imp[1] for imp in top_level)
+
+        print(f"📦 {name}")
+        print(f"   процесс: {wall * 1000:.1f} мс (сверх пустого: {(wall - baseline) * 1000:+.1f} мс), "
+              f"импорты: {total_import_us / 1000:.1f} мс")
+        if error:
+            print(f"   ❌ ошибка запуска:\n      " + error.replace("\n", "\n      "))
+        heaviest = sorted(imports, key=lambda imp: imp[1], reverse=True)[:args.top]
+        for self_us, cumulative_us, module in heaviest:
+            print(f"   {cumulative_us / 1000:8.1f} мс (сам {self_us / 1000:6.1f})  {module.strip()}")
+        print()
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Пакетное распознавание сохранённых скриншотов (без MouseAutomation и без экрана)
+
+Обходит каталоги (рекурсивно) и шаблоны путей, распознаёт изображения в пуле
+процессов и пишет по одной записи JSONL на файл сразу по готовности:
+
+- text — текст tesseract (как ocr_from_file(..., 'tesseract'));
+- rows — строки таблицы (как в mouse_watchdog._extract_table_rows_from_image);
+- both — и то и другое.
+
+Повторный запуск с тем же --output продолжает с места остановки: файлы, для которых
+уже есть успешная запись с теми же параметрами, пропускаются. Совпадение ищется
+сначала по пути, размеру и времени изменения, затем по SHA-1 содержимого — копия
+или переименованный файл получают готовый результат без OCR. Результаты других
+прогонов можно подключить через --cache. Записи с ошибкой при повторе распознаются заново.
+
+Примеры:
+    python bulk_ocr.py screens/ --output screens.jsonl
+    python bulk_ocr.py "archive/**/*.png" --mode rows --workers 8 -o rows.jsonl
+    python bulk_ocr.py screens/ -o new.jsonl --cache old.jsonl --lang eng
+"""
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from glyph_ocr import GlyphMatcher
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+MODES = ("text", "rows", "both")
+DEFAULT_OUTPUT = "bulk_ocr.jsonl"
+
+
+def iter_images(sources: Iterable[str]) -> List[Path]:
+    """
+    Файлы изображений из каталогов (рекурсивно), отдельных файлов и шаблонов glob.
+    Без повторов, в порядке сортировки путей.
+    """
+    found = set()
+    for source in sources:
+        if glob.has_magic(source):
+            candidates = [Path(p) for p in glob.glob(source, recursive=True)]
+        else:
+            path = Path(source)
+            if not path.exists():
+                raise FileNotFoundError(f"Нет такого файла или каталога: {source}")
+            candidates = list(path.rglob("*")) if path.is_dir() else [path]
+        for path in candidates:
+            if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES:
+                found.add(path)
+    return sorted(found)
+
+
+def file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _options_key(mode: str, lang: Optional[str], glyphs: Optional[str] = None) -> str:
+    """
+    Параметры, от которых зависит результат: записи с другими параметрами не переиспользуются.
+    glyphs — хеш шаблонов глифов, которыми читались строки (режимы rows и both).
+    """
+    return f"{mode}:{lang or 'auto'}" + (f":glyphs={glyphs}" if glyphs else "")
+
+
+def _frozen_glyphs(mode: str) -> Optional["GlyphMatcher"]:
+    """
+    Шаблоны глифов, которыми будут читаться строки (режимы rows и both), или None.
+    Процессы пула получают их снимок только для чтения (_init_worker): они не
+    обучаются, не перезаписывают общий glyphs.npz, и весь прогон читается одними
+    и теми же шаблонами — их хеш входит в параметры записи.
+    """
+    if mode == "text":
+        return None
+    from glyph_ocr import GlyphMatcher
+    from mouse_watchdog import GLYPHS_ENV, GLYPHS_FILE
+
+    path = os.environ.get(GLYPHS_ENV, str(GLYPHS_FILE))
+    if path == "0":
+        return None
+    return GlyphMatcher(path, frozen=True)
+
+
+def load_results(paths: Iterable[Path]) -> Tuple[Dict[Tuple, Dict], Dict[Tuple, Dict]]:
+    """
+    Успешные записи из файлов JSONL.
+    Битые строки (например, оборванные при прерывании) пропускаются.
+
+    Returns:
+        (по (путь, размер, mtime, параметры), по (sha1, параметры))
+    """
+    by_file: Dict[Tuple, Dict] = {}
+    by_hash: Dict[Tuple, Dict] = {}
+    for path in paths:
+        if not path.exists():
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict) or record.get("error") or "sha1" not in record:
+                    continue
+                options = record.get("options")
+                by_file[(record.get("path"), record.get("size"), record.get("mtime"), options)] = record
+                by_hash[(record["sha1"], options)] = record
+    return by_file, by_hash
+
+
+def _init_worker(glyphs: Optional[str]) -> None:
+    # Ctrl+C обрабатывает родительский процесс; tesseract в каждом процессе — в один поток,
+    # параллельность даёт сам пул
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    if glyphs is not None:
+        # Снимок шаблонов глифов только для чтения (см. _frozen_glyphs)
+        from mouse_watchdog import GLYPHS_ENV, GLYPHS_FROZEN_ENV
+        os.environ[GLYPHS_ENV] = glyphs
+        os.environ[GLYPHS_FROZEN_ENV] = "1"
+
+
+def _ocr_file(path: str, mode: str, lang: Optional[str]) -> Dict:
+    """Распознать один файл (выполняется в процессе пула)"""
+    from PIL import Image
+
+    started = time.perf_counter()
+    result = {"text": None, "rows": None, "error": None}
+    try:
+        # Функции распознавания печатают ход работы; в пакете это шум
+        with redirect_stdout(io.StringIO()), Image.open(path) as image:
+            image.load()
+            if mode in ("text", "both"):
+                from automation import tesseract_text
+                result["text"] = tesseract_text(image, lang)
+            if mode in ("rows", "both"):
+                from mouse_watchdog import _extract_table_rows_from_image
+                # Ошибка tesseract — ошибка записи, а не пустой список строк: иначе
+                # повторный запуск и --cache навсегда приняли бы его за готовый результат
+                result["rows"] = _extract_table_rows_from_image(image.convert("RGB"), raise_errors=True)
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+class _JsonlWriter:
+    """Дозапись JSONL с flush после каждой записи"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Если прошлый прогон оборвался посреди строки, начинаем с новой
+        broken = False
+        if path.exists() and path.stat().st_size > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                broken = f.read(1) != b"\n"
+        self._file = open(path, "a", encoding="utf-8")
+        if broken:
+            self._file.write("\n")
+
+    def write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def bulk_ocr(sources: List[str], output: str = DEFAULT_OUTPUT, mode: str = "text",
+             lang: Optional[str] = None, workers: Optional[int] = None,
+             cache: Iterable[str] = ()) -> Dict[str, int]:
+    """
+    Распознать все изображения из sources и дописать результаты в output (JSONL).
+
+    Запись: {"path", "size", "mtime", "sha1", "options", "text", "rows",
+             "seconds", "error", "cached"}. В режимах rows и both options включает
+    хеш шаблонов глифов: после их дообучения строки распознаются заново.
+
+    Returns:
+        Счётчики: total, skipped, cached, done, errors, interrupted
+    """
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный режим: {mode} (возможны: {', '.join(MODES)})")
+    workers = max(1, workers or os.cpu_count() or 1)
+    glyphs = _frozen_glyphs(mode)
+    options = _options_key(mode, lang, glyphs.fingerprint() if glyphs is not None else None)
+    output_path = Path(output)
+    by_file, by_hash = load_results([output_path] + [Path(p) for p in cache])
+    images = iter_images(sources)
+    counts = {"total": len(images), "skipped": 0, "cached": 0, "done": 0, "errors": 0, "interrupted": 0}
+
+    print(f"📂 Файлов: {len(images)}, режим: {mode}, процессов: {workers}, результаты: {output_path}")
+    writer = _JsonlWriter(output_path)
+    started = time.perf_counter()
+
+    def jobs() -> Iterator[Dict]:
+        """Записи для файлов без готового результата (готовые записываются сразу)"""
+        for path in images:
+            stat = path.stat()
+            record = {"path": str(path), "size": stat.st_size, "mtime": stat.st_mtime_ns,
+                      "sha1": None, "options": options}
+            if (record["path"], record["size"], record["mtime"], options) in by_file:
+                counts["skipped"] += 1
+                continue
+            record["sha1"] = file_sha1(path)
+            known = by_hash.get((record["sha1"], options))
+            if known is not None:
+                # То же содержимое под другим путём (или файл переписан без изменений)
+                record.update({"text": known.get("text"), "rows": known.get("rows"),
+                               "seconds": 0.0, "error": None, "cached": True})
+                writer.write(record)
+                by_file[(record["path"], record["size"], record["mtime"], options)] = record
+                counts["cached"] += 1
+                continue
+            yield record
+
+    def finish(record: Dict, result: Dict) -> None:
+        record.update(result, cached=False)
+        writer.write(record)
+        if record["error"]:
+            counts["errors"] += 1
+            print(f"❌ {record['path']}: {record['error']}")
+            return
+        counts["done"] += 1
+        # Дубликаты внутри одного прогона тоже не распознаются повторно
+        by_hash[(record["sha1"], options)] = record
+        processed = counts["done"] + counts["errors"]
+        if processed % 50 == 0:
+            elapsed = time.perf_counter() - started
+            print(f"   распознано {processed}, {processed / elapsed:.1f} файл/с")
+
+    # Не больше двух файлов в очереди на процесс: результаты пишутся по мере готовности,
+    # а хеши считаются не намного раньше, чем понадобятся
+    max_in_flight = workers * 2
+    pending = {}
+    waiting: List[Dict] = []
+
+    # Ctrl+C не прерывает ожидание внутри пула (после этого пул не закрывается),
+    # а только просит остановиться: уже запущенные файлы дораспознаются и записываются
+    stop = threading.Event()
+    previous_handler = None
+    if threading.current_thread() is threading.main_thread():
+        previous_handler = signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    def collect(limit: int) -> None:
+        while len(pending) > limit and not stop.is_set():
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                finish(pending.pop(future), future.result())
+
+    snapshot = None
+    if glyphs is not None:
+        fd, snapshot = tempfile.mkstemp(prefix="bulk_ocr_glyphs_", suffix=".npz")
+        os.close(fd)
+        glyphs.save(snapshot)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(snapshot,))
+    try:
+        for record in jobs():
+            if stop.is_set():
+                break
+            # Тот же хеш уже распознаётся — результат будет взят из него
+            if any(r["sha1"] == record["sha1"] for r in pending.values()):
+                waiting.append(record)
+                continue
+            pending[pool.submit(_ocr_file, record["path"], mode, lang)] = record
+            collect(max_in_flight - 1)
+        collect(0)
+    finally:
+        if stop.is_set():
+            print("\n⏹️  Прервано: дожидаюсь запущенных файлов, остальные будут распознаны при следующем запуске")
+        pool.shutdown(wait=True, cancel_futures=True)
+        if snapshot is not None:
+            os.unlink(snapshot)
+        if previous_handler is not None:
+            signal.signal(signal.SIGINT, previous_handler)
+    for future, record in pending.items():
+        if future.done() and not future.cancelled():
+            finish(record, future.result())
+        else:
+            counts["interrupted"] += 1
+    counts["interrupted"] += len(waiting) if stop.is_set() else 0
+
+    if not stop.is_set():
+        for record in waiting:
+            known = by_hash.get((record["sha1"], options))
+            if known is None:
+                # Первый экземпляр не распознался — ошибку покажет следующий запуск
+                continue
+            record.update({"text": known.get("text"), "rows": known.get("rows"),
+                           "seconds": 0.0, "error": None, "cached": True})
+            writer.write(record)
+            counts["cached"] += 1
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Готово за {elapsed:.1f} c: распознано {counts['done']}, из кэша {counts['cached']}, "
+          f"пропущено {counts['skipped']}, ошибок {counts['errors']}"
+          + (f", не успели {counts['interrupted']}" if counts["interrupted"] else ""))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетное распознавание сохранённых скриншотов в JSONL")
+    parser.add_argument("sources", nargs="+", help="каталоги, файлы или шаблоны (\"screens/**/*.png\")")
+    parser.add_argument("--output", "-o", default=DEFAULT_OUTPUT,
+                        help=f"файл JSONL с результатами, дописывается (по умолчанию {DEFAULT_OUTPUT})")
+    parser.add_argument("--mode", choices=MODES, default="text",
+                        help="text — текст, rows — строки таблицы, both — и то и другое")
+    parser.add_argument("--lang", default=None,
+                        help="язык tesseract (по умолчанию rus, при отсутствии — eng)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию — число ядер)")
+    parser.add_argument("--cache", action="append", default=[],
+                        help="JSONL прошлых прогонов, из которого брать готовые результаты (можно несколько раз)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗂️  ПАКЕТНОЕ РАСПОЗНАВАНИЕ СКРИНШОТОВ")
+    print("=" * 60)
+    try:
+        counts = bulk_ocr(args.sources, args.output, args.mode, args.lang, args.workers, args.cache)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(1 if counts["errors"] or counts["interrupted"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Кольцевой буфер последних кадров с ограничением по памяти
+
+Кадры уменьшаются и хранятся сжатыми (zlib): ключевой кадр целиком, а следующие
+за ним — как XOR с предыдущим кадром. Соседние скриншоты почти одинаковы,
+поэтому XOR состоит в основном из нулей и сжимается в десятки раз.
+
+Память ограничивается бюджетом в байтах, а не числом кадров: при превышении
+удаляются самые старые кадры (если удаляется ключевой кадр, следующий за ним
+XOR-кадр пересобирается в ключевой).
+
+Когда срабатывает оповещение, из буфера можно собрать «кадры до события»:
+картинку-раскадровку (strip) или анимированный GIF.
+"""
+
+import time
+import zlib
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_BUDGET = 8 * 1024 * 1024
+
+
+class _Frame:
+    """Сжатый кадр: ключевой (raw) или XOR с предыдущим"""
+
+    __slots__ = ("timestamp", "keyframe", "shape", "data")
+
+    def __init__(self, timestamp: float, keyframe: bool, shape: Tuple[int, ...], data: bytes):
+        self.timestamp = timestamp
+        self.keyframe = keyframe
+        self.shape = shape
+        self.data = data
+
+
+class FrameRing:
+    """Последние кадры в пределах бюджета памяти"""
+
+    def __init__(self, byte_budget: int = DEFAULT_BUDGET,
+                 scale: int = 4,
+                 keyframe_interval: int = 30,
+                 compress_level: int = 1):
+        """
+        Args:
+            byte_budget: Максимальный объём сжатых кадров, в байтах
+            scale: Во сколько раз уменьшать кадры
+            keyframe_interval: Ключевой кадр не реже, чем каждые N кадров
+                               (ограничивает работу по восстановлению кадра)
+            compress_level: Уровень zlib (1 — быстро, 9 — плотнее)
+        """
+        self.byte_budget = byte_budget
+        self.scale = max(1, scale)
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.compress_level = compress_level
+        self._frames: Deque[_Frame] = deque()
+        self._bytes = 0
+        self._last: Optional[np.ndarray] = None
+        self._since_keyframe = 0
+
+    def add(self, image, timestamp: Optional[float] = None) -> None:
+        """Добавить кадр (PIL.Image); старые кадры вытесняются по бюджету"""
+        if timestamp is None:
+            timestamp = time.time()
+        small = image.convert("RGB")
+        if self.scale > 1:
+            small = small.reduce(self.scale)
+        array = np.asarray(small, dtype=np.uint8)
+
+        if (self._last is None or self._last.shape != array.shape
+                or self._since_keyframe >= self.keyframe_interval - 1):
+            frame = _Frame(timestamp, True, array.shape, zlib.compress(array.tobytes(), self.compress_level))
+            self._since_keyframe = 0
+        else:
+            delta = np.bitwise_xor(array, self._last)
+            frame = _Frame(timestamp, False, array.shape, zlib.compress(delta.tobytes(), self.compress_level))
+            self._since_keyframe += 1
+
+        self._last = array
+        self._frames.append(frame)
+        self._bytes += len(frame.data)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.byte_budget and len(self._frames) > 1:
+            oldest = self._frames.popleft()
+            self._bytes -= len(oldest.data)
+            following = self._frames[0]
+            if oldest.keyframe and not following.keyframe:
+                # Следующий кадр хранился как XOR со старым — делаем его ключевым
+                base = np.frombuffer(zlib.decompress(oldest.data), dtype=np.uint8).reshape(oldest.shape)
+                delta = np.frombuffer(zlib.decompress(following.data), dtype=np.uint8).reshape(following.shape)
+                rebuilt = zlib.compress(np.bitwise_xor(base, delta).tobytes(), self.compress_level)
+                self._bytes += len(rebuilt) - len(following.data)
+                self._frames[0] = _Frame(following.timestamp, True, following.shape, rebuilt)
+        if not self._frames:
+            self._last = None
+
+    def frames(self, count: Optional[int] = None, since: Optional[float] = None) -> List[Tuple[float, object]]:
+        """
+        Восстановить кадры (от старых к новым).
+
+        Args:
+            count: Сколько последних кадров вернуть (None — все)
+            since: Только кадры не старше этого времени (time.time())
+
+        Returns:
+            [(timestamp, PIL.Image), ...]
+        """
+        from PIL import Image
+
+        result = []
+        current = None
+        for frame in self._frames:
+            data = np.frombuffer(zlib.decompress(frame.data), dtype=np.uint8).reshape(frame.shape)
+            current = data if frame.keyframe else np.bitwise_xor(current, data)
+            if since is None or frame.timestamp >= since:
+                result.append((frame.timestamp, current))
+        if count is not None:
+            result = result[-count:] if count > 0 else []
+        return [(ts, Image.fromarray(array)) for ts, array in result]
+
+    def strip(self, count: int = 8, columns: int = 4):
+        """
+        Раскадровка последних кадров: сетка с подписями «-N c».
+
+        Returns:
+            PIL.Image или None, если кадров нет
+        """
+        from PIL import Image, ImageDraw
+
+        frames = self.frames(count)
+        if not frames:
+            return None
+        last_ts = frames[-1][0]
+        w, h = frames[-1][1].size
+        columns = max(1, min(columns, len(frames)))
+        rows = (len(frames) + columns - 1) // columns
+        sheet = Image.new("RGB", (columns * w, rows * h), "black")
+        draw = ImageDraw.Draw(sheet)
+        for i, (ts, image) in enumerate(frames):
+            x, y = (i % columns) * w, (i // columns) * h
+            sheet.paste(image.resize((w, h)) if image.size != (w, h) else image, (x, y))
+            label = "сейчас" if ts == last_ts else f"-{last_ts - ts:.0f} c"
+            draw.rectangle((x, y, x + 7 * len(label) + 6, y + 14), fill="black")
+            draw.text((x + 3, y + 2), label, fill="yellow")
+        return sheet
+
+    def save_strip(self, path, count: int = 8, columns: int = 4) -> Optional[str]:
+        """
+        Сохранить раскадровку последних кадров (см. strip).
+
+        Returns:
+            Путь к файлу или None, если кадров нет
+        """
+        sheet = self.strip(count, columns)
+        if sheet is None:
+            return None
+        sheet.save(str(path))
+        return str(path)
+
+    def save_gif(self, path, count: int = 8, frame_ms: int = 400) -> Optional[str]:
+        """
+        Сохранить последние кадры как анимированный GIF (последний кадр показывается дольше).
+
+        Returns:
+            Путь к файлу или None, если кадров нет
+        """
+        frames = self.frames(count)
+        if not frames:
+            return None
+        images = [image for _, image in frames]
+        durations = [frame_ms] * (len(images) - 1) + [frame_ms * 4]
+        images[0].save(str(path), save_all=True, append_images=images[1:], duration=durations, loop=0)
+        return str(path)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def nbytes(self) -> int:
+        """Объём сжатых кадров в буфере, в байтах"""
+        return self._bytes
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Индекс почти-дубликатов строк таблицы
+
+`unique_id` строки строится из точных времени и суммы, поэтому одна ошибка OCR
+(4999.99 vs 4999.90, потерянное время, искажённое событие) даёт «новую» строку
+и повторное оповещение. Индекс отвечает на вопрос «видели ли мы что-то похожее?»:
+
+- строки разложены по областям и корзинам времени (минута дня // окно);
+- в каждой корзине суммы хранятся отсортированными, кандидаты в пределах
+  допуска находятся через bisect за O(log n);
+- у кандидатов сравниваются время (с учётом перехода через полночь)
+  и текст события (нормированное расстояние Левенштейна);
+- в таблице только время суток, поэтому совпадение по времени засчитывается лишь
+  со строками, замеченными за последние recent_horizon секунд: та же сумма в то же
+  время на следующий день — новая строка. Строка, которая всё ещё видна на экране,
+  остаётся «свежей»: find_similar обновляет время, когда её заметили;
+- записи, которые уже ни с чем не могут совпасть (старше max_age), удаляются,
+  чтобы индекс за долгую работу не рос без предела (см. prune).
+"""
+
+import re
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from row_store import DEFAULT_REGION
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*(AM|PM)\s*$", re.IGNORECASE)
+
+MINUTES_PER_DAY = 24 * 60
+
+# Сколько раз за max_age индекс проверяет, не пора ли удалить старые записи
+PRUNE_STEPS = 24
+
+
+def parse_minute_of_day(time_str: str) -> Optional[int]:
+    """Перевести время вида "8:01 PM" в минуту суток (None, если время не распознано)"""
+    match = _TIME_RE.match(time_str or "")
+    if not match:
+        return None
+    hours, minutes, suffix = int(match.group(1)), int(match.group(2)), match.group(3).upper()
+    if not (1 <= hours <= 12 and minutes < 60):
+        return None
+    hours %= 12
+    if suffix == "PM":
+        hours += 12
+    return hours * 60 + minutes
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """
+    Расстояние Левенштейна между строками.
+    Если задан `limit`, расчёт прерывается, как только расстояние заведомо больше limit.
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class NearDuplicateIndex:
+    """Индекс строк для поиска почти-дубликатов с допусками на ошибки OCR"""
+
+    def __init__(self,
+                 amount_tolerance: float = 0.1,
+                 time_window_minutes: int = 2,
+                 max_event_distance: float = 0.34,
+                 missing_time_horizon: float = 900.0,
+                 recent_horizon: float = 2 * 3600.0,
+                 max_age: Optional[float] = None):
+        """
+        Args:
+            amount_tolerance: Допустимая разница сумм (абсолютная)
+            time_window_minutes: Допустимая разница времени строк, в минутах
+            max_event_distance: Допустимое расстояние Левенштейна между событиями,
+                                в долях длины более длинного текста
+            missing_time_horizon: Если у одной из строк нет времени или события, она
+                                  сравнивается только со строками, замеченными за последние N секунд
+            recent_horizon: Строки с временем совпадают только со строками, замеченными
+                            за последние N секунд (время суток повторяется каждый день)
+            max_age: Сколько секунд помнить строку; None — пока она может с чем-то
+                     совпасть (большее из recent_horizon и missing_time_horizon).
+                     Старые записи удаляются из add() примерно раз в max_age / PRUNE_STEPS секунд
+        """
+        self.amount_tolerance = amount_tolerance
+        self.time_window = max(1, int(time_window_minutes))
+        self.max_event_distance = max_event_distance
+        self.missing_time_horizon = missing_time_horizon
+        self.recent_horizon = recent_horizon
+        # (область, корзина времени или None) -> отсортированные суммы и параллельный список записей
+        self._amounts: Dict[Tuple[str, Optional[int]], List[float]] = {}
+        # Запись: (минута суток, событие, когда замечена, время как строка) — без ссылки
+        # на сам словарь строки, чтобы индекс не удерживал в памяти всю историю
+        self._entries: Dict[Tuple[str, Optional[int]], List[Tuple[Optional[int], str, float, str]]] = {}
+        self._buckets_by_region: Dict[str, set] = {}
+        self._size = 0
+        self.max_age = max_age if max_age is not None else max(recent_horizon, missing_time_horizon)
+        self._pruned_at = time.time()
+
+    def _bucket(self, minute: Optional[int]) -> Optional[int]:
+        return None if minute is None else minute // self.time_window
+
+    def add(self, row: Dict, seen_at: Optional[float] = None) -> None:
+        """
+        Добавить строку в индекс.
+
+        Args:
+            row: Строка таблицы (event, time, amount, region)
+            seen_at: Когда строка была замечена (time.time()); по умолчанию row["captured_at"] или сейчас
+        """
+        if seen_at is None:
+            seen_at = row.get("captured_at", time.time())
+        region = row.get("region", DEFAULT_REGION)
+        minute = parse_minute_of_day(row.get("time", ""))
+        key = (region, self._bucket(minute))
+
+        amounts = self._amounts.setdefault(key, [])
+        entries = self._entries.setdefault(key, [])
+        pos = bisect_right(amounts, row["amount"])
+        amounts.insert(pos, row["amount"])
+        event = sys.intern((row.get("event") or "").strip())
+        entries.insert(pos, (minute, event, seen_at, sys.intern(row.get("time", ""))))
+        self._buckets_by_region.setdefault(region, set()).add(key[1])
+        self._size += 1
+
+        now = time.time()
+        if now - self._pruned_at >= self.max_age / PRUNE_STEPS:
+            self.prune(now - self.max_age)
+
+    def prune(self, older_than: float) -> int:
+        """
+        Удалить записи, замеченные раньше older_than (time.time()).
+
+        Returns:
+            Сколько записей удалено
+        """
+        self._pruned_at = time.time()
+        removed = 0
+        for key in list(self._entries):
+            entries = self._entries[key]
+            keep = [i for i, entry in enumerate(entries) if entry[2] >= older_than]
+            if len(keep) == len(entries):
+                continue
+            removed += len(entries) - len(keep)
+            if keep:
+                amounts = self._amounts[key]
+                self._amounts[key] = [amounts[i] for i in keep]
+                self._entries[key] = [entries[i] for i in keep]
+            else:
+                del self._amounts[key], self._entries[key]
+                buckets = self._buckets_by_region[key[0]]
+                buckets.discard(key[1])
+                if not buckets:
+                    del self._buckets_by_region[key[0]]
+        self._size -= removed
+        return removed
+
+    def _candidate_buckets(self, region: str, minute: Optional[int]) -> List[Optional[int]]:
+        if minute is None:
+            # Время не распознано — подходит любая корзина области
+            return list(self._buckets_by_region.get(region, ()))
+        bucket = self._bucket(minute)
+        last_bucket = (MINUTES_PER_DAY - 1) // self.time_window
+        neighbours = {bucket - 1, bucket, bucket + 1}
+        # Переход через полночь
+        if bucket == 0:
+            neighbours.add(last_bucket)
+        if bucket == last_bucket:
+            neighbours.add(0)
+        neighbours.add(None)
+        return [b for b in neighbours if b is None or 0 <= b <= last_bucket]
+
+    def _time_matches(self, a: Optional[int], b: Optional[int]) -> bool:
+        diff = abs(a - b)
+        return min(diff, MINUTES_PER_DAY - diff) <= self.time_window
+
+    def _event_matches(self, a: str, b: str) -> bool:
+        limit = int(max(len(a), len(b)) * self.max_event_distance)
+        return edit_distance(a, b, limit) <= limit
+
+    def find_similar(self, row: Dict, now: Optional[float] = None) -> Optional[Dict]:
+        """
+        Найти в индексе строку, похожую на `row`. Найденная запись считается
+        замеченной снова (в `now`): строка, которая не уходит с экрана, не устаревает.
+
+        Returns:
+            Похожая строка (словарь с event, time, amount) или None
+        """
+        if now is None:
+            now = time.time()
+        region = row.get("region", DEFAULT_REGION)
+        minute = parse_minute_of_day(row.get("time", ""))
+        event = (row.get("event") or "").strip()
+        low = row["amount"] - self.amount_tolerance
+        high = row["amount"] + self.amount_tolerance
+
+        for bucket in self._candidate_buckets(region, minute):
+            key = (region, bucket)
+            amounts = self._amounts.get(key)
+            if not amounts:
+                continue
+            entries = self._entries[key]
+            for pos in range(bisect_left(amounts, low), bisect_right(amounts, high)):
+                other_minute, other_event, seen_at, other_time = entries[pos]
+                age = now - seen_at
+                if minute is None or other_minute is None:
+                    if age > self.missing_time_horizon:
+                        continue
+                elif age > self.recent_horizon or not self._time_matches(minute, other_minute):
+                    continue
+                if not event or not other_event:
+                    # Пустое событие — ошибка OCR, а не «любое событие»: только для недавних строк
+                    if age > self.missing_time_horizon:
+                        continue
+                elif not self._event_matches(event, other_event):
+                    continue
+                entries[pos] = (other_minute, other_event, max(seen_at, now), other_time)
+                return {"event": other_event, "time": other_time, "amount": amounts[pos]}
+        return None
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Распознавание ячеек сумм и времени сопоставлением глифов с шаблонами
+
+Суммы и время в таблице набраны одним шрифтом интерфейса из маленького алфавита
+(цифры, "$", ",", ".", ":", AM/PM), и запускать на них tesseract — дорого.
+GlyphMatcher:
+
+- бинаризует ячейку (фон — медиана краёв) и режет её на глифы по пустым столбцам;
+- приводит каждый глиф к размеру GLYPH_SIZE в полосе высоты строки (положение
+  по вертикали сохраняется: "," и "." отличаются от цифр) и сравнивает сразу со
+  всеми шаблонами одной операцией NumPy (среднее абсолютное отличие + ширина);
+- считает глиф узнанным, только если лучший шаблон достаточно близок и заметно
+  лучше лучшего шаблона другого символа; иначе ячейка «не уверена» и читается
+  tesseract (см. mouse_watchdog._read_cell).
+
+Шаблоны не рисуются вручную: learn() собирает глифы ячеек, которые tesseract
+прочитал уверенно. Один образец ничего не меняет: новое начертание становится
+шаблоном, только когда CONFIRMATIONS похожих образцов подписаны одним и тем же
+символом; образец, похожий на другой символ, отбрасывается. Так единичная ошибка
+tesseract не попадает в шаблоны. Шаблоны хранятся в .npz и переживают перезапуск;
+ошибочные можно удалить (forget или `python glyph_ocr.py --forget 7`).
+
+Примеры:
+    python glyph_ocr.py                      # число шаблонов по символам
+    python glyph_ocr.py --forget 17          # удалить шаблоны "1" и "7"
+    python glyph_ocr.py --forget all         # начать обучение заново
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+ALPHABET = "$0123456789,.:APM"
+
+# Размер нормализованного глифа (высота, ширина)
+GLYPH_SIZE = (20, 12)
+
+# Сколько разных начертаний одного символа хранить (сглаживание даёт разные пиксели)
+MAX_TEMPLATES = 6
+
+# Глиф ближе этого к шаблону того же символа не добавляется как новый шаблон,
+# а ближе этого к шаблону другого символа — противоречит ему и отбрасывается
+DUPLICATE_DISTANCE = 0.04
+
+# Сколько похожих (ближе CONFIRM_DISTANCE) образцов с одним символом нужно,
+# чтобы новое начертание стало шаблоном, и сколько неподтверждённых держать
+CONFIRMATIONS = 3
+CONFIRM_DISTANCE = 0.06
+MAX_CANDIDATES = 64
+
+# Вес разницы относительной ширины глифа (ширина / высота строки) в расстоянии
+WIDTH_WEIGHT = 0.5
+
+
+def _binarize(image) -> Optional[np.ndarray]:
+    """
+    Маска «чернил» ячейки: пиксели, далёкие от фона (медиана краёв) больше чем
+    на половину максимального отличия. Светлый текст на тёмном фоне тоже подходит.
+    None — в ячейке нет текста.
+    """
+    if isinstance(image, np.ndarray):
+        gray = image.astype(np.float32)
+        if gray.ndim == 3:
+            gray = gray[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    else:
+        gray = np.asarray(image.convert("L"), dtype=np.float32)
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return None
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    diff = np.abs(gray - np.median(border))
+    contrast = float(diff.max())
+    if contrast < 40:
+        return None
+    return diff > contrast * 0.5
+
+
+def ink_bands(image, min_height: int = 3) -> List[Tuple[int, int]]:
+    """
+    Строки текста в полосе (например, в колонке таблицы): диапазоны [top, bottom)
+    подряд идущих строк пикселей с «чернилами». Полосы ниже min_height (линии
+    сетки, шум) пропускаются.
+    """
+    ink = _binarize(image)
+    if ink is None:
+        return []
+    rows = np.concatenate([[False], ink.any(axis=1), [False]]).astype(np.int8)
+    edges = np.flatnonzero(np.diff(rows))
+    return [(int(top), int(bottom)) for top, bottom in zip(edges[0::2], edges[1::2])
+            if bottom - top >= min_height]
+
+
+def segment(image) -> Tuple[List[np.ndarray], List[float]]:
+    """
+    Разрезать ячейку на глифы.
+
+    Returns:
+        (нормализованные глифы float32 формы GLYPH_SIZE,
+         ширина каждого глифа относительно высоты строки)
+    """
+    from PIL import Image
+
+    ink = _binarize(image)
+    if ink is None:
+        return [], []
+    rows = np.flatnonzero(ink.any(axis=1))
+    top, bottom = int(rows[0]), int(rows[-1]) + 1
+    band = ink[top:bottom]
+    height = bottom - top
+
+    # Границы глифов — переходы между пустыми и непустыми столбцами
+    columns = np.concatenate([[False], band.any(axis=0), [False]]).astype(np.int8)
+    edges = np.flatnonzero(np.diff(columns))
+    starts, ends = edges[0::2], edges[1::2]
+
+    glyphs, widths = [], []
+    for start, end in zip(starts, ends):
+        crop = Image.fromarray((band[:, start:end] * 255).astype(np.uint8))
+        crop = crop.resize((GLYPH_SIZE[1], GLYPH_SIZE[0]), Image.BILINEAR)
+        glyphs.append(np.asarray(crop, dtype=np.float32) / 255.0)
+        widths.append((end - start) / height)
+    return glyphs, widths
+
+
+class GlyphMatcher:
+    """Набор шаблонов глифов и распознавание ячеек по нему"""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None,
+                 max_distance: float = 0.15,
+                 min_margin: float = 0.05,
+                 frozen: bool = False):
+        """
+        Args:
+            path: Файл .npz с шаблонами (загружается, если существует; сохраняется при обучении)
+            max_distance: Глиф дальше этого от лучшего шаблона не узнан
+            min_margin: Насколько лучший шаблон должен быть ближе лучшего шаблона другого символа
+            frozen: Только чтение: learn() ничего не меняет, файл не перезаписывается
+                (процессы bulk_ocr: результат зависит только от снимка шаблонов)
+        """
+        self.path = Path(path) if path else None
+        self.frozen = frozen
+        self.max_distance = max_distance
+        self.min_margin = min_margin
+        self._lock = threading.Lock()
+        # Шаблоны: (матрица (N, H*W), ширины (N,), символы (N,)). Кортеж заменяется
+        # целиком при обучении, поэтому read() читает его без блокировки
+        self._templates = (np.zeros((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32),
+                           np.zeros(0, dtype=np.float32),
+                           np.zeros(0, dtype="<U1"))
+        # Неподтверждённые начертания: [вектор, ширина, символ, число образцов]
+        self._candidates: List[list] = []
+        if self.path is not None and self.path.exists():
+            self.load(self.path)
+
+    def __len__(self) -> int:
+        return len(self._templates[2])
+
+    def counts(self) -> dict:
+        """Число шаблонов по символам"""
+        chars, counts = np.unique(self._templates[2], return_counts=True)
+        return {str(c): int(n) for c, n in zip(chars, counts)}
+
+    def fingerprint(self) -> str:
+        """Короткий хеш шаблонов: меняется при любом обучении или удалении"""
+        digest = hashlib.sha1()
+        for array in self._templates:
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()[:12]
+
+    def load(self, path: Union[str, Path]) -> None:
+        with np.load(str(path)) as data:
+            matrix, widths, chars = data["matrix"], data["widths"], data["chars"]
+        if matrix.shape[1:] != (GLYPH_SIZE[0] * GLYPH_SIZE[1],):
+            print(f"⚠️  Шаблоны глифов {path} другого размера, начинаю заново")
+            return
+        self._templates = (matrix.astype(np.float32), widths.astype(np.float32), chars.astype("<U1"))
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> None:
+        path = Path(path or self.path)
+        # Файл могут писать наблюдатель и glyph_ocr.py --forget: у каждого процесса свой временный файл
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp.npz")
+        matrix, widths, chars = self._templates
+        np.savez_compressed(str(tmp), matrix=matrix, widths=widths, chars=chars)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _distances(glyphs: List[np.ndarray], widths: List[float],
+                   matrix: np.ndarray, template_widths: np.ndarray) -> np.ndarray:
+        """Расстояния всех глифов до всех шаблонов, форма (глифы, шаблоны)"""
+        vectors = np.stack(glyphs).reshape(len(glyphs), -1)
+        pixels = np.abs(vectors[:, None, :] - matrix[None, :, :]).mean(axis=2)
+        return pixels + WIDTH_WEIGHT * np.abs(np.asarray(widths, dtype=np.float32)[:, None] - template_widths[None, :])
+
+    def read(self, image) -> Tuple[str, float]:
+        """
+        Распознать ячейку.
+
+        Returns:
+            (текст, уверенность 0-100) или ("", -1.0), если хотя бы один глиф не узнан
+        """
+        matrix, template_widths, chars = self._templates
+        if not len(chars):
+            return "", -1.0
+        glyphs, widths = segment(image)
+        if not glyphs:
+            return "", -1.0
+        distances = self._distances(glyphs, widths, matrix, template_widths)
+        best = distances.argmin(axis=1)
+        best_distance = distances[np.arange(len(best)), best]
+        # Лучший шаблон другого символа: без шаблонов узнанного символа
+        other = np.where(chars[None, :] == chars[best][:, None], np.inf, distances).min(axis=1)
+        if (best_distance > self.max_distance).any() or ((other - best_distance) < self.min_margin).any():
+            return "", -1.0
+
+        # Пробел в алфавите бывает только перед AM/PM: промежутки между глифами
+        # пропорционального шрифта его надёжно не выдают
+        text = []
+        for char in chars[best]:
+            if char in "AP" and text and not text[-1].isalpha():
+                text.append(" ")
+            text.append(str(char))
+        confidence = float(100.0 * (1.0 - best_distance.max() / self.max_distance))
+        return "".join(text), max(0.0, confidence)
+
+    def learn(self, image, text: str) -> int:
+        """
+        Учесть глифы ячейки, прочитанной как text (уверенный ответ tesseract).
+        Ячейка пропускается, если число глифов не совпало с числом символов.
+        Глиф становится шаблоном после CONFIRMATIONS согласных образцов (см. описание модуля).
+
+        Returns:
+            Сколько шаблонов добавлено
+        """
+        text = text.replace(" ", "").upper()
+        if self.frozen or not text or any(c not in ALPHABET for c in text):
+            return 0
+        counts = self.counts()
+        if all(counts.get(c, 0) >= MAX_TEMPLATES for c in text):
+            return 0
+        glyphs, widths = segment(image)
+        if len(glyphs) != len(text):
+            return 0
+
+        added = 0
+        with self._lock:
+            matrix, widths_all, chars = self._templates
+            for glyph, width, char in zip(glyphs, widths, text):
+                same = chars == char
+                if same.sum() >= MAX_TEMPLATES:
+                    continue
+                vector = glyph.reshape(-1)
+                if len(chars):
+                    distances = (np.abs(matrix - vector).mean(axis=1)
+                                 + WIDTH_WEIGHT * np.abs(widths_all - width))
+                    # Уже известное начертание или похожее на другой символ (ошибка tesseract)
+                    if (distances < DUPLICATE_DISTANCE).any():
+                        continue
+                if not self._confirm(vector, width, char):
+                    continue
+                matrix = np.vstack([matrix, vector[None, :]])
+                widths_all = np.append(widths_all, np.float32(width))
+                chars = np.append(chars, char)
+                added += 1
+            if added:
+                self._templates = (matrix, widths_all, chars)
+                self._save_quietly()
+        return added
+
+    def _confirm(self, vector: np.ndarray, width: float, char: str) -> bool:
+        """
+        Учесть образец среди неподтверждённых начертаний (под self._lock).
+
+        Returns:
+            True — набралось CONFIRMATIONS согласных образцов, начертание пора сделать шаблоном
+        """
+        nearest, nearest_distance = -1, CONFIRM_DISTANCE
+        for i, candidate in enumerate(self._candidates):
+            distance = float(np.abs(candidate[0] - vector).mean()) + WIDTH_WEIGHT * abs(candidate[1] - width)
+            if distance < nearest_distance:
+                nearest, nearest_distance = i, distance
+        if nearest < 0:
+            self._candidates.append([vector, width, char, 1])
+            del self._candidates[:-MAX_CANDIDATES]
+            return False
+        nearest = self._candidates.pop(nearest)
+        if nearest[2] != char:
+            # Образцы одного начертания подписаны разными символами: не верим ни одному
+            return False
+        nearest[3] += 1
+        if nearest[3] < CONFIRMATIONS:
+            self._candidates.append(nearest)
+            return False
+        return True
+
+    def forget(self, chars: Optional[str] = None) -> int:
+        """
+        Удалить шаблоны (и неподтверждённые образцы) символов chars, без chars — все.
+        Следующие уверенные ячейки обучат их заново.
+
+        Returns:
+            Сколько шаблонов удалено
+        """
+        with self._lock:
+            matrix, widths, template_chars = self._templates
+            if chars is None:
+                keep = np.zeros(len(template_chars), dtype=bool)
+                self._candidates = []
+            else:
+                chars = chars.upper()
+                keep = ~np.isin(template_chars, list(chars))
+                self._candidates = [c for c in self._candidates if c[2] not in chars]
+            removed = int((~keep).sum())
+            self._templates = (matrix[keep], widths[keep], template_chars[keep])
+            if removed:
+                self._save_quietly()
+        return removed
+
+    def _save_quietly(self) -> None:
+        if self.path is None or self.frozen:
+            return
+        try:
+            self.save()
+        except OSError as e:
+            print(f"⚠️  Не удалось сохранить шаблоны глифов: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Шаблоны глифов сумм и времени: просмотр и удаление")
+    parser.add_argument("--file", default=str(Path(__file__).resolve().parent / "glyphs.npz"),
+                        help="файл шаблонов (по умолчанию glyphs.npz рядом с модулем)")
+    parser.add_argument("--forget", metavar="CHARS",
+                        help="удалить шаблоны этих символов (\"all\" — все)")
+    args = parser.parse_args()
+
+    matcher = GlyphMatcher(args.file)
+    if args.forget:
+        removed = matcher.forget(None if args.forget == "all" else args.forget)
+        print(f"🗑️  Удалено шаблонов: {removed}")
+    counts = matcher.counts()
+    print(f"📐 {args.file}: шаблонов {len(matcher)}"
+          + (": " + ", ".join(f"{c} {n}" for c, n in counts.items()) if counts else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Распознавание с бюджетом времени и запасным («хеджирующим») запросом
+
+MouseAutomation._ocr_ocrspace может ждать 60 с × 3 попытки с растущими паузами,
+а у tesseract таймаута нет вовсе — один неудачный вызов останавливает сканирование
+на минуты. HedgedOCR:
+
+- у каждого вызова есть бюджет (deadline): по его истечении все запросы
+  отменяются и выбрасывается TimeoutError;
+- сначала запускается основной движок; если он не ответил за задержку хеджа
+  (по умолчанию — его p95 по прошлым ответам), параллельно запускается следующий
+  движок из списка (или ещё одна реплика того же: engines=("ocrspace", "ocrspace"));
+  если основной быстро упал с ошибкой, следующий запускается сразу;
+- побеждает первый успешный ответ, проигравшие отменяются: процесс tesseract
+  убивается, у OCR.space прекращаются повторы, а таймаут запроса не выходит за бюджет;
+- по каждому движку копится статистика: запуски, победы, проигрыши, ошибки,
+  таймауты, задержки успешных ответов (p50/p95).
+
+Примеры:
+    python hedged_ocr.py screenshot.png
+    python hedged_ocr.py screenshot.png --engines tesseract,ocrspace --budget 8 --repeat 5
+"""
+
+import argparse
+import math
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+from automation import OCRSPACE_TIMEOUT, OCRSPACE_URL, OCRSPACE_URL_ENV, _ocrspace_fields
+
+# Переменные окружения: бюджет вызова (с), фиксированная задержка хеджа (с) и порядок движков
+BUDGET_ENV = "OCR_BUDGET"
+HEDGE_DELAY_ENV = "OCR_HEDGE_DELAY"
+ENGINES_ENV = "OCR_ENGINES"
+
+DEFAULT_BUDGET = 20.0
+DEFAULT_ENGINES = ("ocrspace", "tesseract")
+
+# Пока ответов меньше MIN_SAMPLES, задержка хеджа — DEFAULT_HEDGE_DELAY;
+# потом p95 основного движка, но не меньше MIN_HEDGE_DELAY и не больше половины бюджета
+DEFAULT_HEDGE_DELAY = 3.0
+MIN_HEDGE_DELAY = 0.2
+MIN_SAMPLES = 10
+LATENCY_WINDOW = 200
+
+
+class OCRCancelled(Exception):
+    """Запрос отменён: ответил другой движок"""
+
+
+def _remaining(deadline: float) -> float:
+    return deadline - time.monotonic()
+
+
+def ocrspace_engine(image_path: str, deadline: float, cancelled: threading.Event,
+                    api_key: Optional[str] = None, **_) -> str:
+    """OCR.space с повторами, пока не вышел бюджет и запрос не отменён"""
+    import requests
+
+    url = os.getenv(OCRSPACE_URL_ENV) or OCRSPACE_URL
+    content = Path(image_path).read_bytes()
+    attempt = 0
+    error: Exception = TimeoutError("бюджет OCR.space исчерпан")
+    while not cancelled.is_set() and _remaining(deadline) > 0.1:
+        if attempt > 0 and cancelled.wait(min(2 * attempt, max(0.0, _remaining(deadline)))):
+            break
+        attempt += 1
+        timeout = min(OCRSPACE_TIMEOUT, _remaining(deadline))
+        if timeout <= 0.1:
+            break
+        try:
+            response = requests.post(url, files={'file': (Path(image_path).name, content)},
+                                     data=_ocrspace_fields(api_key), timeout=timeout)
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            error = e
+            continue
+        if result.get('OCRExitCode') == 1:
+            parsed_results = result.get('ParsedResults', [])
+            return parsed_results[0].get('ParsedText', '').strip() if parsed_results else ''
+        error = Exception(f"OCR.space ошибка: {result.get('ErrorMessage', 'Неизвестная ошибка OCR')}")
+    if cancelled.is_set():
+        raise OCRCancelled()
+    raise error
+
+
+def _tesseract_command() -> str:
+    try:
+        import pytesseract
+        return pytesseract.pytesseract.tesseract_cmd
+    except ImportError:
+        return "tesseract"
+
+
+def tesseract_engine(image_path: str, deadline: float, cancelled: threading.Event,
+                     lang: Optional[str] = None, **_) -> str:
+    """
+    Tesseract отдельным процессом, который убивается при отмене или по бюджету.
+    Без lang — русский, при его отсутствии английский, затем язык по умолчанию
+    (как automation.tesseract_text).
+    """
+    languages: List[Optional[str]] = [lang] if lang else ['rus', 'eng', None]
+    for language in languages:
+        command = [_tesseract_command(), str(image_path), "stdout"] + (["-l", language] if language else [])
+        try:
+            proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            raise Exception("Tesseract не установлен. Установите: brew install tesseract (macOS)")
+        while True:
+            try:
+                out, err = proc.communicate(timeout=0.05)
+                break
+            except subprocess.TimeoutExpired:
+                if cancelled.is_set() or _remaining(deadline) <= 0:
+                    proc.kill()
+                    proc.communicate()
+                    if cancelled.is_set():
+                        raise OCRCancelled()
+                    raise TimeoutError("бюджет tesseract исчерпан")
+        if proc.returncode == 0:
+            return out.decode("utf-8", errors="replace").strip()
+        message = err.decode("utf-8", errors="replace").strip()
+        if "Failed loading language" not in message or language is languages[-1]:
+            raise Exception(f"Ошибка Tesseract OCR: {message}")
+    raise Exception("Ошибка Tesseract OCR")
+
+
+ENGINES: Dict[str, Callable[..., str]] = {
+    "ocrspace": ocrspace_engine,
+    "tesseract": tesseract_engine,
+}
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class _EngineStats:
+    """Счётчики и задержки успешных ответов одного движка"""
+
+    def __init__(self):
+        self.launched = 0
+        self.hedges = 0
+        self.wins = 0
+        self.losses = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self) -> Dict:
+        data = {key: getattr(self, key) for key in ("launched", "hedges", "wins", "losses", "errors", "timeouts")}
+        if self.latencies:
+            data["p50"] = round(_percentile(self.latencies, 0.5), 3)
+            data["p95"] = round(_percentile(self.latencies, 0.95), 3)
+        return data
+
+
+class _Call:
+    def __init__(self, engine: str, future, cancelled: threading.Event, hedge: bool):
+        self.engine = engine
+        self.future = future
+        self.cancelled = cancelled
+        self.hedge = hedge
+        self.started = time.monotonic()
+        self.finished = False
+
+
+class HedgedOCR:
+    """Распознавание файла несколькими движками с бюджетом времени"""
+
+    def __init__(self, engines: Optional[Sequence[str]] = None,
+                 budget: Optional[float] = None,
+                 hedge_delay: Optional[float] = None,
+                 max_workers: int = 8):
+        """
+        Args:
+            engines: Движки по порядку запуска ('ocrspace', 'tesseract'; можно повторять).
+                     По умолчанию из OCR_ENGINES или ocrspace, затем tesseract
+            budget: Бюджет одного вызова, с (по умолчанию из OCR_BUDGET или DEFAULT_BUDGET)
+            hedge_delay: Фиксированная задержка запуска следующего движка, с
+                         (по умолчанию из OCR_HEDGE_DELAY, иначе p95 предыдущего движка)
+            max_workers: Потоков для одновременных запросов
+        """
+        if engines is None:
+            engines = [e.strip() for e in os.getenv(ENGINES_ENV, "").split(",") if e.strip()] or DEFAULT_ENGINES
+        unknown = [e for e in engines if e not in ENGINES]
+        if unknown:
+            raise ValueError(f"Неизвестный движок OCR: {', '.join(unknown)}")
+        self.engines = list(engines)
+        self.budget = float(budget if budget is not None else os.getenv(BUDGET_ENV) or DEFAULT_BUDGET)
+        if hedge_delay is None and os.getenv(HEDGE_DELAY_ENV):
+            hedge_delay = float(os.environ[HEDGE_DELAY_ENV])
+        self.hedge_delay = hedge_delay
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedged-ocr")
+        self._lock = threading.Lock()
+        self._stats = {engine: _EngineStats() for engine in self.engines}
+
+    def delay_for(self, engine: str, budget: Optional[float] = None) -> float:
+        """Сколько ждать ответа движка, прежде чем запустить следующий"""
+        budget = self.budget if budget is None else budget
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            latencies = list(self._stats[engine].latencies)
+        delay = _percentile(latencies, 0.95) if len(latencies) >= MIN_SAMPLES else DEFAULT_HEDGE_DELAY
+        return min(max(delay, MIN_HEDGE_DELAY), budget / 2)
+
+    def _launch(self, engine: str, image_path: str, deadline: float, hedge: bool, options: Dict) -> _Call:
+        cancelled = threading.Event()
+        future = self._pool.submit(ENGINES[engine], image_path, deadline, cancelled, **options)
+        with self._lock:
+            self._stats[engine].launched += 1
+            self._stats[engine].hedges += hedge
+        return _Call(engine, future, cancelled, hedge)
+
+    def _cancel(self, calls: List[_Call], counter: str) -> None:
+        for call in calls:
+            if call.finished:
+                continue
+            call.cancelled.set()
+            call.future.cancel()
+            call.finished = True
+            with self._lock:
+                setattr(self._stats[call.engine], counter, getattr(self._stats[call.engine], counter) + 1)
+
+    def recognize(self, image_path: str, budget: Optional[float] = None,
+                  api_key: Optional[str] = None, lang: Optional[str] = None) -> str:
+        """
+        Распознать текст, уложившись в бюджет.
+
+        Args:
+            image_path: Путь к изображению
+            budget: Бюджет этого вызова, с (по умолчанию self.budget)
+            api_key: Ключ OCR.space
+            lang: Язык tesseract
+
+        Returns:
+            Текст первого успешного ответа
+
+        Raises:
+            TimeoutError: бюджет исчерпан; Exception: все движки ответили ошибкой
+        """
+        budget = self.budget if budget is None else budget
+        deadline = time.monotonic() + budget
+        options = {"api_key": api_key, "lang": lang}
+        calls = [self._launch(self.engines[0], image_path, deadline, False, options)]
+        hedge_at = time.monotonic() + self.delay_for(self.engines[0], budget)
+        errors: List[Exception] = []
+
+        while True:
+            running = [call for call in calls if not call.finished]
+            more = len(calls) < len(self.engines)
+            if more and (not running or time.monotonic() >= hedge_at):
+                # Основной не успел (или уже упал) — запускаем следующий движок параллельно
+                engine = self.engines[len(calls)]
+                calls.append(self._launch(engine, image_path, deadline, True, options))
+                hedge_at = time.monotonic() + self.delay_for(engine, budget)
+                continue
+            if not running:
+                raise errors[-1]
+            wake = min(deadline, hedge_at) if more else deadline
+            if time.monotonic() >= deadline:
+                self._cancel(running, "timeouts")
+                raise TimeoutError(f"OCR не уложился в {budget:.1f} c ({', '.join(c.engine for c in calls)})")
+
+            done, _ = wait([call.future for call in running],
+                           timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+            for call in running:
+                if call.future not in done:
+                    continue
+                call.finished = True
+                try:
+                    text = call.future.result()
+                except TimeoutError as e:
+                    with self._lock:
+                        self._stats[call.engine].timeouts += 1
+                    errors.append(e)
+                    continue
+                except Exception as e:
+                    with self._lock:
+                        self._stats[call.engine].errors += 1
+                    errors.append(e)
+                    continue
+                with self._lock:
+                    stats = self._stats[call.engine]
+                    stats.wins += 1
+                    stats.latencies.append(time.monotonic() - call.started)
+                self._cancel(calls, "losses")
+                return text
+
+    def stats(self) -> Dict[str, Dict]:
+        """Статистика по движкам: launched, hedges, wins, losses, errors, timeouts, p50, p95"""
+        with self._lock:
+            return {engine: stats.as_dict() for engine, stats in self._stats.items()}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Распознавание с бюджетом времени и запасным движком")
+    parser.add_argument("image", help="файл изображения")
+    parser.add_argument("--engines", default=None,
+                        help=f"движки через запятую по порядку запуска (по умолчанию {','.join(DEFAULT_ENGINES)})")
+    parser.add_argument("--budget", type=float, default=None, help=f"бюджет вызова, с (по умолчанию {DEFAULT_BUDGET})")
+    parser.add_argument("--hedge", type=float, default=None, help="задержка запуска следующего движка, с (по умолчанию p95)")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз распознать (для статистики)")
+    parser.add_argument("--lang", default=None, help="язык tesseract")
+    args = parser.parse_args()
+
+    engines = args.engines.split(",") if args.engines else None
+    ocr = HedgedOCR(engines, args.budget, args.hedge)
+    print("=" * 60)
+    print(f"⏱️  OCR С БЮДЖЕТОМ: {', '.join(ocr.engines)}, бюджет {ocr.budget:.1f} c")
+    print("=" * 60)
+    text = None
+    for n in range(args.repeat):
+        started = time.monotonic()
+        try:
+            text = ocr.recognize(args.image, lang=args.lang)
+            print(f"✅ Вызов {n + 1}: {time.monotonic() - started:.2f} c, {len(text)} символов")
+        except Exception as e:
+            print(f"❌ Вызов {n + 1}: {time.monotonic() - started:.2f} c: {e}")
+    if text is not None:
+        print(f"\n{'─' * 60}\n{text}\n{'─' * 60}")
+    print("\nСтатистика движков:")
+    for engine, stats in ocr.stats().items():
+        print(f"  {engine}: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+    ocr.close()
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Движение мыши против простоя в отдельном потоке
+
+Раньше наблюдатель двигал мышь прямо в цикле захвата (moveTo с duration=0.3),
+и каждая итерация ждала движение плюс паузу pyautogui, а ритм движения был
+привязан к ритму OCR. KeepAlive двигает курсор по своему расписанию:
+
+- одно мгновенное перемещение на тик (одно событие, без пауз и вывода);
+- если в этот момент выполняется клик или другое действие MouseAutomation
+  (занят auto.input_lock), тик пропускается;
+- если курсор сдвинул человек, тик тоже пропускается: пока с мышью работают,
+  простоя нет, а уводить курсор из-под руки нельзя.
+"""
+
+import math
+import threading
+from typing import Optional, Tuple
+
+
+class KeepAlive:
+    """Фоновый поток, слегка двигающий курсор по окружности"""
+
+    def __init__(self, auto, center: Tuple[int, int],
+                 radius: int = 50,
+                 interval: float = 10.0,
+                 step: float = math.pi / 6):
+        """
+        Args:
+            auto: MouseAutomation (его input_lock согласует движение с кликами)
+            center: Центр окружности (x, y)
+            radius: Радиус окружности, в пикселях
+            interval: Пауза между движениями, в секундах
+            step: Шаг по окружности за одно движение, в радианах
+        """
+        self.auto = auto
+        self.center = center
+        self.radius = radius
+        self.interval = interval
+        self.step = step
+        self.moves = 0
+        self.skipped = 0
+        self._angle = 0.0
+        self._last: Optional[Tuple[int, int]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "KeepAlive":
+        self._thread = threading.Thread(target=self._run, name="keep-alive", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_point(self) -> Tuple[int, int]:
+        screen_w, screen_h = self.auto.screen_size
+        cx, cy = self.center
+        x = int(cx + self.radius * math.cos(self._angle))
+        y = int(cy + self.radius * math.sin(self._angle))
+        self._angle += self.step
+        # Ограничиваем координаты границами экрана
+        return max(0, min(screen_w - 1, x)), max(0, min(screen_h - 1, y))
+
+    def tick(self) -> bool:
+        """
+        Одно движение. Returns: True, если курсор передвинут
+        """
+        position = tuple(self.auto._gui.position())
+        if self._last is not None and position != self._last:
+            # Курсор двигал кто-то другой — ждём, пока мышь снова не будет простаивать
+            self._last = position
+            self.skipped += 1
+            return False
+        point = self._next_point()
+        if not self.auto.nudge_cursor(*point):
+            self.skipped += 1
+            return False
+        self._last = point
+        self.moves += 1
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️  Ошибка движения мыши против простоя: {e}")
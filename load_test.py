@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест сетевых путей на локальных заглушках (см. stub_servers)
+
+Два сценария:
+- fanout: N оповещений ставятся в очередь (notify_outbox) и рассылаются всем
+  подписчикам заглушки Telegram одним или несколькими OutboxWorker;
+  замеряется пропускная способность доставки, число повторов и отказов;
+- ocr: M запросов к заглушке OCR.space через MouseAutomation.recognize
+  с заданной параллельностью; замеряются задержки (p50/p95/p99/max) и ошибки.
+
+Поведение заглушек задаётся теми же параметрами, что и у stub_servers.py:
+задержка, разброс, доля ошибок, лимит частоты и размер файла.
+
+Примеры:
+    python load_test.py
+    python load_test.py --alerts 200 --subscribers 10 --senders 4 --latency 0.05 --rate-limit 30
+    python load_test.py --scenario ocr --requests 100 --concurrency 8 --error-rate 0.1 --image-kb 1500
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from automation import OCRSPACE_URL_ENV, MouseAutomation
+from notify_outbox import NotificationOutbox, OutboxWorker
+from stub_servers import add_stub_arguments, config_from_args, start_ocrspace_stub, start_telegram_stub
+
+
+def _make_image(path: Path, size_kb: int) -> Path:
+    """PNG из шума (не сжимается), размером примерно size_kb"""
+    import numpy as np
+    from PIL import Image
+
+    side = max(8, int(math.sqrt(size_kb * 1024 / 3)))
+    noise = np.random.default_rng(0).integers(0, 256, (side, side, 3), dtype=np.uint8)
+    Image.fromarray(noise).save(str(path), compress_level=1)
+    return path
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _print_stub(name: str, stats: Dict[str, int]) -> None:
+    print(f"Заглушка {name}: " + ", ".join(f"{key}={value}" for key, value in sorted(stats.items())))
+
+
+def run_fanout(args: argparse.Namespace, workdir: Path) -> None:
+    stub = start_telegram_stub(config_from_args(args))
+    photo = _make_image(workdir / "alert.png", args.image_kb)
+    outbox = NotificationOutbox(workdir / "outbox.db")
+    for n in range(args.alerts):
+        outbox.enqueue(f"load-{n}", photo, f"Оповещение {n}")
+    total = args.alerts * args.subscribers
+
+    workers = [OutboxWorker(outbox, token="load-test", api_url=stub.url, max_attempts=args.max_attempts,
+                            base_delay=0.1, max_delay=args.retry_after * 4)
+               for _ in range(args.senders)]
+    deadline = time.monotonic() + args.timeout
+    done = threading.Event()
+
+    def sender(worker: OutboxWorker) -> None:
+        while not done.is_set() and time.monotonic() < deadline:
+            if worker.process_once() == 0:
+                time.sleep(0.02)
+
+    print(f"Оповещений: {args.alerts}, подписчиков: {args.subscribers}, доставок: {total}, "
+          f"отправителей: {args.senders}")
+    start = time.perf_counter()
+    # Отправители печатают каждую доставку — для замера это шум
+    with contextlib.redirect_stdout(io.StringIO()):
+        threads = [threading.Thread(target=sender, args=(worker,), daemon=True) for worker in workers]
+        for thread in threads:
+            thread.start()
+        while time.monotonic() < deadline:
+            stats = outbox.stats()
+            if stats.get("sent", 0) + stats.get("failed", 0) >= total and not stats.get("awaiting_fanout"):
+                break
+            time.sleep(0.05)
+        done.set()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = outbox.stats()
+    sent, failed = stats.get("sent", 0), stats.get("failed", 0)
+    print(f"Доставлено: {sent}/{total}, отказов: {failed}, не успели: {total - sent - failed}")
+    print(f"Время: {elapsed:.2f} c, пропускная способность: {sent / elapsed:.1f} доставок/с")
+    _print_stub("Telegram", stub.snapshot())
+    outbox.close()
+    stub.shutdown()
+
+
+def run_ocr(args: argparse.Namespace, workdir: Path) -> None:
+    stub = start_ocrspace_stub(config_from_args(args))
+    image = _make_image(workdir / "ocr.png", args.image_kb)
+    os.environ[OCRSPACE_URL_ENV] = f"{stub.url}/parse/image"
+    auto = MouseAutomation()
+
+    def one(_) -> Dict:
+        start = time.perf_counter()
+        try:
+            auto.recognize(str(image), "ocrspace")
+            ok = True
+        except Exception:
+            ok = False
+        return {"ok": ok, "seconds": time.perf_counter() - start}
+
+    print(f"Запросов: {args.requests}, параллельно: {args.concurrency}, "
+          f"файл: {image.stat().st_size / 1024:.0f} КБ")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    ok = [r["seconds"] * 1000 for r in results if r["ok"]]
+    print(f"Успешно: {len(ok)}/{len(results)}, время: {elapsed:.2f} c, {len(results) / elapsed:.1f} запр/с")
+    if ok:
+        print(f"Задержка, мс: p50={statistics.median(ok):.0f} p95={_percentile(ok, 0.95):.0f} "
+              f"p99={_percentile(ok, 0.99):.0f} max={max(ok):.0f}")
+    _print_stub("OCR.space", stub.snapshot())
+    stub.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест доставки оповещений и OCR.space на заглушках")
+    parser.add_argument("--scenario", choices=["fanout", "ocr", "all"], default="all")
+    parser.add_argument("--alerts", type=int, default=50, help="fanout: сколько оповещений поставить в очередь")
+    parser.add_argument("--senders", type=int, default=1, help="fanout: сколько OutboxWorker работают с очередью")
+    parser.add_argument("--max-attempts", type=int, default=8, help="fanout: попыток доставки до отказа")
+    parser.add_argument("--requests", type=int, default=50, help="ocr: сколько запросов")
+    parser.add_argument("--concurrency", type=int, default=4, help="ocr: сколько запросов одновременно")
+    parser.add_argument("--image-kb", type=int, default=200, help="размер отправляемого файла, КБ")
+    parser.add_argument("--timeout", type=float, default=120.0, help="fanout: предел времени прогона, с")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📈 НАГРУЗОЧНЫЙ ТЕСТ НА ЗАГЛУШКАХ")
+    print(f"Задержка: {args.latency} c (+до {args.jitter} c), ошибки: {args.error_rate:.0%}, "
+          f"лимит: {args.rate_limit or 'нет'} запр/с, retry_after: {args.retry_after} c")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory(prefix="load_test_") as tmp:
+        if args.scenario in ("fanout", "all"):
+            print("\n--- Рассылка оповещений (sendPhoto / sendMediaGroup) ---")
+            run_fanout(args, Path(tmp))
+        if args.scenario in ("ocr", "all"):
+            print("\n--- Распознавание через OCR.space ---")
+            run_ocr(args, Path(tmp))
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,53 +3,38 @@
 Скрипт-«наблюдатель», который:
 1. Периодически двигает мышь, имитируя активность пользователя.
 2. Делает скриншот экрана каждые N секунд.
+3. Распознаёт строки таблицы в одной или нескольких областях экрана
+   и оповещает в Telegram о новых строках.
 
 По аналогии со `scan_and_parse.py`, использует класс `MouseAutomation`.
 """
 
 import sys
 import time
-import math
 import os
 import re
 import json
 import hashlib
-from typing import Optional, Tuple, List, Set, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple, List, Dict, Union
 from pathlib import Path
 
-import requests
-import pyautogui
-import pytesseract
+from alert_rules import RuleEngine, compile_rules, load_rules, threshold_engine
 from automation import MouseAutomation
+from fuzzy_index import NearDuplicateIndex
+from keep_alive import KeepAlive
+from notify_outbox import NotificationOutbox, OutboxWorker
+from profiling_hooks import ProfilingHooks
+from row_store import DEFAULT_REGION, STORE_ENV, WORKER_ENV, SegmentedRowStore, open_row_store
+from screen_archive import ScreenArchive, parse_size
+from watch_log import FILE_ENV as LOG_FILE_ENV, LEVELS, RateMeter, get_log
 
-
-def _get_subscriber_chat_ids(token: str) -> Set[int]:
-    """
-    Получить множество chat_id всех пользователей/чатов,
-    которые когда‑либо писали этому боту (через getUpdates).
-    """
-    url = f"https://api.telegram.org/bot{token}/getUpdates"
-    try:
-        resp = requests.get(url, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        print(f"⚠️  Не удалось получить getUpdates из Telegram: {e}")
-        return set()
-
-    result = data.get("result", [])
-    chat_ids: Set[int] = set()
-
-    for update in result:
-        msg = update.get("message") or update.get("edited_message") or update.get("channel_post")
-        if not msg:
-            continue
-        chat = msg.get("chat") or {}
-        chat_id = chat.get("id")
-        if isinstance(chat_id, int):
-            chat_ids.add(chat_id)
-
-    return chat_ids
+if TYPE_CHECKING:
+    # frame_ring и glyph_ocr тянут NumPy: импортируются при первом использовании
+    from frame_ring import FrameRing
+    from glyph_ocr import GlyphMatcher
 
 
 def _create_unique_id(time_str: str, amount: float) -> str:
@@ -63,63 +48,265 @@ def _create_unique_id(time_str: str, amount: float) -> str:
     return hashlib.md5(combined.encode("utf-8")).hexdigest()
 
 
-def _extract_table_rows_from_image(image) -> List[Dict]:
+# Ячейки (сумма, время), в которых tesseract уверен меньше, чем на столько процентов,
+# распознаются повторно: вырезаются, увеличиваются и читаются с белым списком символов
+REOCR_CONFIDENCE = 80.0
+REOCR_SCALE = 3
+
+_AMOUNT_PATTERN = re.compile(r"\$[0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{2})")
+_TIME_PATTERN = re.compile(r"\b\d{1,2}:\d{2}\s*(?:AM|PM)\b", re.IGNORECASE)
+_AMOUNT_WHITELIST = "$0123456789,."
+_TIME_WHITELIST = "0123456789:APM"
+# Шаблоны глифов для ячеек сумм и времени (см. glyph_ocr): файл по умолчанию и переменная
+# окружения с другим путём ("0" — не использовать, читать сомнительные ячейки только tesseract)
+GLYPHS_FILE = Path(__file__).resolve().parent / "glyphs.npz"
+GLYPHS_ENV = "WATCHDOG_GLYPHS"
+# "1" — шаблоны только для чтения, без обучения (процессы bulk_ocr)
+GLYPHS_FROZEN_ENV = "WATCHDOG_GLYPHS_FROZEN"
+_glyphs: Optional["GlyphMatcher"] = None
+_glyphs_lock = threading.Lock()
+# Ответ шаблонов (уверенность 0-100 по расстоянию до худшего глифа, см. GlyphMatcher.read)
+# ниже этого не принимается: ячейка читается tesseract
+GLYPH_CONFIDENCE = 60.0
+
+# Колонки сумм и времени (TableParser): полный проход tesseract по кадру — раз в столько
+# кадров, колонка находится по стольким ячейкам, а если шаблоны не прочитали больше
+# этой доли ячеек, колонки забываются до следующего полного прохода
+LAYOUT_REFRESH_TICKS = 30
+LAYOUT_MIN_CELLS = 2
+LAYOUT_MAX_FALLBACK = 0.5
+
+# Слово, похожее на время с ошибками OCR (буквы вместо цифр): "8:O2", "1l:05"
+_TIME_LIKE = re.compile(r"^[0-9OoIlS]{1,2}[:;.][0-9OoIlS]{2}$")
+
+
+def _ocr_lines(image, config: str = "") -> List[List[Dict]]:
+    """
+    Распознать изображение через image_to_data и собрать слова по строкам.
+    Слово: {"text", "conf" (0-100, -1 — неизвестно), "box": (left, top, width, height)}
+    """
+    import pytesseract
+
+    data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+    lines: Dict[Tuple[int, int, int], List[Dict]] = {}
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        if not word:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append({
+            "text": word,
+            "conf": float(data["conf"][i]),
+            "box": (data["left"][i], data["top"][i], data["width"][i], data["height"][i]),
+        })
+    return list(lines.values())
+
+
+def _reocr_cell(image, box: Tuple[int, int, int, int], whitelist: str) -> Tuple[str, float]:
+    """
+    Повторно распознать одну ячейку: вырезать с полями, увеличить в REOCR_SCALE раз
+    и прочитать как одну строку (--psm 7) только с символами из белого списка.
+
+    Returns:
+        (текст, минимальная уверенность по словам)
+    """
+    from PIL import Image
+
+    left, top, width, height = box
+    pad = max(2, height // 4)
+    crop = image.crop((max(0, left - pad), max(0, top - pad),
+                       min(image.width, left + width + pad), min(image.height, top + height + pad)))
+    crop = crop.convert("L")
+    crop = crop.resize((crop.width * REOCR_SCALE, crop.height * REOCR_SCALE), Image.LANCZOS)
+    words = [w for line in _ocr_lines(crop, f"--psm 7 -c tessedit_char_whitelist={whitelist}") for w in line]
+    if not words:
+        return "", -1.0
+    return " ".join(w["text"] for w in words), min(w["conf"] for w in words)
+
+
+def _glyph_matcher() -> Optional["GlyphMatcher"]:
+    """Общий для всех потоков набор шаблонов глифов (создаётся при первом обращении)"""
+    from glyph_ocr import GlyphMatcher
+
+    global _glyphs
+    path = os.environ.get(GLYPHS_ENV, str(GLYPHS_FILE))
+    if path == "0":
+        return None
+    with _glyphs_lock:
+        if _glyphs is None:
+            _glyphs = GlyphMatcher(path, frozen=os.environ.get(GLYPHS_FROZEN_ENV) == "1")
+        return _glyphs
+
+
+def _cell_crop(image, box: Tuple[int, int, int, int], pad: int = 1):
+    left, top, width, height = box
+    return image.crop((max(0, left - pad), max(0, top - pad),
+                       min(image.width, left + width + pad), min(image.height, top + height + pad)))
+
+
+def _read_cell(image, box: Tuple[int, int, int, int], whitelist: str, pattern,
+               glyphs: Optional["GlyphMatcher"], min_confidence: float,
+               expected: Optional[str] = None) -> Tuple[str, float, bool]:
+    """
+    Прочитать сомнительную ячейку: сначала шаблонами глифов, и только если они
+    не уверены (ниже GLYPH_CONFIDENCE) — tesseract (_reocr_cell). Уверенный ответ
+    tesseract пополняет шаблоны, только если совпал с первым проходом (`expected`).
+
+    Returns:
+        (текст, уверенность, прочитано ли шаблонами)
+    """
+    if glyphs is not None:
+        text, score = glyphs.read(_cell_crop(image, box))
+        if score >= GLYPH_CONFIDENCE and pattern.fullmatch(text):
+            return text, score, True
+    text, confidence = _reocr_cell(image, box, whitelist)
+    if glyphs is not None and expected is not None and confidence >= min_confidence:
+        match = pattern.search(text.replace(" ", "") if pattern is _AMOUNT_PATTERN else text)
+        if match and match.group() == expected:
+            glyphs.learn(_cell_crop(image, box), expected)
+    return text, confidence, False
+
+
+def _cell_words(words: List[Dict], starts: List[int], start: int, end: int) -> List[Dict]:
+    """Слова строки, попадающие в диапазон символов [start, end) текста строки"""
+    return [w for w, ws in zip(words, starts) if ws < end and ws + len(w["text"]) > start]
+
+
+def _union_box(words: List[Dict]) -> Tuple[int, int, int, int]:
+    left = min(w["box"][0] for w in words)
+    top = min(w["box"][1] for w in words)
+    right = max(w["box"][0] + w["box"][2] for w in words)
+    bottom = max(w["box"][1] + w["box"][3] for w in words)
+    return left, top, right - left, bottom - top
+
+
+def _extract_table_rows_from_image(image, min_confidence: float = REOCR_CONFIDENCE,
+                                   glyphs: Optional["GlyphMatcher"] = None,
+                                   raise_errors: bool = False,
+                                   columns: Optional[List[Dict]] = None) -> List[Dict]:
     """
     Распознать текст на изображении и вытащить строки таблицы.
     Каждая строка содержит: событие, время, сумму.
     Возвращает список объектов с полями: event, time, amount, unique_id.
+
+    Суммы и время, распознанные с уверенностью ниже `min_confidence`
+    (и похожие на сумму слова с "$", которые не разобрались), распознаются
+    повторно по отдельности — дополнительная работа пропорциональна числу
+    сомнительных ячеек, а не размеру кадра. Повторно ячейки читаются шаблонами
+    глифов (`glyphs`, по умолчанию общий набор, см. glyph_ocr), tesseract — только
+    если шаблоны не уверены; уверенно прочитанные ячейки — образцы для шаблонов.
+
+    Ошибка tesseract в наблюдателе печатается, и кадр считается пустым; с
+    `raise_errors=True` (bulk_ocr) она пробрасывается, чтобы пустой список строк
+    не отличался от «OCR не сработал».
+
+    В `columns` (если передан) дописываются прочитанные ячейки сумм и времени:
+    {"kind": "amount" | "time", "box", "left", "right"}, где left и right — ближайшие
+    края соседних слов строки (None — соседа нет). По ним TableParser находит колонки.
     """
+    if glyphs is None:
+        glyphs = _glyph_matcher()
     try:
-        text = pytesseract.image_to_string(image)
+        lines = _ocr_lines(image)
     except Exception as e:
-        print(f"⚠️  Ошибка OCR (pytesseract): {e}")
+        if raise_errors:
+            raise
+        get_log().warning("ocr.error", f"⚠️  Ошибка OCR (pytesseract): {e}")
         return []
 
-    # Выводим в консоль полный распознанный текст
-    print("----- РАСПОЗНАННЫЙ ТЕКСТ СО СКРИНШОТА -----")
-    print(text)
-    print("----- КОНЕЦ РАСПОЗНАННОГО ТЕКСТА -----")
-
-    lines = text.splitlines()
-    amount_pattern = re.compile(r"\$[0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{2})")
-    time_pattern = re.compile(r"\b\d{1,2}:\d{2}\s*(?:AM|PM)\b", re.IGNORECASE)
+    # Полный распознанный текст — только на уровне debug (WATCHDOG_LOG_LEVEL=debug)
+    get_log().debug("ocr.text", lambda: "----- РАСПОЗНАННЫЙ ТЕКСТ СО СКРИНШОТА -----\n"
+                    + "\n".join(" ".join(w["text"] for w in words) for words in lines)
+                    + "\n----- КОНЕЦ РАСПОЗНАННОГО ТЕКСТА -----")
 
     rows: List[Dict] = []
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        # Ищем сумму и время в строке
-        amounts_in_line = amount_pattern.findall(line)
-        times_in_line = time_pattern.findall(line)
-
-        if not amounts_in_line:
+    rechecked = corrected = matched = 0
+
+    for words in lines:
+        # Текст строки и позиции начала каждого слова в нём
+        starts, offset = [], 0
+        for w in words:
+            starts.append(offset)
+            offset += len(w["text"]) + 1
+        line = " ".join(w["text"] for w in words)
+
+        # Ячейки сумм: то, что разобралось регуляркой, плюс слова с "$", которые не разобрались
+        amount_cells = [(m.start(), m.end(), m.group()) for m in _AMOUNT_PATTERN.finditer(line)]
+        for w, ws in zip(words, starts):
+            if w["text"].startswith("$") and not any(s <= ws < e for s, e, _ in amount_cells):
+                amount_cells.append((ws, ws + len(w["text"]), None))
+        if not amount_cells:
             continue
-
-        time_str = times_in_line[0].strip() if times_in_line else ""
+        time_cells = [(m.start(), m.end(), m.group()) for m in _TIME_PATTERN.finditer(line)]
+        for i, (w, ws) in enumerate(zip(words[:-1], starts)):
+            if (_TIME_LIKE.match(w["text"]) and words[i + 1]["text"].upper() in ("AM", "PM")
+                    and not any(s <= ws < e for s, e, _ in time_cells)):
+                time_cells.append((ws, starts[i + 1] + len(words[i + 1]["text"]), None))
+
+        def checked(cells, pattern, whitelist, kind):
+            nonlocal rechecked, corrected, matched
+            result = []
+            for start, end, value in cells:
+                cell = _cell_words(words, starts, start, end)
+                confidence = min(w["conf"] for w in cell)
+                if value is not None and confidence >= min_confidence:
+                    # Уверенно прочитанная ячейка — образец для шаблонов глифов
+                    if glyphs is not None:
+                        glyphs.learn(_cell_crop(image, _union_box(cell)), value)
+                else:
+                    rechecked += 1
+                    try:
+                        text, new_confidence, by_glyphs = _read_cell(
+                            image, _union_box(cell), whitelist, pattern, glyphs, min_confidence, value)
+                        matched += by_glyphs
+                    except Exception as e:
+                        if raise_errors:
+                            raise
+                        get_log().warning("ocr.cell_error", f"⚠️  Ошибка повторного OCR ячейки: {e}")
+                        text, new_confidence = "", -1.0
+                    match = pattern.search(text.replace(" ", "") if pattern is _AMOUNT_PATTERN else text)
+                    if match and (value is None or new_confidence > confidence):
+                        if match.group() != value:
+                            corrected += 1
+                        value = match.group()
+                result.append((start, end, value))
+                if columns is not None and value is not None:
+                    left, top, width, height = _union_box(cell)
+                    columns.append({
+                        "kind": kind,
+                        "box": (left, top, width, height),
+                        "left": max((w["box"][0] + w["box"][2] for w in words
+                                     if w["box"][0] + w["box"][2] <= left), default=None),
+                        "right": min((w["box"][0] for w in words if w["box"][0] >= left + width), default=None),
+                    })
+            return result
+
+        amount_cells = checked(amount_cells, _AMOUNT_PATTERN, _AMOUNT_WHITELIST, "amount")
+        time_cells = checked(time_cells, _TIME_PATTERN, _TIME_WHITELIST, "time")
+        time_values = [value for _, _, value in sorted(time_cells) if value is not None]
+        time_str = time_values[0].strip() if time_values else ""
+
+        # Событие - это всё, что осталось в строке после удаления сумм и времени
+        event_line = line
+        for start, end, _ in sorted(amount_cells + time_cells, reverse=True):
+            event_line = event_line[:start] + " " + event_line[end:]
+        event_line = re.sub(r"\s+", " ", event_line).strip()
+
+        # Если событие пустое или содержит только спецсимволы, всё равно добавляем строку
+        # (событие может быть плохо распознано OCR, но сумма и время важнее для уникальности)
+        if not event_line or event_line.strip() in ["@", "#", "®", "©"]:
+            # Если событие не распознано, используем пустую строку
+            event_line = ""
 
         # Извлекаем сумму
-        for match in amounts_in_line:
-            raw = match.replace("$", "").replace(",", "")
+        for _, _, value in sorted(amount_cells):
+            if value is None:
+                continue
             try:
-                amount = float(raw)
+                amount = float(value.replace("$", "").replace(",", ""))
             except ValueError:
                 continue
 
-            # Событие - это всё, что осталось в строке после удаления суммы и времени
-            event_line = line
-            event_line = re.sub(amount_pattern, "", event_line)
-            event_line = re.sub(time_pattern, "", event_line)
-            event_line = re.sub(r"\s+", " ", event_line).strip()
-
-            # Если событие пустое или содержит только спецсимволы, всё равно добавляем строку
-            # (событие может быть плохо распознано OCR, но сумма и время важнее для уникальности)
-            if not event_line or event_line.strip() in ["@", "#", "®", "©"]:
-                # Если событие не распознано, используем пустую строку
-                event_line = ""
-
             unique_id = _create_unique_id(time_str, amount)
             rows.append({
                 "event": event_line,
@@ -128,71 +315,769 @@ def _extract_table_rows_from_image(image) -> List[Dict]:
                 "unique_id": unique_id
             })
 
-    if rows:
-        print(f"Найдено строк таблицы на скриншоте: {len(rows)}")
-    else:
-        print("Строки таблицы на скриншоте не найдены.")
+    if rechecked:
+        get_log().debug("ocr.rechecked", f"Повторно распознано сомнительных ячеек: {rechecked} "
+                        f"(шаблонами глифов: {matched}), исправлено: {corrected}",
+                        rechecked=rechecked, by_glyphs=matched, corrected=corrected)
+    get_log().debug("ocr.rows", f"Найдено строк таблицы на скриншоте: {len(rows)}", rows=len(rows))
 
     return rows
 
 
-# Файл для хранения массива всех уникальных строк таблицы,
+class _ColumnLayout:
+    """Положение колонок сумм и времени в области: диапазоны x [left, right)"""
+
+    def __init__(self, size: Tuple[int, int], amount: Tuple[int, int], time_range: Optional[Tuple[int, int]]):
+        self.size = size
+        self.amount = amount
+        self.time = time_range
+        # Хеши полос колонки сумм, в которых нет суммы (заголовок): не читаются вовсе
+        self.skip: set = set()
+
+    @staticmethod
+    def band_key(column, band: Tuple[int, int]) -> str:
+        return hashlib.md5(column.crop((0, band[0], column.width, band[1])).tobytes()).hexdigest()
+
+    @classmethod
+    def from_cells(cls, cells: List[Dict], image) -> Optional["_ColumnLayout"]:
+        """
+        Колонки по ячейкам полного прохода (см. columns в _extract_table_rows_from_image)
+        или None, если ячейки сумм не выстраиваются в одну колонку.
+        Колонка тянется до ближайших соседних слов: более длинная сумма в неё тоже попадёт.
+        """
+        size = image.size
+        def column(kind: str) -> Optional[List[int]]:
+            """[левая граница, правая граница, левый край текста, правый край текста]"""
+            found = [c for c in cells if c["kind"] == kind]
+            if len(found) < LAYOUT_MIN_CELLS:
+                return None
+            lefts = [c["box"][0] for c in found]
+            rights = [c["box"][0] + c["box"][2] for c in found]
+            # У ячеек одной колонки есть общий столбец пикселей (выравнивание любое)
+            if max(lefts) >= min(rights):
+                return None
+            low = max((c["left"] for c in found if c["left"] is not None), default=0)
+            high = min((c["right"] for c in found if c["right"] is not None), default=size[0])
+            if low > min(lefts) or high < max(rights):
+                return None
+            return [int(low), int(high), int(min(lefts)), int(max(rights))]
+
+        amount = column("amount")
+        if amount is None:
+            return None
+        time_column = column("time")
+        if time_column is not None:
+            # Соседние колонки тянутся друг до друга: граница — середина промежутка между текстами
+            first, second = sorted([amount, time_column], key=lambda c: c[2])
+            if first[3] >= second[2]:
+                time_column = None
+            else:
+                first[1] = min(first[1], (first[3] + second[2] + 1) // 2)
+                second[0] = max(second[0], first[1])
+        layout = cls(size, (amount[0], amount[1]),
+                     (time_column[0], time_column[1]) if time_column is not None else None)
+
+        from glyph_ocr import ink_bands
+
+        column = image.crop((layout.amount[0], 0, layout.amount[1], size[1]))
+        boxes = [c["box"] for c in cells if c["kind"] == "amount"]
+        for top, bottom in ink_bands(column):
+            if not any(box[1] < bottom and top < box[1] + box[3] for box in boxes):
+                layout.skip.add(cls.band_key(column, (top, bottom)))
+        return layout
+
+
+def _extract_rows_by_layout(image, layout: _ColumnLayout, glyphs: "GlyphMatcher",
+                            min_confidence: float = REOCR_CONFIDENCE) -> Tuple[List[Dict], int, int]:
+    """
+    Строки таблицы по известным колонкам: суммы и время читаются шаблонами глифов
+    (tesseract — только для ячеек, в которых шаблоны не уверены), а tesseract по
+    всему кадру читает только события — колонки сумм и времени на его копии закрашены.
+
+    Строки находятся по полосам текста в колонке сумм (glyph_ocr.ink_bands); событие —
+    слова tesseract, центр которых попадает в полосу.
+
+    Returns:
+        (строки, прочитано ячеек, из них прочитано tesseract)
+    """
+    from PIL import ImageDraw, ImageStat
+
+    from glyph_ocr import ink_bands
+
+    column = image.crop((layout.amount[0], 0, layout.amount[1], image.height))
+    bands = ink_bands(column)
+    if not bands:
+        return [], 0, 0
+
+    masked = image.copy()
+    draw = ImageDraw.Draw(masked)
+    for left, right in filter(None, (layout.amount, layout.time)):
+        background = tuple(int(v) for v in ImageStat.Stat(image.crop((left, 0, right, image.height))).median)
+        draw.rectangle((left, 0, right - 1, image.height - 1), fill=background)
+    words = [w for line in _ocr_lines(masked) for w in line]
+
+    rows: List[Dict] = []
+    cells = by_tesseract = 0
+    for top, bottom in bands:
+        if layout.skip and _ColumnLayout.band_key(column, (top, bottom)) in layout.skip:
+            continue
+        height = bottom - top
+        cells += 1
+        text, _, by_glyphs = _read_cell(image, (layout.amount[0], top, layout.amount[1] - layout.amount[0], height),
+                                        _AMOUNT_WHITELIST, _AMOUNT_PATTERN, glyphs, min_confidence)
+        by_tesseract += not by_glyphs
+        match = _AMOUNT_PATTERN.search(text.replace(" ", ""))
+        if not match:
+            # Заголовок колонки или строка, которую не удалось прочитать
+            continue
+        amount = float(match.group().replace("$", "").replace(",", ""))
+
+        time_str = ""
+        if layout.time is not None:
+            cells += 1
+            text, _, by_glyphs = _read_cell(image, (layout.time[0], top, layout.time[1] - layout.time[0], height),
+                                            _TIME_WHITELIST, _TIME_PATTERN, glyphs, min_confidence)
+            by_tesseract += not by_glyphs
+            match = _TIME_PATTERN.search(text)
+            time_str = match.group().strip() if match else ""
+
+        pad = max(2, height // 4)
+        event = " ".join(w["text"] for w in sorted(words, key=lambda w: w["box"][0])
+                         if top - pad <= w["box"][1] + w["box"][3] / 2 <= bottom + pad)
+        if layout.time is None:
+            # Колонка времени не нашлась: время прочитал tesseract вместе с событием
+            match = _TIME_PATTERN.search(event)
+            if match:
+                time_str = match.group().strip()
+                event = re.sub(r"\s+", " ", event[:match.start()] + " " + event[match.end():]).strip()
+        if event.strip() in ["@", "#", "®", "©"]:
+            event = ""
+        rows.append({
+            "event": event,
+            "time": time_str,
+            "amount": amount,
+            "unique_id": _create_unique_id(time_str, amount),
+        })
+    return rows, cells, by_tesseract
+
+
+class TableParser:
+    """
+    Парсер таблицы одной области, который помнит положение колонок сумм и времени.
+
+    Полный проход (_extract_table_rows_from_image) выполняется на первом кадре,
+    раз в refresh_ticks кадров и когда колонки перестали подходить; он же обучает
+    шаблоны глифов и находит колонки. На остальных кадрах суммы и время читаются
+    шаблонами по известным колонкам (_extract_rows_by_layout), и tesseract по кадру
+    распознаёт только события. Если шаблоны не справились больше чем с
+    LAYOUT_MAX_FALLBACK ячеек (tesseract по ячейкам дороже), до следующего
+    полного прохода по расписанию работает только полный проход.
+    """
+
+    def __init__(self, min_confidence: float = REOCR_CONFIDENCE,
+                 glyphs: Optional["GlyphMatcher"] = None,
+                 refresh_ticks: int = LAYOUT_REFRESH_TICKS):
+        self.min_confidence = min_confidence
+        self.glyphs = glyphs
+        self.refresh_ticks = refresh_ticks
+        self._layout: Optional[_ColumnLayout] = None
+        # Сколько кадров до полного прохода по расписанию; paused — колонки забыты
+        # из-за плохого чтения шаблонами и не ищутся до него
+        self._full_in = 0
+        self._paused = False
+        self._lock = threading.Lock()
+
+    def __call__(self, image) -> List[Dict]:
+        glyphs = self.glyphs if self.glyphs is not None else _glyph_matcher()
+        with self._lock:
+            layout = self._layout
+            scheduled = self._full_in <= 0
+            self._full_in -= 1
+
+        if glyphs is not None and layout is not None and not scheduled and layout.size == image.size:
+            try:
+                rows, cells, by_tesseract = _extract_rows_by_layout(image, layout, glyphs, self.min_confidence)
+            except Exception as e:
+                get_log().warning("ocr.error", f"⚠️  Ошибка OCR (pytesseract): {e}")
+                return []
+            if rows:
+                get_log().debug("ocr.layout", f"Строк по колонкам: {len(rows)}, ячеек {cells}, "
+                                f"из них tesseract: {by_tesseract}",
+                                rows=len(rows), cells=cells, by_tesseract=by_tesseract)
+                if by_tesseract > cells * LAYOUT_MAX_FALLBACK:
+                    with self._lock:
+                        self._layout, self._paused = None, True
+                return rows
+            # В колонке сумм ничего не прочиталось: таблица сдвинулась — полный проход
+
+        columns: List[Dict] = []
+        rows = _extract_table_rows_from_image(image, self.min_confidence, glyphs, columns=columns)
+        with self._lock:
+            if scheduled:
+                self._paused = False
+            if not self._paused:
+                self._full_in = self.refresh_ticks
+                self._layout = (_ColumnLayout.from_cells(columns, image)
+                                if glyphs is not None and len(glyphs) else None)
+        return rows
+
+
+PROJECT_DIR = Path(__file__).resolve().parent
+
+# Каталог с историей строк таблицы по временным сегментам (см. row_store.SegmentedRowStore),
 # чтобы не дублировать сообщения даже после перезапуска скрипта.
-TABLE_ROWS_FILE = Path(__file__).resolve().parent / "table_rows.json"
+HISTORY_DIR = PROJECT_DIR / "history"
+
+# Старый файл со всеми строками таблицы: импортируется в историю при первом запуске
+TABLE_ROWS_FILE = PROJECT_DIR / "table_rows.json"
+
+# Очередь оповещений на диске (см. notify_outbox): оповещения переживают перезапуск,
+# а цикл захвата не ждёт сети
+OUTBOX_FILE = PROJECT_DIR / "outbox.db"
+
+# Каталог для профилей, снимков памяти и стеков (см. profiling_hooks)
+PROFILES_DIR = PROJECT_DIR / "profiles"
 
+# Переменная окружения с путём к управляющему сокету профилирования (по умолчанию — только сигналы).
+# У воркеров координатора к имени добавляется имя воркера: watchdog.display1.sock
+CONTROL_ENV = "WATCHDOG_CONTROL"
 
-def _load_table_rows() -> List[Dict]:
+# Переменная окружения с бюджетом памяти на «кадры до события» (см. frame_ring):
+# байты, можно с суффиксом K/M; 0 — не хранить кадры
+FRAME_BUDGET_ENV = "WATCHDOG_FRAME_BUDGET"
+
+# Сколько последних кадров прикладывать к оповещению
+PRE_EVENT_FRAMES = 8
+
+# Архив скриншотов оповещений (см. screen_archive): без повторов, WebP, с очисткой
+ARCHIVE_DIR = PROJECT_DIR / "screens"
+
+# Переменные окружения с пределами архива: объём (например, 500M или 2G) и срок хранения в днях
+ARCHIVE_SIZE_ENV = "WATCHDOG_ARCHIVE_SIZE"
+ARCHIVE_DAYS_ENV = "WATCHDOG_ARCHIVE_DAYS"
+DEFAULT_ARCHIVE_SIZE = "2G"
+DEFAULT_ARCHIVE_DAYS = 30.0
+
+# Переменная окружения с интервалом движения мыши против простоя, в секундах
+# (по умолчанию — как интервал скриншотов; 0 — не двигать мышь)
+KEEPALIVE_ENV = "WATCHDOG_KEEPALIVE"
+
+# Порог суммы для оповещения по умолчанию
+DEFAULT_ALERT_AMOUNT = 15000.0
+
+# Переменная окружения с файлом правил оповещения (см. alert_rules) для областей без своих правил
+RULES_ENV = "WATCHDOG_RULES"
+
+
+def _frame_budget() -> int:
     """
-    Загрузить массив всех уникальных строк таблицы из файла.
+    Бюджет кольцевого буфера кадров из WATCHDOG_FRAME_BUDGET (например, 8M или 512K).
     """
-    if not TABLE_ROWS_FILE.exists():
-        return []
-    try:
-        raw = TABLE_ROWS_FILE.read_text(encoding="utf-8")
-        data = json.loads(raw)
-        if isinstance(data, list):
-            print(f"Загружено {len(data)} строк таблицы из файла.")
-            return data
-        return []
-    except Exception as e:
-        print(f"⚠️  Не удалось загрузить файл {TABLE_ROWS_FILE}: {e}")
-        return []
+    from frame_ring import DEFAULT_BUDGET
+
+    value = os.getenv(FRAME_BUDGET_ENV, "").strip()
+    return parse_size(value) if value else DEFAULT_BUDGET
 
 
-def _save_table_rows(rows: List[Dict]) -> None:
+def _open_archive() -> ScreenArchive:
     """
-    Сохранить массив всех уникальных строк таблицы в файл.
+    Архив скриншотов с пределами из WATCHDOG_ARCHIVE_SIZE / WATCHDOG_ARCHIVE_DAYS
+    (у каждого воркера координатора — свой подкаталог).
     """
-    try:
-        TABLE_ROWS_FILE.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
-        print(f"Сохранено {len(rows)} строк таблицы в {TABLE_ROWS_FILE}.")
-    except Exception as e:
-        print(f"⚠️  Не удалось сохранить файл {TABLE_ROWS_FILE}: {e}")
+    root = ARCHIVE_DIR
+    worker_id = os.getenv(WORKER_ENV)
+    if worker_id:
+        root = root / worker_id
+    size = os.getenv(ARCHIVE_SIZE_ENV, DEFAULT_ARCHIVE_SIZE).strip()
+    days = float(os.getenv(ARCHIVE_DAYS_ENV) or DEFAULT_ARCHIVE_DAYS)
+    return ScreenArchive(root, max_bytes=parse_size(size) if size != "0" else None,
+                         max_age_days=days if days > 0 else None)
+
 
+def _control_socket() -> Optional[str]:
+    """
+    Путь управляющего сокета из WATCHDOG_CONTROL. Воркеры координатора получают
+    одно и то же окружение, поэтому у каждого — свой сокет рядом (по WATCHDOG_WORKER_ID).
+    """
+    path = os.getenv(CONTROL_ENV)
+    worker_id = os.getenv(WORKER_ENV)
+    if not path or not worker_id:
+        return path
+    path = Path(path)
+    return str(path.with_name(f"{path.stem}.{worker_id}{path.suffix}"))
 
-# Глобальное состояние: массив всех уникальных строк таблицы (загружаем из файла)
-TABLE_ROWS: List[Dict] = _load_table_rows()
+
+def _default_alert_rule() -> RuleEngine:
+    """
+    Правила по умолчанию: из файла WATCHDOG_RULES, а если он не задан —
+    сумма больше 15000 и распознаны и событие, и время.
+    """
+    rules_file = os.getenv(RULES_ENV)
+    if rules_file:
+        return load_rules(rules_file)
+    return threshold_engine(DEFAULT_ALERT_AMOUNT)
+
+
+# Парсеры, доступные по имени (для описания областей в JSON-файле): фабрики, у каждой
+# области свой экземпляр (TableParser помнит положение колонок своей области)
+REGION_PARSERS: Dict[str, Callable[[], Callable[[Any], List[Dict]]]] = {
+    "table": TableParser,
+}
+
+
+class WatchRegion:
+    """Именованная область экрана со своим парсером и правилом оповещения"""
+
+    def __init__(self, name: str,
+                 bbox: Optional[Tuple[int, int, int, int]] = None,
+                 parser: Optional[Callable[[Any], List[Dict]]] = None,
+                 alert_rule: Optional[Callable[[Dict], bool]] = None):
+        """
+        Args:
+            name: Имя области (пространство имён для дедупликации строк)
+            bbox: Область (x, y, width, height) или None для всего экрана
+            parser: Функция изображение -> список строк таблицы (по умолчанию — свой TableParser)
+            alert_rule: Правила оповещения (RuleEngine) или функция строка -> нужно ли оповещение
+        """
+        self.name = name
+        self.bbox = tuple(bbox) if bbox else None
+        self.parser = parser or TableParser()
+        self.alert_rule = alert_rule or _default_alert_rule()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "WatchRegion":
+        """
+        Создать область из словаря, например:
+        {"name": "desk1", "bbox": [0, 0, 800, 600], "parser": "table",
+         "min_amount": 15000, "require_event_and_time": true}
+        или с файлом правил (или списком правил) вместо порога:
+        {"name": "desk2", "bbox": [800, 0, 800, 600], "rules": "rules/desk2.json"}
+        """
+        parser_name = data.get("parser", "table")
+        if parser_name not in REGION_PARSERS:
+            raise ValueError(f"Неизвестный парсер области: {parser_name}")
+        if "rules" in data:
+            rules = data["rules"]
+            rule = load_rules(rules) if isinstance(rules, str) else compile_rules(rules)
+        elif "min_amount" in data or "require_event_and_time" in data:
+            rule = threshold_engine(
+                float(data.get("min_amount", DEFAULT_ALERT_AMOUNT)),
+                bool(data.get("require_event_and_time", True)),
+            )
+        else:
+            rule = None
+        return cls(data["name"], data.get("bbox"), REGION_PARSERS[parser_name](), rule)
+
+    def crop(self, screenshot):
+        """Вырезать область из общего скриншота"""
+        if self.bbox is None:
+            return screenshot
+        x, y, w, h = self.bbox
+        return screenshot.crop((x, y, x + w, y + h))
+
+
+def load_regions(path: str) -> List[WatchRegion]:
+    """Загрузить список областей из JSON-файла (массив объектов)"""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(data, list):
+        raise ValueError(f"Файл областей {path} должен содержать JSON-массив")
+    return [WatchRegion.from_dict(item) for item in data]
+
+
+def _format_row(row: Dict) -> str:
+    """Одна строка таблицы кратко (для журнала и строки состояния)"""
+    region = f"[{row['region']}] " if row.get("region", DEFAULT_REGION) != DEFAULT_REGION else ""
+    return f"{region}{row['event'][:50] or '(без события)'}, {row['time'] or '(без времени)'}, ${row['amount']:,.2f}"
+
+
+def _format_table_rows(rows: List[Dict]) -> str:
+    """Весь массив строк таблицы текстом (дамп по запросу: команда "rows" управляющего сокета)"""
+    lines = ["=" * 60, f"ТЕКУЩИЙ МАССИВ СТРОК ТАБЛИЦЫ ({len(rows)}):", "=" * 60]
+    for i, row in enumerate(rows, 1):
+        lines.append(f"{i}. [{row['unique_id'][:8]}...] Событие: {row['event'][:50]}, "
+                     f"Время: {row['time']}, Сумма: ${row['amount']:,.2f}")
+    lines.append("=" * 60)
+    return "\n".join(lines) + "\n"
+
+
+def _alert_caption(rows: List[Dict], timestamp: str,
+                   region_name: Optional[str] = None,
+                   rule_names: Optional[List[str]] = None) -> str:
+    """Подпись к скриншоту оповещения: в неё попадает последняя строка из `rows`"""
+    last_row = rows[-1]
+    caption = f"Скриншот сделан в момент: {timestamp}\n\n"
+    if region_name:
+        caption += f"Область: {region_name}\n"
+    caption += f"Событие: {last_row['event']}\n"
+    caption += f"Время: {last_row['time']}\n"
+    caption += f"Сумма: ${last_row['amount']:,.2f}"
+    if rule_names:
+        caption += f"\nПравила: {', '.join(rule_names)}"
+    return caption
+
+
+def _alert_key(region_name: str, rows: List[Dict]) -> str:
+    """Ключ идемпотентности оповещения: одна область и тот же набор строк — одно оповещение"""
+    ids = ",".join(sorted(row["unique_id"] for row in rows))
+    return hashlib.md5(f"{region_name}|{ids}".encode("utf-8")).hexdigest()
+
+
+def _parse_regions(screenshot, regions: List[WatchRegion],
+                   pool: ThreadPoolExecutor) -> List[Tuple[WatchRegion, List[Dict]]]:
+    """
+    Нарезать один скриншот на области и распознать их в общем пуле OCR.
+    Каждой строке проставляются имя области и время захвата.
+    """
+    captured_at = time.time()
+    futures = [(region, pool.submit(region.parser, region.crop(screenshot))) for region in regions]
+
+    results: List[Tuple[WatchRegion, List[Dict]]] = []
+    for region, future in futures:
+        try:
+            rows = future.result()
+        except Exception as e:
+            get_log().warning("ocr.region_error", f"⚠️  Ошибка разбора области '{region.name}': {e}",
+                              region=region.name)
+            rows = []
+        for row in rows:
+            row["region"] = region.name
+            row["captured_at"] = captured_at
+        results.append((region, rows))
+    return results
+
+
+def _drop_near_duplicates(parsed: List[Tuple[WatchRegion, List[Dict]]],
+                          near_index: NearDuplicateIndex) -> List[Tuple[WatchRegion, List[Dict]]]:
+    """Убрать строки, похожие на уже виденные (ошибки OCR в сумме, времени или событии)"""
+    result = []
+    for region, rows in parsed:
+        kept = []
+        for row in rows:
+            similar = near_index.find_similar(row)
+            if similar is None:
+                kept.append(row)
+            elif (similar["time"], similar["amount"]) != (row["time"], row["amount"]):
+                get_log().debug("tick.near_duplicate",
+                                f"Почти-дубликат: ${row['amount']:,.2f} {row['time'] or '(без времени)'} "
+                                f"≈ ${similar['amount']:,.2f} {similar['time'] or '(без времени)'} — пропускаю.",
+                                amount=row["amount"], time=row["time"], similar_amount=similar["amount"],
+                                similar_time=similar["time"])
+        result.append((region, kept))
+    return result
+
+
+def _fired_rules(alert_rule, row: Dict) -> List[str]:
+    """Имена сработавших правил (для произвольной функции-правила — её имя)"""
+    if isinstance(alert_rule, RuleEngine):
+        return alert_rule.evaluate(row)
+    return [getattr(alert_rule, "__name__", "alert_rule")] if alert_rule(row) else []
+
+
+def _process_tick(screenshot, regions: List[WatchRegion], pool: ThreadPoolExecutor, store,
+                  near_index: Optional[NearDuplicateIndex] = None,
+                  outbox: Optional[NotificationOutbox] = None,
+                  on_enqueued: Optional[Callable[[], None]] = None,
+                  frame_ring: Optional["FrameRing"] = None,
+                  archive: Optional[ScreenArchive] = None) -> Dict[str, Any]:
+    """
+    Одна итерация наблюдателя: OCR по областям, дедупликация, постановка оповещений в очередь.
+
+    Returns:
+        Итог итерации для строки состояния: {'parsed': число распознанных строк,
+        'new': новые строки, 'alerts': [(область, строки, правила), ...] — поставленные в очередь}
+    """
+    log = get_log()
+    multi_region = len(regions) > 1
+    result: Dict[str, Any] = {"parsed": 0, "new": [], "alerts": []}
+
+    parsed = _parse_regions(screenshot, regions, pool)
+    result["parsed"] = sum(len(rows) for _, rows in parsed)
+    if not result["parsed"]:
+        log.debug("tick.no_rows", "Нет распознанных строк таблицы — не отправляю скриншот в Telegram.")
+        return result
+
+    if near_index is not None:
+        parsed = _drop_near_duplicates(parsed, near_index)
+
+    # Добавляем в хранилище строки, которых ещё не было (в пределах своей области).
+    # Хранилище само решает, какие строки новые, — это атомарно даже для нескольких процессов.
+    all_new = store.add_new([row for _, rows in parsed for row in rows])
+    if near_index is not None:
+        for row in all_new:
+            near_index.add(row)
+    result["new"] = all_new
+    if not all_new:
+        log.debug("tick.no_new_rows", "Новых уникальных строк нет — не отправляю скриншот.")
+        return result
+
+    new_ids = {id(row) for row in all_new}
+    new_by_region = [(region, [row for row in rows if id(row) in new_ids]) for region, rows in parsed]
+
+    log.info("tick.new_rows", f"➕ Добавлено {len(all_new)} новых уникальных строк.", count=len(all_new))
+    for row in all_new:
+        log.info("row.new", lambda: f"   {_format_row(row)}",
+                 row={key: row.get(key) for key in ("region", "event", "time", "amount", "unique_id")})
+
+    # Проверяем правила оповещения каждой области
+    alerts = []
+    for region, rows in new_by_region:
+        valid_rows, rule_names = [], []
+        for row in rows:
+            fired = _fired_rules(region.alert_rule, row)
+            if fired:
+                valid_rows.append(row)
+                rule_names.extend(name for name in fired if name not in rule_names)
+        if valid_rows:
+            alerts.append((region, valid_rows, rule_names))
+
+    if not alerts:
+        log.debug("tick.no_alerts", "Среди новых строк нет строк, подходящих под правила оповещения — "
+                  "не отправляю скриншот в Telegram.")
+        return result
+
+    if archive is None:
+        log.warning("alert.no_archive", "⚠️  Архив скриншотов не задан, пропускаю оповещение.")
+        return result
+    # Без токена скриншот всё равно сохраняется в архив — это единственная запись об оповещении
+    send = outbox is not None and bool(os.getenv("TELEGRAM_BOT_TOKEN"))
+    if not send:
+        log.warning("alert.no_token", "⚠️  TELEGRAM_BOT_TOKEN не задан: сохраняю скриншот в архив, "
+                    "в Telegram не отправляю.")
+    result["alerts"] = alerts
+
+    # Готовим данные для сохранения и отправки
+    file_timestamp = time.strftime("%Y%m%d_%H%M%S")
+    worker_id = os.getenv(WORKER_ENV)
+    if worker_id:
+        file_timestamp += f"_{worker_id}"
+    timestamp = time.strftime("%d/%m/%y %H:%M")  # для человека, "DD/MM/YY HH:MM"
+
+    messages = []
+    for region, valid_rows, rule_names in alerts:
+        max_amount_new = max(row["amount"] for row in valid_rows)
+        log.info("alert.queued", f"🔔 Область '{region.name}': сработали правила {', '.join(rule_names)} "
+                 f"(максимум: ${max_amount_new:,.2f}) — "
+                 + ("ставлю скриншот в очередь Telegram." if send else "сохраняю скриншот в архив."),
+                 region=region.name, rules=rule_names, max_amount=max_amount_new, rows=len(valid_rows))
+        caption = _alert_caption(valid_rows, timestamp, region.name if multi_region else None, rule_names)
+        messages.append((_alert_key(region.name, valid_rows), caption))
+
+    # Скриншот сжимается в архив в фоне; в очередь Telegram он попадает, когда файл записан.
+    # Архив пишет файлы по порядку, поэтому раскадровка будет готова после скриншота —
+    # будим отправителя после неё, чтобы оба ушли одним альбомом.
+    row_ids = [row["unique_id"] for _, valid_rows, _ in alerts for row in valid_rows]
+    strip = None
+    if frame_ring is not None and len(frame_ring) > 1:
+        strip = frame_ring.strip(PRE_EVENT_FRAMES)
+    log.debug("archive.put", f"Сохраняю скриншот в архив: {archive.root}")
+    # Области с таблицами должны совпасть пиксель в пиксель, иначе это новый кадр
+    protect = [region.bbox or (0, 0) + screenshot.size for region in regions]
+    archive.put(screenshot, row_ids=row_ids, label=file_timestamp, protect=protect).add_done_callback(
+        partial(_enqueue_stored, outbox if send else None, messages, None if strip is not None else on_enqueued))
+
+    # Кадры до события: раскадровка уходит в Telegram вместе со скриншотом
+    # (одним альбомом), GIF остаётся в архиве
+    if strip is not None:
+        gif_path = frame_ring.save_gif(archive.clip_path(f"{file_timestamp}_pre.gif"), count=PRE_EVENT_FRAMES)
+        log.debug("archive.gif", f"Сохраняю кадры до события: {gif_path}", path=str(gif_path))
+        frames_count = min(len(frame_ring), PRE_EVENT_FRAMES)
+        strip_key = hashlib.md5("|".join(sorted(key for key, _ in messages)).encode("utf-8")).hexdigest() + ":pre"
+        archive.put(strip, row_ids=row_ids, label=f"{file_timestamp}_pre").add_done_callback(
+            partial(_enqueue_stored, outbox if send else None,
+                    [(strip_key, f"Кадры до события ({frames_count} шт.)")], on_enqueued))
+    return result
+
+
+def _enqueue_stored(outbox: Optional[NotificationOutbox], messages: List[Tuple[str, str]],
+                    on_enqueued: Optional[Callable[[], None]], stored) -> None:
+    """
+    Поставить в очередь Telegram снимок, записанный архивом (вызывается из потока архива).
+
+    Args:
+        outbox: Очередь оповещений (None — только проверить, что снимок записан)
+        messages: [(ключ оповещения, подпись), ...]
+        stored: Future из ScreenArchive.put
+    """
+    try:
+        path = stored.result()["path"]
+    except Exception as e:
+        get_log().error("archive.error", f"⚠️  Не удалось сохранить скриншот в архив: {e}")
+        return
+    if outbox is None:
+        return
+    for alert_key, caption in messages:
+        outbox.enqueue(alert_key, path, caption)
+    if on_enqueued is not None:
+        on_enqueued()
+
+
+class _WatchStatus:
+    """Живая строка состояния наблюдателя: скорость строк, последняя строка, очереди, последнее оповещение"""
+
+    def __init__(self, store, outbox: NotificationOutbox, archive: ScreenArchive,
+                 frame_ring: Optional["FrameRing"] = None):
+        self.store = store
+        self.outbox = outbox
+        self.archive = archive
+        self.frame_ring = frame_ring
+        self.ticks = 0
+        self.rate = RateMeter()
+        self.last_row: Optional[Dict] = None
+        self.last_row_at = 0.0
+        self.last_alert: Optional[Tuple[float, str, float]] = None
+        self.line = ""
+
+    def update(self, result: Dict[str, Any]) -> str:
+        """Учесть итог итерации (см. _process_tick) и вернуть новую строку состояния"""
+        now = time.time()
+        self.ticks += 1
+        self.rate.add(len(result["new"]))
+        if result["new"]:
+            self.last_row, self.last_row_at = result["new"][-1], now
+        for region, rows, _ in result["alerts"]:
+            self.last_alert = (now, region.name, max(row["amount"] for row in rows))
+
+        counts = self.outbox.stats()
+        telegram = counts.get("pending", 0) + counts.get("sending", 0) + counts.get("awaiting_fanout", 0)
+        parts = [f"⏱ {time.strftime('%H:%M:%S')}",
+                 f"итераций {self.ticks}",
+                 f"строк {len(self.store)}",
+                 f"{self.rate.rate():.2f} стр/с"]
+        if self.last_row is not None:
+            parts.append(f"посл.: {_format_row(self.last_row)} ({time.strftime('%H:%M:%S', time.localtime(self.last_row_at))})")
+        queues = f"очереди: Telegram {telegram}, архив {self.archive.pending}"
+        if self.frame_ring is not None:
+            queues += f", кадров {len(self.frame_ring)}"
+        parts.append(queues)
+        if self.last_alert is not None:
+            at, region_name, amount = self.last_alert
+            parts.append(f"оповещение: {time.strftime('%H:%M:%S', time.localtime(at))} '{region_name}' ${amount:,.2f}")
+        self.line = " | ".join(parts)
+        return self.line
+
+
+def _add_control_commands(hooks: ProfilingHooks, store, status: _WatchStatus) -> None:
+    """Команды управляющего сокета наблюдателя: дамп строк, уровень журнала, шаблоны глифов, строка состояния"""
+    log = get_log()
+
+    def rows(args: List[str]) -> str:
+        recent = store.recent_rows()
+        if args:
+            recent = recent[-int(args[0]):]
+        return str(hooks.write_report("rows", _format_table_rows(recent)))
+
+    def level(args: List[str]) -> str:
+        if args:
+            if args[0] not in LEVELS:
+                return f"уровни: {', '.join(LEVELS)}"
+            log.level = LEVELS[args[0]]
+        return f"уровень журнала: {log.level_name}"
+
+    def glyphs(args: List[str]) -> str:
+        matcher = _glyph_matcher()
+        if matcher is None:
+            return f"шаблоны глифов выключены ({GLYPHS_ENV}=0)"
+        if args and args[0] == "forget":
+            # Без символов — все шаблоны; иначе только перечисленные ("glyphs forget 17")
+            removed = matcher.forget("".join(args[1:]) or None)
+            return f"удалено шаблонов: {removed}, осталось {len(matcher)}"
+        return f"шаблонов {len(matcher)}: " + ", ".join(f"{c} {n}" for c, n in matcher.counts().items())
+
+    hooks.add_command("rows", rows)
+    hooks.add_command("log", level)
+    hooks.add_command("glyphs", glyphs)
+    hooks.add_command("status", lambda args: status.line or "ещё не было ни одной итерации")
 
 
 def run_mouse_watchdog(
     interval_seconds: float = 10.0,
     move_radius: int = 50,
     center: Optional[Tuple[int, int]] = None,
+    regions: Optional[List[Union[WatchRegion, Dict]]] = None,
+    ocr_workers: Optional[int] = None,
+    store=None,
+    fuzzy_dedup: bool = True,
+    outbox: Optional[NotificationOutbox] = None,
+    frame_ring: Optional["FrameRing"] = None,
+    move_interval: Optional[float] = None,
+    archive: Optional[ScreenArchive] = None,
 ) -> None:
     """
     Бесконечный цикл:
-    - слегка двигает мышь по кругу вокруг центра
-    - делает скриншот всего экрана
+    - делает один скриншот всего экрана и нарезает его на области
+    - распознаёт области в общем пуле OCR и оповещает по правилам каждой области
     - ждет `interval_seconds`
 
+    Тем временем отдельный поток слегка двигает мышь по кругу вокруг центра
+    (см. keep_alive), не задерживая захват и OCR.
+
     Args:
-        interval_seconds: интервал между скриншотами (и движениями мыши), в секундах
+        interval_seconds: интервал между скриншотами, в секундах
         move_radius: радиус движения мыши вокруг центра, в пикселях
         center: центр окружности (x, y). Если None — берется центр экрана.
+        regions: список областей (WatchRegion или словари). Если None — весь экран.
+        ocr_workers: размер общего пула OCR (по умолчанию — по числу областей, не больше CPU)
+        store: хранилище строк (см. row_store). Если None — из переменной WATCHDOG_STORE,
+               а если она не задана — сегментированная история в каталоге history/.
+        fuzzy_dedup: не считать новыми строки, похожие на уже виденные
+                     (см. fuzzy_index.NearDuplicateIndex)
+        outbox: очередь оповещений (см. notify_outbox). Если None — outbox.db в каталоге проекта.
+                Доставкой занимается фоновый поток, цикл захвата на сети не блокируется.
+        frame_ring: буфер последних кадров (см. frame_ring). Если None — с бюджетом
+                    из WATCHDOG_FRAME_BUDGET (по умолчанию 8 МБ); при бюджете 0 кадры не хранятся.
+        move_interval: интервал движения мыши, в секундах. Если None — из WATCHDOG_KEEPALIVE,
+                       а если она не задана — равен interval_seconds; 0 — не двигать мышь.
+        archive: архив скриншотов оповещений (см. screen_archive). Если None — каталог screens/
+                 с пределами из WATCHDOG_ARCHIVE_SIZE (2G) и WATCHDOG_ARCHIVE_DAYS (30).
+
+    Каждая итерация обновляет одну строку состояния, а в журнал (см. watch_log) пишутся
+    только новые строки, оповещения и ошибки. Уровень — WATCHDOG_LOG_LEVEL (debug выводит
+    и весь распознанный текст), JSONL-копия — WATCHDOG_LOG_FILE; весь массив строк —
+    по команде "rows" управляющего сокета (WATCHDOG_CONTROL).
     """
-    auto = MouseAutomation()
+    if regions:
+        watch_regions = [r if isinstance(r, WatchRegion) else WatchRegion.from_dict(r) for r in regions]
+    else:
+        watch_regions = [WatchRegion(DEFAULT_REGION)]
+
+    names = [region.name for region in watch_regions]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Имена областей должны быть уникальными: {names}")
+
+    if ocr_workers is None:
+        ocr_workers = max(1, min(len(watch_regions), os.cpu_count() or 1))
+
+    if store is None:
+        store_spec = os.getenv(STORE_ENV)
+        store = open_row_store(store_spec) if store_spec else SegmentedRowStore(HISTORY_DIR, legacy_file=TABLE_ROWS_FILE)
+
+    near_index = None
+    if fuzzy_dedup:
+        # Индекс сам забывает строки, которые уже ни с чем не совпадут (см. recent_horizon)
+        near_index = NearDuplicateIndex()
+        for row in store.recent_rows(near_index.max_age):
+            # Для строк из истории без отметки времени считаем, что они старые
+            near_index.add(row, seen_at=row.get("captured_at", 0.0))
+
+    if outbox is None:
+        outbox = NotificationOutbox(OUTBOX_FILE)
+    sender = OutboxWorker(outbox).start()
+    if archive is None:
+        archive = _open_archive()
+    if frame_ring is None:
+        from frame_ring import FrameRing
+
+        budget = _frame_budget()
+        frame_ring = FrameRing(budget) if budget > 0 else None
+    hooks = ProfilingHooks(PROFILES_DIR).install(_control_socket())
+    log = get_log()
+    status = _WatchStatus(store, outbox, archive, frame_ring)
+    _add_control_commands(hooks, store, status)
+
+    if move_interval is None:
+        move_interval = float(os.getenv(KEEPALIVE_ENV) or interval_seconds)
 
-    screen_w, screen_h = auto.screen_size
+    auto = MouseAutomation()
 
     # По умолчанию водим мышь в верхнем левом углу,
     # чтобы небольшая окружность не выходила за границы экрана.
@@ -203,151 +1088,55 @@ def run_mouse_watchdog(
 
     print("=" * 60)
     print("🖱️  MOUSE WATCHDOG ЗАПУЩЕН")
-    print(f"Интервал: {interval_seconds} c, радиус движения: {move_radius}px")
-    print(f"Центр движения: ({cx}, {cy})")
+    print(f"Интервал скриншотов: {interval_seconds} c")
+    if move_interval > 0:
+        print(f"Движение мыши: каждые {move_interval} c, радиус {move_radius}px, центр ({cx}, {cy})")
+    else:
+        print("Движение мыши выключено")
+    print(f"Области: {', '.join(names)} (потоков OCR: {ocr_workers})")
+    print(f"Хранилище строк: {type(store).__name__} ({len(store)} строк в памяти)")
+    print(f"Очередь оповещений: {outbox.path}")
+    print(f"Архив скриншотов: {archive.root} ({archive.stats()['entries']} снимков)")
+    if frame_ring is not None:
+        print(f"Кадры до события: до {frame_ring.byte_budget / 1024 / 1024:.1f} МБ в памяти")
+    print(f"Профилирование: kill -USR1 {os.getpid()} (cProfile), kill -USR2 {os.getpid()} (стеки и память)")
+    print(f"Журнал: уровень {log.level_name}"
+          + (f", JSONL в {os.getenv(LOG_FILE_ENV)}" if os.getenv(LOG_FILE_ENV) else ""))
     print("Нажмите Ctrl+C, чтобы остановить.")
     print("=" * 60)
 
-    angle = 0.0
+    keep_alive = None
+    if move_interval > 0:
+        keep_alive = KeepAlive(auto, (cx, cy), move_radius, move_interval).start()
 
+    pool = ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="ocr")
     try:
-        while True:
-            # Вычисляем новую точку по окружности
-            x = int(cx + move_radius * math.cos(angle))
-            y = int(cy + move_radius * math.sin(angle))
-
-            # Ограничиваем координаты границами экрана
-            x = max(0, min(screen_w - 1, x))
-            y = max(0, min(screen_h - 1, y))
-
-            print("\n" + "-" * 60)
-            print(f"Перемещаю мышь в ({x}, {y}) и делаю скриншот...")
-
-            auto.move_cursor(x, y, duration=0.3)
-            # Делаем скриншот только в памяти (на диск сохраним позже, если сумма > 3000
-            # и появилась новая уникальная строка)
-            screenshot = pyautogui.screenshot()
-
-            # --- OCR: распознаём строки таблицы на скриншоте ---
-            parsed_rows = _extract_table_rows_from_image(screenshot)
-            if not parsed_rows:
-                print("Нет распознанных строк таблицы — не отправляю скриншот в Telegram.")
-                angle += math.pi / 6  # шаг по кругу (30 градусов)
-                print(f"Ожидаю {interval_seconds} секунд...")
-                time.sleep(interval_seconds)
-                continue
-
-            # Находим новые уникальные строки, которых ещё не было
-            global TABLE_ROWS
-            existing_ids = {row["unique_id"] for row in TABLE_ROWS}
-            new_rows = [row for row in parsed_rows if row["unique_id"] not in existing_ids]
-
-            if not new_rows:
-                print("Новых уникальных строк нет — не отправляю скриншот.")
-                # Выводим весь массив в консоль
-                print("\n" + "=" * 60)
-                print("ТЕКУЩИЙ МАССИВ СТРОК ТАБЛИЦЫ:")
-                print("=" * 60)
-                for i, row in enumerate(TABLE_ROWS, 1):
-                    print(f"{i}. [{row['unique_id'][:8]}...] Событие: {row['event'][:50]}, "
-                          f"Время: {row['time']}, Сумма: ${row['amount']:,.2f}")
-                print("=" * 60 + "\n")
-                angle += math.pi / 6  # шаг по кругу (30 градусов)
-                print(f"Ожидаю {interval_seconds} секунд...")
-                time.sleep(interval_seconds)
-                continue
-
-            # Добавляем новые строки в массив
-            TABLE_ROWS.extend(new_rows)
-            _save_table_rows(TABLE_ROWS)
-
-            print(f"Добавлено {len(new_rows)} новых уникальных строк.")
-
-            # Выводим весь массив в консоль
-            print("\n" + "=" * 60)
-            print("ТЕКУЩИЙ МАССИВ СТРОК ТАБЛИЦЫ:")
-            print("=" * 60)
-            for i, row in enumerate(TABLE_ROWS, 1):
-                print(f"{i}. [{row['unique_id'][:8]}...] Событие: {row['event'][:50]}, "
-                      f"Время: {row['time']}, Сумма: ${row['amount']:,.2f}")
-            print("=" * 60 + "\n")
-
-            # Проверяем, есть ли среди новых строк сумма > 15000
-            new_rows_with_high_amount = [row for row in new_rows if row["amount"] > 15000]
-
-            if not new_rows_with_high_amount:
-                print("Среди новых строк нет суммы > 15000 — не делаю и не отправляю скриншот.")
-                angle += math.pi / 6  # шаг по кругу (30 градусов)
-                print(f"Ожидаю {interval_seconds} секунд...")
-                time.sleep(interval_seconds)
-                continue
-
-            # Фильтруем строки, у которых есть и событие, и время
-            valid_rows = [
-                row for row in new_rows_with_high_amount
-                if row["event"].strip() and row["time"].strip()
-            ]
-
-            if not valid_rows:
-                print("Среди новых строк с суммой > 15000 нет строк с событием и временем — не отправляю скриншот в Telegram.")
-                angle += math.pi / 6  # шаг по кругу (30 градусов)
-                print(f"Ожидаю {interval_seconds} секунд...")
+        # print() фоновых потоков (очередь Telegram, хранилище) идёт через журнал,
+        # чтобы не разрывать строку состояния
+        with log.capture_prints():
+            while True:
+                # Делаем один скриншот только в памяти (на диск сохраним позже,
+                # если появилась новая строка, подходящая под правила оповещения)
+                screenshot = auto.capture()
+                if frame_ring is not None:
+                    frame_ring.add(screenshot)
+
+                result = _process_tick(screenshot, watch_regions, pool, store, near_index, outbox, sender.wake,
+                                       frame_ring, archive)
+                log.status(status.update(result))
                 time.sleep(interval_seconds)
-                continue
-
-            max_amount_new = max(row["amount"] for row in valid_rows)
-            print(f"Есть новая строка с суммой > 15000 (максимум: ${max_amount_new:,.2f}) — сохраняю и отправляю скриншот в Telegram.")
-
-            # Готовим данные для сохранения и отправки
-            file_timestamp = time.strftime("%Y%m%d_%H%M%S")
-            timestamp = time.strftime("%d/%m/%y %H:%M")  # для человека, "DD/MM/YY HH:MM"
-            project_dir = Path(__file__).resolve().parent
-            screens_dir = project_dir / "screens"
-            screens_dir.mkdir(exist_ok=True)
-            screenshot_path = screens_dir / f"{file_timestamp}.png"
-            print(f"Сохраняю скриншот на диск: {screenshot_path}")
-            screenshot.save(str(screenshot_path))
-
-            # Отправка скриншота в Telegram всем подписавшимся (написавшим боту)
-            token = os.getenv("TELEGRAM_BOT_TOKEN")
-            if not token:
-                print("⚠️  TELEGRAM_BOT_TOKEN не задан, пропускаю отправку в Telegram.")
-            else:
-                chat_ids = _get_subscriber_chat_ids(token)
-                if not chat_ids:
-                    print("⚠️  Нет подписчиков (никто еще не написал боту), некого оповещать.")
-                else:
-                    base_url = f"https://api.telegram.org/bot{token}"
-                    photo_url = f"{base_url}/sendPhoto"
-
-                    # Формируем текст для подписи к картинке
-                    last_row = valid_rows[-1]
-                    caption = f"Скриншот сделан в момент: {timestamp}\n\n"
-                    caption += f"Событие: {last_row['event']}\n"
-                    caption += f"Время: {last_row['time']}\n"
-                    caption += f"Сумма: ${last_row['amount']:,.2f}"
-
-                    for chat_id in chat_ids:
-                        # Отправляем скриншот с текстом как подписью (caption)
-                        try:
-                            with open(screenshot_path, "rb") as f:
-                                files = {"photo": f}
-                                data = {"chat_id": chat_id, "caption": caption}
-                                resp = requests.post(photo_url, data=data, files=files, timeout=15)
-                            if resp.ok:
-                                print(f"✅ Скриншот с описанием отправлен в Telegram (chat_id={chat_id}).")
-                            else:
-                                print(f"⚠️  Ошибка отправки скриншота в Telegram для chat_id={chat_id}: {resp.status_code} {resp.text}")
-                        except Exception as e:
-                            print(f"⚠️  Исключение при отправке скриншота в Telegram для chat_id={chat_id}: {e}")
-
-            angle += math.pi / 6  # шаг по кругу (30 градусов)
-
-            print(f"Ожидаю {interval_seconds} секунд...")
-            time.sleep(interval_seconds)
     except KeyboardInterrupt:
-        print("\n🛑 Остановлено пользователем (Ctrl+C).")
-        print("Выход.")
+        log.info("stop", "🛑 Остановлено пользователем (Ctrl+C). Выход.")
+    finally:
+        log.close()
+        if keep_alive is not None:
+            keep_alive.stop()
+        pool.shutdown(wait=False)
+        hooks.close()
+        archive.close()
+        sender.stop()
+        outbox.close()
+        store.close()
 
 
 def main():
@@ -358,23 +1147,29 @@ def main():
         python mouse_watchdog.py
         python mouse_watchdog.py 10       # интервал 10 c
         python mouse_watchdog.py 5 80     # интервал 5 c, радиус 80 px
+        python mouse_watchdog.py 5 80 regions.json   # несколько областей из файла
+        WATCHDOG_STORE=sqlite:rows.db python mouse_watchdog.py   # общее хранилище SQLite
+        WATCHDOG_RULES=rules.json python mouse_watchdog.py       # правила оповещения из файла
     """
     interval = 10.0
     radius = 50
+    regions = None
 
     try:
         if len(sys.argv) >= 2:
             interval = float(sys.argv[1])
         if len(sys.argv) >= 3:
             radius = int(sys.argv[2])
-    except ValueError:
-        print("Использование: python mouse_watchdog.py [interval_seconds] [move_radius]")
+        if len(sys.argv) >= 4:
+            regions = load_regions(sys.argv[3])
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Ошибка аргументов: {e}")
+        print("Использование: python mouse_watchdog.py [interval_seconds] [move_radius] [regions.json]")
         print("Пример:       python mouse_watchdog.py 10 50")
         sys.exit(1)
 
-    run_mouse_watchdog(interval_seconds=interval, move_radius=radius)
+    run_mouse_watchdog(interval_seconds=interval, move_radius=radius, regions=regions)
 
 
 if __name__ == "__main__":
     main()
-
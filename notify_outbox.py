@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Надёжная доставка оповещений в Telegram через очередь на диске
+
+Наблюдатель только записывает оповещение в SQLite-очередь (outbox) и сразу
+продолжает работу, а доставкой занимается фоновый поток:
+
+- подписчики бота (getUpdates) запрашиваются в фоне и кэшируются;
+- на каждого подписчика создаётся отдельная доставка с ключом идемпотентности
+  (ключ оповещения + chat_id), поэтому повторная постановка того же оповещения
+  после перезапуска не приводит к повторной отправке;
+- при ошибке доставка повторяется с экспоненциальной задержкой
+  (и с учётом retry_after от Telegram при 429);
+- если для одного чата накопилось несколько оповещений, они уходят одним
+  sendMediaGroup (до 10 фото);
+- очередь переживает перезапуски, а несколько процессов (см. watchdog_coordinator)
+  могут работать с одной базой: доставки захватываются атомарно.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Union
+
+TELEGRAM_API = "https://api.telegram.org"
+
+# Переменная окружения с другим адресом Bot API (например, локальной заглушкой, см. stub_servers)
+TELEGRAM_API_ENV = "TELEGRAM_API_URL"
+
+# Telegram принимает в sendMediaGroup от 2 до 10 элементов
+MEDIA_GROUP_MAX = 10
+
+# Через сколько секунд повторить getUpdates после ошибки (если это раньше, чем subscribers_ttl)
+SUBSCRIBERS_RETRY = 10.0
+
+
+def telegram_api_url() -> str:
+    """Адрес Bot API: из TELEGRAM_API_URL, по умолчанию — api.telegram.org"""
+    return (os.getenv(TELEGRAM_API_ENV) or TELEGRAM_API).rstrip("/")
+
+
+def get_subscriber_chat_ids(token: str, api_url: Optional[str] = None) -> Optional[Set[int]]:
+    """
+    Получить множество chat_id всех пользователей/чатов,
+    которые когда‑либо писали этому боту (через getUpdates).
+
+    Returns:
+        Множество chat_id (пустое — подписчиков нет) или None, если getUpdates не удался
+    """
+    import requests
+
+    url = f"{api_url or telegram_api_url()}/bot{token}/getUpdates"
+    try:
+        resp = requests.get(url, timeout=15)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        print(f"⚠️  Не удалось получить getUpdates из Telegram: {e}")
+        return None
+
+    result = data.get("result", [])
+    chat_ids: Set[int] = set()
+
+    for update in result:
+        msg = update.get("message") or update.get("edited_message") or update.get("channel_post")
+        if not msg:
+            continue
+        chat = msg.get("chat") or {}
+        chat_id = chat.get("id")
+        if isinstance(chat_id, int):
+            chat_ids.add(chat_id)
+
+    return chat_ids
+
+
+class NotificationOutbox:
+    """Очередь оповещений в SQLite (WAL)"""
+
+    def __init__(self, path: Union[str, Path], timeout: float = 30.0):
+        """
+        Args:
+            path: Путь к файлу базы очереди
+            timeout: Сколько ждать блокировки записи другим процессом (в секундах)
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            " alert_key TEXT PRIMARY KEY,"
+            " photo_path TEXT NOT NULL,"
+            " caption TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " fanned_out INTEGER NOT NULL DEFAULT 0);"
+            "CREATE TABLE IF NOT EXISTS deliveries ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " alert_key TEXT NOT NULL,"
+            " chat_id INTEGER NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"  # pending / sending / sent / failed
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " claimed_at REAL,"
+            " last_error TEXT,"
+            " UNIQUE (alert_key, chat_id));"
+            "CREATE INDEX IF NOT EXISTS deliveries_due ON deliveries (status, next_attempt_at);"
+        )
+
+    def _transaction(self, func: Callable):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, alert_key: str, photo_path: Union[str, Path], caption: str) -> bool:
+        """
+        Поставить оповещение в очередь (не блокируется на сети).
+
+        Args:
+            alert_key: Ключ идемпотентности оповещения (одинаковый ключ — одно оповещение)
+            photo_path: Путь к скриншоту
+            caption: Подпись к скриншоту
+
+        Returns:
+            True, если оповещение новое; False, если такой ключ уже был в очереди
+        """
+        def insert(conn):
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO alerts (alert_key, photo_path, caption, created_at) VALUES (?, ?, ?, ?)",
+                (alert_key, str(photo_path), caption, time.time()),
+            )
+            return cur.rowcount == 1
+        return self._transaction(insert)
+
+    def pending_fanout(self) -> List[str]:
+        """Оповещения, для которых ещё не созданы доставки по подписчикам"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT alert_key FROM alerts WHERE fanned_out = 0 ORDER BY created_at")]
+
+    def fan_out(self, alert_key: str, chat_ids: Set[int]) -> None:
+        """Создать доставки оповещения для каждого подписчика"""
+        now = time.time()
+
+        def insert(conn):
+            conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (alert_key, chat_id, next_attempt_at) VALUES (?, ?, ?)",
+                [(alert_key, chat_id, now) for chat_id in sorted(chat_ids)],
+            )
+            conn.execute("UPDATE alerts SET fanned_out = 1 WHERE alert_key = ?", (alert_key,))
+        self._transaction(insert)
+
+    def claim_due(self, limit: int = 100, stale_after: float = 120.0) -> List[Dict]:
+        """
+        Атомарно захватить доставки, время которых пришло.
+        Доставки, зависшие в статусе sending дольше stale_after (процесс упал), захватываются повторно.
+        """
+        now = time.time()
+
+        def claim(conn):
+            records = conn.execute(
+                "SELECT d.id, d.alert_key, d.chat_id, d.attempts, a.photo_path, a.caption"
+                " FROM deliveries d JOIN alerts a ON a.alert_key = d.alert_key"
+                " WHERE (d.status = 'pending' AND d.next_attempt_at <= ?)"
+                "    OR (d.status = 'sending' AND d.claimed_at < ?)"
+                " ORDER BY d.chat_id, d.id LIMIT ?",
+                (now, now - stale_after, limit),
+            ).fetchall()
+            conn.executemany("UPDATE deliveries SET status = 'sending', claimed_at = ? WHERE id = ?",
+                             [(now, record[0]) for record in records])
+            return [{"id": r[0], "alert_key": r[1], "chat_id": r[2], "attempts": r[3],
+                     "photo_path": r[4], "caption": r[5]} for r in records]
+        return self._transaction(claim)
+
+    def mark_sent(self, delivery_ids: List[int]) -> None:
+        self._transaction(lambda conn: conn.executemany(
+            "UPDATE deliveries SET status = 'sent', last_error = NULL WHERE id = ?",
+            [(i,) for i in delivery_ids]))
+
+    def mark_failed(self, deliveries: List[Dict], error: str, max_attempts: int,
+                    base_delay: float, max_delay: float, retry_after: Optional[float] = None) -> None:
+        """Запланировать повтор с экспоненциальной задержкой или пометить доставку как неудачную"""
+        now = time.time()
+        updates = []
+        for delivery in deliveries:
+            attempts = delivery["attempts"] + 1
+            if attempts >= max_attempts:
+                updates.append(("failed", attempts, now, error, delivery["id"]))
+                continue
+            delay = min(max_delay, base_delay * 2 ** (attempts - 1))
+            delay = delay * (0.5 + random.random() / 2)  # jitter, чтобы повторы не шли пачкой
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            updates.append(("pending", attempts, now + delay, error, delivery["id"]))
+        self._transaction(lambda conn: conn.executemany(
+            "UPDATE deliveries SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            updates))
+
+    def stats(self) -> Dict[str, int]:
+        """Число доставок по статусам"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM deliveries GROUP BY status"))
+            counts["awaiting_fanout"] = self._conn.execute(
+                "SELECT COUNT(*) FROM alerts WHERE fanned_out = 0").fetchone()[0]
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxWorker:
+    """Фоновый поток доставки оповещений из очереди в Telegram"""
+
+    def __init__(self, outbox: NotificationOutbox,
+                 token: Optional[str] = None,
+                 poll_interval: float = 2.0,
+                 max_attempts: int = 8,
+                 base_delay: float = 2.0,
+                 max_delay: float = 600.0,
+                 subscribers_ttl: float = 60.0,
+                 api_url: Optional[str] = None):
+        """
+        Args:
+            outbox: Очередь оповещений
+            token: Токен бота (по умолчанию TELEGRAM_BOT_TOKEN)
+            poll_interval: Как часто проверять очередь, если не было сигнала wake()
+            max_attempts: После стольких неудачных попыток доставка помечается как failed
+            base_delay: Начальная задержка повтора, в секундах (далее удваивается)
+            max_delay: Максимальная задержка повтора, в секундах
+            subscribers_ttl: Сколько секунд кэшировать список подписчиков
+            api_url: Адрес Bot API (по умолчанию TELEGRAM_API_URL или api.telegram.org)
+        """
+        self.outbox = outbox
+        self.token = token or os.getenv("TELEGRAM_BOT_TOKEN")
+        self.api_url = (api_url or telegram_api_url()).rstrip("/")
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.subscribers_ttl = subscribers_ttl
+        self._subscribers: Optional[Set[int]] = None
+        self._subscribers_next: Optional[float] = None  # когда обновить список (time.monotonic())
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "OutboxWorker":
+        self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self) -> None:
+        """Сообщить потоку, что в очереди появилось новое оповещение"""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.process_once()
+            except Exception as e:
+                print(f"⚠️  Ошибка фоновой доставки оповещений: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _chat_ids(self) -> Set[int]:
+        now = time.monotonic()
+        if self._subscribers_next is None or now >= self._subscribers_next:
+            chat_ids = get_subscriber_chat_ids(self.token, self.api_url)
+            if chat_ids is None:
+                # При ошибке getUpdates оставляем прошлый список, если он был, и повторяем раньше
+                self._subscribers_next = now + min(self.subscribers_ttl, SUBSCRIBERS_RETRY)
+            else:
+                if not chat_ids:
+                    print("⚠️  Нет подписчиков (никто еще не написал боту), оповещения ждут в очереди.")
+                self._subscribers = chat_ids
+                self._subscribers_next = now + self.subscribers_ttl
+        return self._subscribers or set()
+
+    def process_once(self) -> int:
+        """
+        Один проход: разослать новые оповещения по подписчикам и отправить всё, что пора.
+
+        Returns:
+            Число успешно доставленных сообщений
+        """
+        if not self.token:
+            return 0
+
+        pending = self.outbox.pending_fanout()
+        if pending:
+            # Пока подписчиков не узнать (getUpdates не отвечает) или их нет, оповещения
+            # остаются в очереди: разослать их с пустым списком — значит потерять
+            chat_ids = self._chat_ids()
+            if chat_ids:
+                for alert_key in pending:
+                    self.outbox.fan_out(alert_key, chat_ids)
+
+        delivered = 0
+        by_chat: Dict[int, List[Dict]] = {}
+        for delivery in self.outbox.claim_due():
+            by_chat.setdefault(delivery["chat_id"], []).append(delivery)
+        for chat_id, deliveries in by_chat.items():
+            for i in range(0, len(deliveries), MEDIA_GROUP_MAX):
+                delivered += self._deliver(chat_id, deliveries[i:i + MEDIA_GROUP_MAX])
+        return delivered
+
+    def _deliver(self, chat_id: int, deliveries: List[Dict]) -> int:
+        import requests
+
+        base_url = f"{self.api_url}/bot{self.token}"
+        missing = [d for d in deliveries if not Path(d["photo_path"]).exists()]
+        if missing:
+            self.outbox.mark_failed(missing, "файл скриншота не найден", max_attempts=1,
+                                    base_delay=self.base_delay, max_delay=self.max_delay)
+            deliveries = [d for d in deliveries if d not in missing]
+            if not deliveries:
+                return 0
+
+        try:
+            with ExitStack() as stack:
+                if len(deliveries) == 1:
+                    delivery = deliveries[0]
+                    files = {"photo": stack.enter_context(open(delivery["photo_path"], "rb"))}
+                    data = {"chat_id": chat_id, "caption": delivery["caption"]}
+                    resp = requests.post(f"{base_url}/sendPhoto", data=data, files=files, timeout=15)
+                else:
+                    media, files = [], {}
+                    for n, delivery in enumerate(deliveries):
+                        name = f"photo{n}"
+                        files[name] = stack.enter_context(open(delivery["photo_path"], "rb"))
+                        media.append({"type": "photo", "media": f"attach://{name}", "caption": delivery["caption"]})
+                    data = {"chat_id": chat_id, "media": json.dumps(media, ensure_ascii=False)}
+                    resp = requests.post(f"{base_url}/sendMediaGroup", data=data, files=files, timeout=30)
+        except Exception as e:
+            print(f"⚠️  Исключение при отправке в Telegram для chat_id={chat_id}: {e}")
+            self.outbox.mark_failed(deliveries, str(e), self.max_attempts, self.base_delay, self.max_delay)
+            return 0
+
+        if resp.ok:
+            self.outbox.mark_sent([d["id"] for d in deliveries])
+            print(f"✅ Отправлено оповещений в Telegram (chat_id={chat_id}): {len(deliveries)}")
+            return len(deliveries)
+
+        retry_after = None
+        try:
+            retry_after = resp.json().get("parameters", {}).get("retry_after")
+        except ValueError:
+            pass
+        print(f"⚠️  Ошибка отправки в Telegram для chat_id={chat_id}: {resp.status_code} {resp.text[:200]}")
+        self.outbox.mark_failed(deliveries, f"{resp.status_code} {resp.text[:500]}", self.max_attempts,
+                                self.base_delay, self.max_delay, retry_after)
+        return 0
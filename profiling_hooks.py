@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Профилирование долгоживущего процесса по сигналу или команде, без перезапуска
+
+Пока ничего не запрошено, хуки ничего не стоят: установлены только обработчики
+сигналов (и, если задан, поток, ждущий подключения к управляющему сокету).
+
+Что покрывает профиль (kill -USR1 / "profile"):
+- основной поток — cProfile (точные числа вызовов и время по функциям);
+- все остальные потоки (пул OCR, запись архива, доставка в Telegram, ...) —
+  выборка стеков через sys._current_frames() каждые SAMPLE_INTERVAL секунд:
+  по каждой группе потоков (имя без номера: ocr_0, ocr_1 → ocr) — доля выборок
+  «занят» и топ функций по собственному и полному времени. Поток, ждущий
+  в threading/queue, считается простаивающим; ожидание внутри C-вызова
+  (sleep, сеть, SQLite) видно как время функции, которая его вызвала.
+cProfile.enable() профилирует только поток, в котором вызван, поэтому
+без выборки профиль наблюдателя показывал бы в основном future.result() и sleep.
+
+Сигналы:
+    kill -USR1 <pid>   — профиль на N секунд (повторный сигнал — остановить раньше)
+    kill -USR2 <pid>   — стеки всех потоков + снимок tracemalloc (первый сигнал включает трассировку)
+
+Управляющий Unix-сокет (одна команда на подключение, в ответ — путь к файлу):
+    echo "profile 60" | nc -U watchdog.sock
+    echo "memory"     | nc -U watchdog.sock    # снимок tracemalloc и разница с прошлым
+    echo "memory stop" | nc -U watchdog.sock   # выключить трассировку
+    echo "stacks"     | nc -U watchdog.sock
+
+Владелец хуков может добавить свои команды (add_command): например, наблюдатель
+добавляет "rows" (дамп строк таблицы) и "log" (уровень журнала).
+
+Результаты — файлы с отметкой времени в каталоге вывода:
+profile_*.pstats (основной поток) + .txt (топ основного потока и потоков по выборке)
++ .collapsed (стеки всех потоков для flamegraph.pl / speedscope), memory_*.txt, stacks_*.txt.
+"""
+
+import io
+import os
+import re
+import signal
+import socket
+import stat
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+DEFAULT_PROFILE_SECONDS = 30.0
+
+# Интервал выборки стеков остальных потоков, в секундах
+SAMPLE_INTERVAL = 0.005
+
+# Где ожидание считается простоем потока: файл и функция (None — любая функция файла).
+# _worker пула потоков ждёт задачу в C-вызове SimpleQueue.get, так что виден только он сам
+_IDLE_FRAMES = {("threading.py", None), ("queue.py", None), ("selectors.py", None), ("thread.py", "_worker")}
+
+
+class _ThreadSampler:
+    """Выборка стеков всех потоков, кроме основного (его профилирует cProfile)"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.ticks = 0
+        self.samples: Counter = Counter()        # группа -> выборок
+        self.busy: Counter = Counter()           # группа -> выборок «занят»
+        self.own: Dict[str, Counter] = {}        # группа -> функция -> собственных выборок
+        self.total: Dict[str, Counter] = {}      # группа -> функция -> выборок в стеке
+        self.stacks: Counter = Counter()         # "группа;f1;f2;..." -> выборок
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        skip = {threading.get_ident(), threading.main_thread().ident}
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident in skip:
+                    continue
+                group = re.sub(r"_\d+$", "", names.get(ident, "?"))
+                self.samples[group] += 1
+                filename = os.path.basename(frame.f_code.co_filename)
+                if (filename, None) in _IDLE_FRAMES or (filename, frame.f_code.co_name) in _IDLE_FRAMES:
+                    continue
+                functions = []
+                while frame is not None:
+                    code = frame.f_code
+                    functions.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.busy[group] += 1
+                self.own.setdefault(group, Counter())[functions[0]] += 1
+                self.total.setdefault(group, Counter()).update(set(functions))
+                self.stacks[";".join([group] + functions[::-1])] += 1
+            self.ticks += 1
+
+    def report(self, top: int) -> str:
+        lines = [f"Остальные потоки: выборка каждые {self.interval * 1000:g} мс, {self.ticks} выборок\n"]
+        for group, count in self.samples.most_common():
+            busy = self.busy[group]
+            lines.append(f"\n=== {group}: занят {busy / count:.0%} выборок ({busy} из {count}) ===\n")
+            if not busy:
+                continue
+            lines.append("  собственное время:\n")
+            lines.extend(f"    {n / busy:6.1%}  {name}\n" for name, n in self.own[group].most_common(top))
+            lines.append("  полное время (с вызванными):\n")
+            lines.extend(f"    {n / busy:6.1%}  {name}\n" for name, n in self.total[group].most_common(top))
+        return "".join(lines)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class ProfilingHooks:
+    """Профилирование по запросу: cProfile, tracemalloc и дамп стеков потоков"""
+
+    def __init__(self, output_dir: Union[str, Path],
+                 profile_seconds: float = DEFAULT_PROFILE_SECONDS,
+                 memory_frames: int = 25,
+                 top: int = 40):
+        """
+        Args:
+            output_dir: Каталог для файлов с результатами
+            profile_seconds: Длительность профилирования по сигналу, в секундах
+            memory_frames: Глубина стека, которую запоминает tracemalloc
+            top: Сколько строк выводить в текстовых отчётах
+        """
+        self.output_dir = Path(output_dir)
+        self.profile_seconds = profile_seconds
+        self.memory_frames = memory_frames
+        self.top = top
+        self._lock = threading.Lock()
+        self._profile = None
+        self._sampler: Optional[_ThreadSampler] = None
+        self._profile_started = 0.0
+        self._profile_timer: Optional[threading.Timer] = None
+        self._requested_seconds: Optional[float] = None
+        self._last_file: Optional[Path] = None
+        self._file_ready = threading.Event()
+        self._memory_snapshot = None
+        self._socket: Optional[socket.socket] = None
+        self._socket_path: Optional[str] = None
+        self._installed_signals = []
+        self._commands: Dict[str, Callable[[List[str]], str]] = {}
+
+    # --- установка ---
+
+    def install(self, control_socket: Optional[str] = None) -> "ProfilingHooks":
+        """
+        Установить обработчики SIGUSR1/SIGUSR2 (только из основного потока)
+        и, если задан путь, открыть управляющий Unix-сокет.
+        """
+        for name, handler in (("SIGUSR1", self._on_profile_signal), ("SIGUSR2", self._on_dump_signal)):
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                self._installed_signals.append((signum, signal.signal(signum, handler)))
+        if control_socket:
+            self._open_socket(control_socket)
+        return self
+
+    def close(self) -> None:
+        """Остановить профилирование, вернуть прежние обработчики сигналов и закрыть сокет"""
+        if self._profile is not None and threading.current_thread() is threading.main_thread():
+            self._stop_profile()
+        for signum, previous in self._installed_signals:
+            signal.signal(signum, previous)
+        self._installed_signals = []
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            if self._socket_path and os.path.exists(self._socket_path):
+                os.unlink(self._socket_path)
+
+    def add_command(self, name: str, handler: Callable[[List[str]], str]) -> None:
+        """
+        Добавить команду управляющего сокета.
+
+        Args:
+            name: Имя команды (первое слово)
+            handler: Функция от списка аргументов команды, возвращает ответ
+        """
+        self._commands[name] = handler
+
+    def write_report(self, prefix: str, text: str) -> Path:
+        """Записать текстовый отчёт в каталог вывода. Returns: путь к файлу"""
+        path = self._path(prefix, ".txt")
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def _path(self, prefix: str, suffix: str) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        path = self.output_dir / f"{prefix}_{stamp}_{os.getpid()}{suffix}"
+        n = 1
+        while path.exists():
+            n += 1
+            path = self.output_dir / f"{prefix}_{stamp}_{os.getpid()}_{n}{suffix}"
+        return path
+
+    # --- cProfile основного потока (профилировщик привязан к потоку) + выборка остальных ---
+
+    def _on_profile_signal(self, signum, frame) -> None:
+        if self._profile is None:
+            self._start_profile(self._requested_seconds or self.profile_seconds)
+        else:
+            self._stop_profile()
+        self._requested_seconds = None
+
+    def _start_profile(self, seconds: float) -> None:
+        import cProfile
+        import pstats  # noqa: F401 — импорт заранее, чтобы он не попал в профиль
+
+        self._profile = cProfile.Profile()
+        self._sampler = _ThreadSampler()
+        self._profile_started = time.perf_counter()
+        self._sampler.start()
+        self._profile.enable()
+        print(f"🔬 Профилирование запущено на {seconds:g} c")
+        # Остановить должен тот же поток: таймер посылает сигнал себе же
+        self._profile_timer = threading.Timer(seconds, os.kill, (os.getpid(), signal.SIGUSR1))
+        self._profile_timer.daemon = True
+        self._profile_timer.start()
+
+    def _stop_profile(self) -> None:
+        import pstats
+
+        profile, self._profile = self._profile, None
+        profile.disable()
+        sampler, self._sampler = self._sampler, None
+        sampler.stop()
+        if self._profile_timer is not None:
+            self._profile_timer.cancel()
+            self._profile_timer = None
+        elapsed = time.perf_counter() - self._profile_started
+
+        path = self._path("profile", ".pstats")
+        profile.dump_stats(str(path))
+        report = io.StringIO()
+        stats = pstats.Stats(profile, stream=report)
+        report.write(f"Профиль основного потока за {elapsed:.1f} c\n\n")
+        stats.sort_stats("cumulative").print_stats(self.top)
+        stats.sort_stats("tottime").print_stats(self.top)
+        report.write("\n" + sampler.report(self.top))
+        path.with_suffix(".txt").write_text(report.getvalue(), encoding="utf-8")
+        path.with_suffix(".collapsed").write_text(sampler.collapsed(), encoding="utf-8")
+        print(f"🔬 Профиль сохранён: {path} (и {path.with_suffix('.txt').name}, "
+              f"{path.with_suffix('.collapsed').name})")
+        self._finish(path)
+
+    # --- стеки и память (можно из любого потока) ---
+
+    def _on_dump_signal(self, signum, frame) -> None:
+        self.dump_stacks()
+        self.memory_snapshot()
+
+    def dump_stacks(self) -> Path:
+        """Записать стеки всех потоков в файл"""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        lines = []
+        for ident, frame in sys._current_frames().items():
+            lines.append(f"--- Поток {names.get(ident, '?')} (id={ident}) ---\n")
+            lines.extend(traceback.format_stack(frame))
+            lines.append("\n")
+        path = self._path("stacks", ".txt")
+        path.write_text("".join(lines), encoding="utf-8")
+        print(f"🧵 Стеки потоков сохранены: {path}")
+        return path
+
+    def memory_snapshot(self) -> Optional[Path]:
+        """
+        Снимок tracemalloc: топ мест выделения памяти и рост с прошлого снимка.
+        Первый вызов только включает трассировку (до неё выделения не видны).
+        """
+        import tracemalloc
+
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.memory_frames)
+                self._memory_snapshot = tracemalloc.take_snapshot()
+                print("🧠 tracemalloc включён; следующий запрос сохранит снимок и рост памяти")
+                return None
+
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            current, peak = tracemalloc.get_traced_memory()
+            lines = [f"Отслеживается: {current / 1024 / 1024:.1f} МБ (пик {peak / 1024 / 1024:.1f} МБ)\n\n",
+                     f"Топ {self.top} мест выделения памяти:\n"]
+            lines.extend(f"  {stat}\n" for stat in snapshot.statistics("lineno")[:self.top])
+            if self._memory_snapshot is not None:
+                lines.append(f"\nРост с прошлого снимка (топ {self.top}):\n")
+                diff = snapshot.compare_to(self._memory_snapshot, "lineno")
+                lines.extend(f"  {stat}\n" for stat in diff[:self.top])
+            self._memory_snapshot = snapshot
+
+        path = self._path("memory", ".txt")
+        path.write_text("".join(lines), encoding="utf-8")
+        print(f"🧠 Снимок памяти сохранён: {path}")
+        return path
+
+    def memory_stop(self) -> None:
+        import tracemalloc
+
+        with self._lock:
+            tracemalloc.stop()
+            self._memory_snapshot = None
+        print("🧠 tracemalloc выключен")
+
+    # --- управляющий сокет ---
+
+    def _finish(self, path: Path) -> None:
+        self._last_file = path
+        self._file_ready.set()
+
+    def _open_socket(self, path: str) -> None:
+        # Чужой живой сокет не отбираем: его владелец стал бы недоступен.
+        # Удаляется только сокет, который никто не слушает (остался от упавшего процесса)
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                print(f"⚠️  {path} существует и это не сокет: управляющий сокет не открыт")
+                return
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except OSError:
+                os.unlink(path)
+            else:
+                print(f"⚠️  Управляющий сокет {path} занят другим процессом: не открыт")
+                return
+            finally:
+                probe.close()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        os.chmod(path, 0o600)
+        sock.listen(2)
+        self._socket, self._socket_path = sock, path
+        threading.Thread(target=self._serve, name="profiling-control", daemon=True).start()
+        print(f"🔬 Управляющий сокет профилирования: {path}")
+
+    def _serve(self) -> None:
+        while self._socket is not None:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    command = conn.recv(1024).decode("utf-8", "replace").split()
+                    reply = self._command(command)
+                except Exception as e:
+                    reply = f"ошибка: {e}"
+                try:
+                    conn.sendall((reply + "\n").encode("utf-8"))
+                except OSError:
+                    pass
+
+    def _command(self, command) -> str:
+        if not command:
+            return "команды: " + ", ".join(["profile [секунды]", "memory [stop]", "stacks"] + list(self._commands))
+        name, args = command[0], command[1:]
+        if name in self._commands:
+            return self._commands[name](args)
+        if name == "stacks":
+            return str(self.dump_stacks())
+        if name == "memory":
+            if args == ["stop"]:
+                self.memory_stop()
+                return "tracemalloc выключен"
+            path = self.memory_snapshot()
+            return str(path) if path else "tracemalloc включён, повторите команду позже"
+        if name == "profile":
+            if self._profile is not None:
+                return "профилирование уже идёт"
+            seconds = float(args[0]) if args else self.profile_seconds
+            self._requested_seconds = seconds
+            self._file_ready.clear()
+            os.kill(os.getpid(), signal.SIGUSR1)  # запуск — в основном потоке
+            if self._file_ready.wait(seconds + 30):
+                return str(self._last_file)
+            return "профилирование запущено, результат будет в каталоге вывода"
+        return f"неизвестная команда: {name}"
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Компактное колоночное представление строк таблицы
+
+Наблюдатель работает неделями, а список словарей со строками и float
+занимает сотни байт на строку. `RowColumns` хранит те же данные по колонкам:
+
+- суммы и время захвата — array('d');
+- событие, время и область — индексы array('I') в таблицах уникальных
+  (интернированных) строк;
+- unique_id — 16 байт MD5 подряд в одном bytearray вместо hex-строк.
+
+Снаружи это по-прежнему «список словарей»: len(), итерация, индексы и срезы,
+append/extend. Словари создаются на лету при обращении.
+"""
+
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+ID_SIZE = 16
+
+# Индекс 0 в таблице областей означает «поле region отсутствует» (старые строки)
+_NO_REGION = 0
+
+
+class _StringTable:
+    """Таблица уникальных строк: строка <-> номер"""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self._codes: Dict[Optional[str], int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            if value is not None:
+                value = sys.intern(value)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def nbytes(self) -> int:
+        return (sys.getsizeof(self.values) + sys.getsizeof(self._codes)
+                + sum(sys.getsizeof(v) for v in self.values if v is not None))
+
+
+class RowColumns:
+    """Список строк таблицы, хранящийся по колонкам"""
+
+    def __init__(self, rows: Optional[Iterable[Dict]] = None):
+        self._events = _StringTable()
+        self._times = _StringTable()
+        self._regions = _StringTable()
+        self._regions.code(None)  # _NO_REGION
+
+        self._event_codes = array('I')
+        self._time_codes = array('I')
+        self._region_codes = array('I')
+        self._amounts = array('d')
+        self._captured_at = array('d')  # NaN — отметки времени нет
+        self._ids = bytearray()
+
+        # Редкие случаи храним отдельно: нестандартные unique_id и дополнительные поля
+        self._raw_ids: Dict[int, str] = {}
+        self._extras: Dict[int, Dict[str, Any]] = {}
+
+        if rows is not None:
+            self.extend(rows)
+
+    # --- list-подобный API ---
+
+    def append(self, row: Dict) -> None:
+        index = len(self._amounts)
+        self._event_codes.append(self._events.code(row.get("event", "")))
+        self._time_codes.append(self._times.code(row.get("time", "")))
+        self._region_codes.append(self._regions.code(row.get("region")))
+        self._amounts.append(float(row["amount"]))
+        self._captured_at.append(float(row.get("captured_at", math.nan)))
+
+        unique_id = row["unique_id"]
+        try:
+            raw = bytes.fromhex(unique_id)
+        except (TypeError, ValueError):
+            raw = b""
+        if len(raw) == ID_SIZE and raw.hex() == unique_id:
+            self._ids += raw
+        else:
+            self._ids += bytes(ID_SIZE)
+            self._raw_ids[index] = unique_id
+
+        extra = {k: v for k, v in row.items()
+                 if k not in ("event", "time", "amount", "unique_id", "region", "captured_at")}
+        if extra:
+            self._extras[index] = extra
+
+    def extend(self, rows: Iterable[Dict]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def __len__(self) -> int:
+        return len(self._amounts)
+
+    def __bool__(self) -> bool:
+        return len(self._amounts) > 0
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RowColumns index out of range")
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        # Горячий путь: без вызова _row() на каждую строку
+        events, times, regions = self._events.values, self._times.values, self._regions.values
+        ids, raw_ids, extras = self._ids, self._raw_ids, self._extras
+        isnan = math.isnan
+        columns = zip(self._event_codes, self._time_codes, self._amounts,
+                      self._region_codes, self._captured_at)
+        for i, (event, time_code, amount, region, captured_at) in enumerate(columns):
+            row = {
+                "event": events[event],
+                "time": times[time_code],
+                "amount": amount,
+                "unique_id": raw_ids[i] if i in raw_ids else ids[i * ID_SIZE:(i + 1) * ID_SIZE].hex(),
+            }
+            if region != _NO_REGION:
+                row["region"] = regions[region]
+            if not isnan(captured_at):
+                row["captured_at"] = captured_at
+            if i in extras:
+                row.update(extras[i])
+            yield row
+
+    def _row(self, i: int) -> Dict:
+        row = {
+            "event": self._events.values[self._event_codes[i]],
+            "time": self._times.values[self._time_codes[i]],
+            "amount": self._amounts[i],
+            "unique_id": self.unique_id(i),
+        }
+        region = self._regions.values[self._region_codes[i]]
+        if region is not None:
+            row["region"] = region
+        captured_at = self._captured_at[i]
+        if not math.isnan(captured_at):
+            row["captured_at"] = captured_at
+        extra = self._extras.get(i)
+        if extra:
+            row.update(extra)
+        return row
+
+    # --- доступ к колонкам без создания словарей ---
+
+    def unique_id(self, i: int) -> str:
+        raw_id = self._raw_ids.get(i)
+        if raw_id is not None:
+            return raw_id
+        return self._ids[i * ID_SIZE:(i + 1) * ID_SIZE].hex()
+
+    def amounts(self) -> array:
+        """Колонка сумм (без копирования)"""
+        return self._amounts
+
+    def memory_footprint(self) -> int:
+        """Оценка занимаемой памяти в байтах (колонки + таблицы строк)"""
+        columns = (self._event_codes, self._time_codes, self._region_codes,
+                   self._amounts, self._captured_at)
+        total = sum(col.buffer_info()[1] * col.itemsize for col in columns)
+        total += len(self._ids)
+        total += self._events.nbytes() + self._times.nbytes() + self._regions.nbytes()
+        total += sys.getsizeof(self._raw_ids) + sum(sys.getsizeof(v) for v in self._raw_ids.values())
+        total += sys.getsizeof(self._extras) + sum(sys.getsizeof(v) for v in self._extras.values())
+        return total
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Потоковая аналитика по истории строк таблицы
+
+Читает строки из истории (каталог сегментов, JSON, JSONL или SQLite) по одной,
+за один проход считает агрегаты по группам, top-N сумм (через кучу),
+перцентили (логарифмический скетч с точностью ~1%) и гистограммы по корзинам
+времени. Память зависит от числа групп и N, но не от размера истории.
+
+Примеры:
+    python row_stats.py history --group-by bucket --bucket 5m
+    python row_stats.py table_rows.db --since today --top 20 --format json
+    python row_stats.py history --since=-2h --group-by region   # относительное время — через "="
+    python row_stats.py table_rows.json --group-by region,event --percentiles 50,90,99
+    python row_stats.py history --group-by display_bucket --bucket 15m --min-amount 1000
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import math
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fuzzy_index import parse_minute_of_day
+from row_store import DEFAULT_REGION, iter_rows_from
+
+GROUP_FIELDS = ("region", "event", "bucket", "display_bucket")
+
+
+class QuantileSketch:
+    """
+    Скетч перцентилей с относительной точностью `accuracy` (как DDSketch):
+    значения раскладываются по логарифмическим корзинам, память — O(log(max/min)).
+    """
+
+    def __init__(self, accuracy: float = 0.01):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zeros = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= 0:
+            self._zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                # Середина корзины (gamma^(i-1), gamma^i] в смысле относительной ошибки
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self._buckets) / (self.gamma + 1)
+
+
+class GroupStats:
+    """Агрегаты одной группы, обновляются по одной строке"""
+
+    def __init__(self, with_quantiles: bool):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch() if with_quantiles else None
+
+    def add(self, amount: float) -> None:
+        self.count += 1
+        self.total += amount
+        self.min = min(self.min, amount)
+        self.max = max(self.max, amount)
+        if self.sketch is not None:
+            self.sketch.add(amount)
+
+
+def parse_time_arg(value: str) -> float:
+    """
+    Разобрать границу времени: "today", "yesterday", "-2h"/"-30m"/"-7d" (относительно сейчас),
+    ISO-дата "2026-10-19" / "2026-10-19T12:00" (локальное время) или unix-время.
+    """
+    value = value.strip()
+    now = datetime.now()
+    if value == "today":
+        return datetime(now.year, now.month, now.day).timestamp()
+    if value == "yesterday":
+        return (datetime(now.year, now.month, now.day) - timedelta(days=1)).timestamp()
+    if value.startswith("-") and value[-1] in "smhd":
+        return time.time() - parse_duration(value[1:])
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def parse_duration(value: str) -> float:
+    """Разобрать длительность: "30s", "5m", "2h", "1d" (без суффикса — секунды)"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def _group_key(row: Dict, fields: List[str], bucket_seconds: float) -> Tuple:
+    key = []
+    for field in fields:
+        if field == "region":
+            key.append(row.get("region", DEFAULT_REGION))
+        elif field == "event":
+            key.append(row.get("event", ""))
+        elif field == "bucket":
+            captured_at = row.get("captured_at")
+            if captured_at is None:
+                key.append("")
+            else:
+                start = captured_at - captured_at % bucket_seconds
+                key.append(datetime.fromtimestamp(start).isoformat(timespec="seconds"))
+        elif field == "display_bucket":
+            minute = parse_minute_of_day(row.get("time", ""))
+            if minute is None:
+                key.append("")
+            else:
+                bucket_minutes = max(1, int(bucket_seconds // 60))
+                start = minute - minute % bucket_minutes
+                key.append(f"{start // 60:02d}:{start % 60:02d}")
+    return tuple(key)
+
+
+def compute_stats(rows: Iterable[Dict],
+                  group_by: List[str],
+                  bucket_seconds: float = 300.0,
+                  percentiles: Optional[List[float]] = None,
+                  top: int = 0,
+                  min_amount: Optional[float] = None,
+                  region: Optional[str] = None) -> Dict:
+    """
+    Один проход по строкам: агрегаты по группам, перцентили и top-N сумм.
+
+    Returns:
+        {"rows": число учтённых строк, "groups": [...], "top": [...]}
+    """
+    groups: Dict[Tuple, GroupStats] = {}
+    top_heap: List[Tuple[float, int, Dict]] = []
+    with_quantiles = bool(percentiles)
+    seen = 0
+
+    for seq, row in enumerate(rows):
+        amount = row.get("amount")
+        if amount is None:
+            continue
+        if min_amount is not None and amount < min_amount:
+            continue
+        if region is not None and row.get("region", DEFAULT_REGION) != region:
+            continue
+        seen += 1
+
+        key = _group_key(row, group_by, bucket_seconds)
+        stats = groups.get(key)
+        if stats is None:
+            stats = groups[key] = GroupStats(with_quantiles)
+        stats.add(amount)
+
+        if top > 0:
+            item = (amount, -seq, {k: row.get(k) for k in ("event", "time", "amount", "region", "captured_at")})
+            if len(top_heap) < top:
+                heapq.heappush(top_heap, item)
+            elif item > top_heap[0]:
+                heapq.heapreplace(top_heap, item)
+
+    group_rows = []
+    for key in sorted(groups):
+        stats = groups[key]
+        record = dict(zip(group_by, key))
+        record.update({
+            "count": stats.count,
+            "sum": round(stats.total, 2),
+            "min": stats.min,
+            "max": stats.max,
+            "mean": round(stats.total / stats.count, 2),
+        })
+        for p in percentiles or []:
+            value = stats.sketch.quantile(p / 100)
+            record[f"p{p:g}"] = round(value, 2) if value is not None else None
+        group_rows.append(record)
+
+    top_rows = [item[2] for item in sorted(top_heap, reverse=True)]
+    return {"rows": seen, "groups": group_rows, "top": top_rows}
+
+
+def _write_csv(records: List[Dict], out) -> None:
+    if not records:
+        return
+    fields = []
+    for record in records:
+        for k in record:
+            if k not in fields:
+                fields.append(k)
+    writer = csv.DictWriter(out, fieldnames=fields)
+    writer.writeheader()
+    writer.writerows(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Потоковая аналитика по истории строк таблицы")
+    parser.add_argument("source", help="каталог сегментов, table_rows.json, *.jsonl[.gz] или база *.db")
+    parser.add_argument("--group-by", default="",
+                        help=f"поля группировки через запятую: {', '.join(GROUP_FIELDS)}")
+    parser.add_argument("--bucket", default="5m", help="размер корзины времени (30s, 5m, 1h, ...)")
+    parser.add_argument("--percentiles", default="", help="перцентили сумм через запятую, например 50,90,99")
+    parser.add_argument("--top", type=int, default=0, help="показать N самых больших сумм")
+    parser.add_argument("--since", help="начало периода: today, yesterday, -2h, 2026-10-19, unix-время")
+    parser.add_argument("--until", help="конец периода (не включительно), в том же формате")
+    parser.add_argument("--region", help="учитывать только строки этой области")
+    parser.add_argument("--min-amount", type=float, help="учитывать только суммы не меньше заданной")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv", help="формат вывода")
+    args = parser.parse_args()
+
+    group_by = [f.strip() for f in args.group_by.split(",") if f.strip()]
+    unknown = [f for f in group_by if f not in GROUP_FIELDS]
+    if unknown:
+        parser.error(f"неизвестные поля группировки: {', '.join(unknown)}")
+    percentiles = [float(p) for p in args.percentiles.split(",") if p.strip()]
+
+    since = parse_time_arg(args.since) if args.since else None
+    until = parse_time_arg(args.until) if args.until else None
+
+    result = compute_stats(
+        iter_rows_from(args.source, since, until),
+        group_by=group_by,
+        bucket_seconds=parse_duration(args.bucket),
+        percentiles=percentiles,
+        top=args.top,
+        min_amount=args.min_amount,
+        region=args.region,
+    )
+
+    if args.format == "json":
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        _write_csv(result["groups"], sys.stdout)
+        if result["top"]:
+            sys.stdout.write("\n")
+            _write_csv(result["top"], sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+Хранилища строк таблицы для наблюдателя (`mouse_watchdog.py`)
+
+- JsonRowStore      — один процесс, строки в памяти + JSON-файл (как раньше)
+- SegmentedRowStore — один процесс, история по временным сегментам (JSONL):
+                      в памяти только «горячее» окно, старые сегменты сжимаются
+                      и читаются с диска только по запросу
+- SqliteRowStore    — общее хранилище для нескольких процессов (SQLite в режиме WAL),
+                      дедупликация атомарна между процессами
+
+Общий интерфейс: add_new(rows), recent_rows(), iter_history(since, until), len(), close().
+"""
+
+import calendar
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qs
+
+from row_columns import RowColumns
+
+# Имя области по умолчанию (весь экран). Строки, сохранённые до появления
+# областей, не содержат поля "region" и относятся к ней.
+DEFAULT_REGION = "default"
+
+# Переменная окружения с описанием общего хранилища строк (см. open_row_store),
+# например "sqlite:/var/lib/watchdog/rows.db". Если не задана — table_rows.json.
+STORE_ENV = "WATCHDOG_STORE"
+
+# Метка процесса-воркера (задаётся координатором), добавляется к именам файлов скриншотов
+WORKER_ENV = "WATCHDOG_WORKER_ID"
+
+# «Горячее» окно истории по умолчанию: строки за последние сутки
+DEFAULT_HOT_SECONDS = 24 * 3600
+
+
+def row_key(row: Dict) -> Tuple[str, str]:
+    """Ключ дедупликации: (область, unique_id)"""
+    return row.get("region", DEFAULT_REGION), row["unique_id"]
+
+
+def _compact_key(row: Dict) -> bytes:
+    """Ключ дедупликации в компактном виде: область + 16 байт MD5 (вместо кортежа строк)"""
+    region, unique_id = row_key(row)
+    try:
+        raw_id = bytes.fromhex(unique_id)
+    except ValueError:
+        raw_id = unique_id.encode("utf-8")
+    return region.encode("utf-8") + b"\0" + raw_id
+
+
+class JsonRowStore:
+    """Строки в памяти процесса (колоночно, см. RowColumns), сохраняются целиком в JSON-файл"""
+
+    def __init__(self, path: Union[str, Path], rows: Optional[Union[RowColumns, List[Dict]]] = None):
+        """
+        Args:
+            path: Путь к JSON-файлу
+            rows: Уже загруженные строки (если None — читаются из файла)
+        """
+        self.path = Path(path)
+        if rows is None:
+            rows = self._load()
+        self.rows = rows if isinstance(rows, RowColumns) else RowColumns(rows)
+        self._keys = {_compact_key(row) for row in self.rows}
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[Dict]:
+        if not self.path.exists():
+            return []
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            return data if isinstance(data, list) else []
+        except Exception as e:
+            print(f"⚠️  Не удалось загрузить файл {self.path}: {e}")
+            return []
+
+    def add_new(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Добавить строки, которых ещё нет в хранилище.
+
+        Returns:
+            Список действительно добавленных (новых) строк
+        """
+        with self._lock:
+            new_rows = []
+            for row in rows:
+                key = _compact_key(row)
+                if key not in self._keys:
+                    self._keys.add(key)
+                    new_rows.append(row)
+            if new_rows:
+                self.rows.extend(new_rows)
+                self.save()
+            return new_rows
+
+    def save(self) -> None:
+        """
+        Сохранить все строки в файл (через временный файл, чтобы не оставить обрезанный JSON).
+        Строки пишутся по одной, без сборки всего списка словарей в памяти;
+        формат совпадает с json.dumps(rows, indent=2).
+        """
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("[")
+                for i, row in enumerate(self.rows):
+                    f.write(",\n  " if i else "\n  ")
+                    f.write(json.dumps(row, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+                f.write("\n]" if len(self.rows) else "]")
+            os.replace(tmp_path, self.path)
+            print(f"Сохранено {len(self.rows)} строк таблицы в {self.path}.")
+        except Exception as e:
+            print(f"⚠️  Не удалось сохранить файл {self.path}: {e}")
+
+    def recent_rows(self, max_age: Optional[float] = None) -> RowColumns:
+        """Все строки (JSON-хранилище целиком живёт в памяти)"""
+        return self.rows
+
+    def iter_history(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Dict]:
+        for row in self.rows:
+            captured_at = row.get("captured_at")
+            if captured_at is not None:
+                if since is not None and captured_at < since:
+                    continue
+                if until is not None and captured_at >= until:
+                    continue
+            yield row
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.rows)
+
+    def close(self) -> None:
+        pass
+
+
+_SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+class _Segment:
+    """Сегмент истории: строки за интервал [start, start + длина сегмента)"""
+
+    def __init__(self, start: int, path: Path):
+        self.start = start
+        self.path = path
+        self.rows: Optional[RowColumns] = None  # None — сегмент не загружен в память
+        self.keys: set = set()
+
+    @property
+    def compressed(self) -> bool:
+        return self.path.suffix == ".gz"
+
+    def read(self) -> Iterator[Dict]:
+        """Прочитать строки сегмента с диска (повреждённые строки пропускаются)"""
+        path = self.path
+        if not path.exists() and path.suffix != ".gz":
+            # Сегмент только что сжат фоновым потоком
+            path = path.with_name(path.name + ".gz")
+            if not path.exists():
+                return  # новый сегмент: файла ещё нет
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # недописанная строка после аварийного завершения
+
+
+class SegmentedRowStore:
+    """
+    История строк, разбитая на временные сегменты (по умолчанию — по часу).
+
+    Каждый сегмент — отдельный JSONL-файл в каталоге истории, новые строки
+    дописываются в конец текущего сегмента. При запуске загружаются только
+    сегменты из «горячего» окна (по умолчанию — сутки), поэтому время старта
+    не зависит от размера всей истории. Сегменты старше окна выгружаются из памяти,
+    при compress=True сжимаются в .jsonl.gz в фоне и читаются лениво через iter_history().
+
+    Дедупликация выполняется в пределах горячего окна.
+    """
+
+    def __init__(self, directory: Union[str, Path],
+                 hot_seconds: float = DEFAULT_HOT_SECONDS,
+                 segment_seconds: int = 3600,
+                 compress: bool = True,
+                 legacy_file: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            directory: Каталог с сегментами истории
+            hot_seconds: Сколько секунд истории держать в памяти
+            segment_seconds: Длина одного сегмента, в секундах
+            compress: Сжимать ли сегменты, вышедшие из горячего окна
+            legacy_file: Старый table_rows.json — импортируется, если каталог истории пуст
+        """
+        self.directory = Path(directory)
+        self.hot_seconds = hot_seconds
+        self.segment_seconds = int(segment_seconds)
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._compress_thread: Optional[threading.Thread] = None
+        self._current_file = None
+        self._current_start: Optional[int] = None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._segments: Dict[int, _Segment] = self._scan_segments()
+
+        if not self._segments and legacy_file is not None and Path(legacy_file).exists():
+            self._import_legacy(Path(legacy_file))
+            self._segments = self._scan_segments()
+
+        hot_from = time.time() - self.hot_seconds
+        loaded = 0
+        for segment in self._segments.values():
+            if self._segment_end(segment) > hot_from:
+                self._load_segment(segment)
+                loaded += len(segment.rows)
+        print(f"История: {len(self._segments)} сегментов в {self.directory}, "
+              f"в памяти {loaded} строк за последние {self.hot_seconds / 3600:g} ч.")
+        self._schedule_compression()
+
+    # --- сегменты на диске ---
+
+    def _segment_path(self, start: int) -> Path:
+        name = time.strftime(_SEGMENT_TIME_FORMAT, time.gmtime(start))
+        return self.directory / f"rows-{name}.jsonl"
+
+    def _scan_segments(self) -> Dict[int, _Segment]:
+        segments: Dict[int, _Segment] = {}
+        for path in self.directory.glob("rows-*.jsonl*"):
+            stem = path.name[len("rows-"):].split(".", 1)[0]
+            try:
+                start = calendar.timegm(time.strptime(stem, _SEGMENT_TIME_FORMAT))
+            except ValueError:
+                continue
+            # Если есть и сжатая, и несжатая версия — несжатая ещё не дожата, берём её
+            if start in segments and not segments[start].compressed:
+                continue
+            segments[start] = _Segment(start, path)
+        return dict(sorted(segments.items()))
+
+    def _segment_end(self, segment: _Segment) -> float:
+        return segment.start + self.segment_seconds
+
+    def _segment_start(self, timestamp: float) -> int:
+        return int(timestamp // self.segment_seconds) * self.segment_seconds
+
+    def _load_segment(self, segment: _Segment) -> None:
+        segment.rows = RowColumns(segment.read())
+        segment.keys = {_compact_key(row) for row in segment.rows}
+
+    def _import_legacy(self, legacy_file: Path) -> None:
+        """
+        Разложить строки старого table_rows.json по сегментам. Время захвата — момент
+        импорта, а не время изменения файла: иначе старый файл сразу оказался бы вне
+        горячего окна и строки с экрана снова считались бы новыми.
+        """
+        rows = JsonRowStore(legacy_file).rows
+        captured_at = time.time()
+        path = self._segment_path(self._segment_start(captured_at))
+        with open(path, "w", encoding="utf-8") as f:
+            for row in rows:
+                row.setdefault("captured_at", captured_at)
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        print(f"Импортировано {len(rows)} строк из {legacy_file} в {path}.")
+
+    def _schedule_compression(self) -> None:
+        """Сжать в фоне сегменты, вышедшие из горячего окна"""
+        if not self.compress:
+            return
+        if self._compress_thread is not None and self._compress_thread.is_alive():
+            return
+        hot_from = time.time() - self.hot_seconds
+        pending = [s for s in self._segments.values()
+                   if not s.compressed and self._segment_end(s) <= hot_from and s.start != self._current_start]
+        if pending:
+            self._compress_thread = threading.Thread(target=self._compress_segments, args=(pending,),
+                                                     name="segment-compress", daemon=True)
+            self._compress_thread.start()
+
+    def _compress_segments(self, segments: List[_Segment]) -> None:
+        for segment in segments:
+            gz_path = segment.path.with_name(segment.path.name + ".gz")
+            tmp_path = gz_path.with_name(gz_path.name + ".tmp")
+            try:
+                with open(segment.path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                    for chunk in iter(lambda: src.read(1 << 20), b""):
+                        dst.write(chunk)
+                os.replace(tmp_path, gz_path)
+                old_path = segment.path
+                segment.path = gz_path
+                old_path.unlink()
+            except Exception as e:
+                print(f"⚠️  Не удалось сжать сегмент {segment.path}: {e}")
+
+    def _evict_cold(self, now: float) -> None:
+        """Выгрузить из памяти сегменты старше горячего окна"""
+        hot_from = now - self.hot_seconds
+        evicted = False
+        for segment in self._segments.values():
+            if segment.rows is not None and self._segment_end(segment) <= hot_from:
+                segment.rows = None
+                segment.keys = set()
+                evicted = True
+        if evicted:
+            self._schedule_compression()
+
+    # --- интерфейс хранилища ---
+
+    def add_new(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Добавить строки, которых нет в горячем окне, и дописать их в текущий сегмент.
+
+        Returns:
+            Список действительно добавленных (новых) строк
+        """
+        now = time.time()
+        with self._lock:
+            hot_keys = [s.keys for s in self._segments.values() if s.rows is not None]
+            new_rows = []
+            seen = set()
+            for row in rows:
+                key = _compact_key(row)
+                if key in seen or any(key in keys for keys in hot_keys):
+                    continue
+                seen.add(key)
+                row.setdefault("captured_at", now)
+                new_rows.append(row)
+            if not new_rows:
+                return []
+
+            start = self._segment_start(now)
+            if start != self._current_start:
+                self._roll_segment(start)
+                self._evict_cold(now)
+            segment = self._segments[start]
+            for row in new_rows:
+                self._current_file.write(json.dumps(row, ensure_ascii=False) + "\n")
+                segment.rows.append(row)
+                segment.keys.add(_compact_key(row))
+            self._current_file.flush()
+        print(f"Записано {len(new_rows)} строк в {segment.path.name}.")
+        return new_rows
+
+    def _roll_segment(self, start: int) -> None:
+        if self._current_file is not None:
+            self._current_file.close()
+        segment = self._segments.get(start)
+        if segment is None or segment.compressed:
+            segment = _Segment(start, self._segment_path(start))
+            self._segments[start] = segment
+        if segment.rows is None:
+            self._load_segment(segment)
+        self._current_file = open(segment.path, "a", encoding="utf-8")
+        self._current_start = start
+
+    def recent_rows(self, max_age: Optional[float] = None) -> List[Dict]:
+        """Строки горячего окна (или за последние max_age секунд, если окно меньше)"""
+        since = time.time() - max_age if max_age is not None else None
+        result = []
+        with self._lock:
+            for segment in self._segments.values():
+                if segment.rows is None:
+                    continue
+                if since is not None and self._segment_end(segment) <= since:
+                    continue
+                result.extend(segment.rows)
+        if since is not None:
+            result = [row for row in result if row.get("captured_at", since) >= since]
+        return result
+
+    def iter_history(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Все строки за интервал [since, until) в порядке времени.
+        Сегменты вне горячего окна читаются с диска по одному, только если пересекаются с интервалом.
+        """
+        with self._lock:
+            segments = list(self._segments.values())
+        for segment in segments:
+            if since is not None and self._segment_end(segment) <= since:
+                continue
+            if until is not None and segment.start >= until:
+                break
+            rows = segment.rows if segment.rows is not None else segment.read()
+            for row in rows:
+                captured_at = row.get("captured_at", segment.start)
+                if since is not None and captured_at < since:
+                    continue
+                if until is not None and captured_at >= until:
+                    continue
+                yield row
+
+    def __len__(self) -> int:
+        """Число строк в памяти (горячее окно)"""
+        return sum(len(s.rows) for s in self._segments.values() if s.rows is not None)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.recent_rows())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._current_file is not None:
+                self._current_file.close()
+                self._current_file = None
+                self._current_start = None
+        if self._compress_thread is not None:
+            self._compress_thread.join()
+
+
+class SqliteRowStore:
+    """
+    Общее хранилище строк в SQLite (WAL).
+
+    Уникальность обеспечивает первичный ключ (region, unique_id), а вставка
+    выполняется через INSERT OR IGNORE внутри одной транзакции — поэтому
+    одна и та же строка, распознанная сразу несколькими процессами,
+    считается новой ровно в одном из них.
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: float = 30.0):
+        """
+        Args:
+            path: Путь к файлу базы данных
+            timeout: Сколько ждать блокировки записи другим процессом (в секундах)
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS table_rows ("
+            " region TEXT NOT NULL,"
+            " unique_id TEXT NOT NULL,"
+            " event TEXT NOT NULL,"
+            " time TEXT NOT NULL,"
+            " amount REAL NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (region, unique_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS table_rows_created_at ON table_rows (created_at)")
+
+    def add_new(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Атомарно добавить строки, которых ещё нет в хранилище.
+
+        Returns:
+            Список строк, добавленных именно этим вызовом
+        """
+        if not rows:
+            return []
+        now = time.time()
+        new_rows = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    region, unique_id = row_key(row)
+                    cur = self._conn.execute(
+                        "INSERT OR IGNORE INTO table_rows"
+                        " (region, unique_id, event, time, amount, created_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (region, unique_id, row["event"], row["time"], row["amount"],
+                         row.setdefault("captured_at", now)),
+                    )
+                    if cur.rowcount == 1:
+                        new_rows.append(row)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return new_rows
+
+    def recent_rows(self, max_age: Optional[float] = DEFAULT_HOT_SECONDS) -> List[Dict]:
+        """Строки, добавленные за последние max_age секунд (None — все)"""
+        since = time.time() - max_age if max_age is not None else None
+        return list(self.iter_history(since))
+
+    def iter_history(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Dict]:
+        """Строки за интервал [since, until) по времени добавления (читаются порциями)"""
+        # Отдельное соединение, чтобы долгое чтение не держало общий lock
+        return _iter_sqlite_rows(self.path, since, until)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM table_rows").fetchone()[0]
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter_history()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _iter_sqlite_rows(path: Path, since: Optional[float] = None,
+                      until: Optional[float] = None) -> Iterator[Dict]:
+    """Читать строки из базы SqliteRowStore курсором, только на чтение"""
+    query = "SELECT region, unique_id, event, time, amount, created_at FROM table_rows"
+    conditions, params = [], []
+    if since is not None:
+        conditions.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("created_at < ?")
+        params.append(until)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY created_at, rowid"
+
+    conn = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True)
+    try:
+        for region, unique_id, event, time_str, amount, created_at in conn.execute(query, params):
+            yield {"event": event, "time": time_str, "amount": amount,
+                   "unique_id": unique_id, "region": region, "captured_at": created_at}
+    finally:
+        conn.close()
+
+
+def _iter_json_array(path: Path, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """Читать элементы JSON-массива по одному, не загружая весь файл в память"""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size)
+        pos = 0
+        eof = False
+        started = False
+        while True:
+            # Пропускаем пробелы, открывающую скобку и запятые между элементами
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == "," or (buf[pos] == "[" and not started)):
+                started = started or buf[pos] == "["
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            if pos >= len(buf) and eof:
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+            pos = end
+            if len(buf) - pos < chunk_size // 2 and not eof:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+
+
+def iter_rows_from(source: Union[str, Path],
+                   since: Optional[float] = None,
+                   until: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Потоково читать строки из любого источника истории, не загружая всё в память:
+    - каталог с сегментами (SegmentedRowStore) — сегменты по порядку, старые — лениво;
+    - "*.db/*.sqlite/*.sqlite3" или "sqlite:path" — SqliteRowStore;
+    - "*.jsonl" / "*.jsonl.gz" — по строке JSON на строку таблицы;
+    - "*.json" — JSON-массив (table_rows.json).
+
+    Фильтр [since, until) применяется к полю captured_at (строки без него не отбрасываются).
+    """
+    spec = str(source)
+    if spec.startswith("sqlite:") or Path(spec).suffix.lower() in (".db", ".sqlite", ".sqlite3"):
+        if spec.startswith("sqlite:"):
+            spec = spec[len("sqlite:"):]
+        yield from _iter_sqlite_rows(Path(spec), since, until)
+        return
+
+    path = Path(spec)
+    if path.is_dir():
+        segments = []
+        for segment_path in path.glob("rows-*.jsonl*"):
+            stem = segment_path.name[len("rows-"):].split(".", 1)[0]
+            try:
+                start = calendar.timegm(time.strptime(stem, _SEGMENT_TIME_FORMAT))
+            except ValueError:
+                continue
+            segments.append((start, segment_path))
+        segments.sort()
+        for i, (start, segment_path) in enumerate(segments):
+            next_start = segments[i + 1][0] if i + 1 < len(segments) else None
+            if since is not None and next_start is not None and next_start <= since:
+                continue
+            if until is not None and start >= until:
+                break
+            yield from _filter_by_time(_Segment(start, segment_path).read(), since, until)
+        return
+
+    if path.name.endswith((".jsonl", ".jsonl.gz")):
+        rows = _Segment(0, path).read()
+    else:
+        rows = _iter_json_array(path)
+    yield from _filter_by_time(rows, since, until)
+
+
+def _filter_by_time(rows: Iterable[Dict], since: Optional[float], until: Optional[float]) -> Iterator[Dict]:
+    for row in rows:
+        captured_at = row.get("captured_at")
+        if captured_at is not None:
+            if since is not None and captured_at < since:
+                continue
+            if until is not None and captured_at >= until:
+                continue
+        yield row
+
+
+def open_row_store(spec: Union[str, Path]):
+    """
+    Открыть хранилище по строке-описанию:
+    - "sqlite:path/to/rows.db" или путь с расширением .db/.sqlite/.sqlite3 — SqliteRowStore
+    - "segments:path/to/history" или путь к каталогу — SegmentedRowStore; параметры можно
+      передать после "?": "segments:history?hot_hours=48&segment_minutes=30&compress=0"
+    - любой другой путь — JsonRowStore
+    """
+    spec = str(spec)
+    if spec.startswith("sqlite:"):
+        return SqliteRowStore(spec[len("sqlite:"):])
+    if Path(spec).suffix.lower() in (".db", ".sqlite", ".sqlite3"):
+        return SqliteRowStore(spec)
+    if spec.startswith("segments:") or Path(spec.split("?", 1)[0]).is_dir():
+        if spec.startswith("segments:"):
+            spec = spec[len("segments:"):]
+        path, _, query = spec.partition("?")
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        return SegmentedRowStore(
+            path,
+            hot_seconds=float(params.get("hot_hours", DEFAULT_HOT_SECONDS / 3600)) * 3600,
+            segment_seconds=int(float(params.get("segment_minutes", 60)) * 60),
+            compress=params.get("compress", "1") not in ("0", "false", "no"),
+        )
+    return JsonRowStore(spec)
@@ -5,19 +5,43 @@
 2. Делает клик
 3. Делает скриншот
 4. Парсит текст из скриншота
+
+Пакетный режим (много целей за один запуск, результаты — JSONL):
+    python scan_and_parse.py --batch targets.json
+    python scan_and_parse.py --batch targets.csv --workers 4 --output results.jsonl
 """
 
 from automation import MouseAutomation
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import argparse
+import csv
+import json
 import time
 import sys
 
+OCR_METHODS = ('ocrspace', 'tesseract', 'hedged')
+
+# Поля цели пакетного режима и значения по умолчанию (как у scan_and_parse)
+TARGET_DEFAULTS: Dict[str, Any] = {
+    'click': True,
+    'screenshot_region': None,
+    'ocr_method': 'ocrspace',
+    'wait_before_click': 0.5,
+    'wait_after_click': 2.0,
+    'move_duration': 0.5,
+}
+
 
 def scan_and_parse(x: int, y: int, 
                    click: bool = True,
                    screenshot_region: tuple = None,
                    ocr_method: str = 'ocrspace',
                    wait_before_click: float = 0.5,
-                   wait_after_click: float = 0.5,
+                   wait_after_click: float = 2.0,
                    move_duration: float = 0.5):
     """
     Полный цикл: перемещение → клик → скриншот → OCR
@@ -27,9 +51,9 @@ def scan_and_parse(x: int, y: int,
         y: Координата Y для курсора и клика
         click: Делать ли клик (по умолчанию True)
         screenshot_region: Область для скриншота (x, y, width, height) или None для всего экрана
-        ocr_method: Метод OCR ('ocrspace' или 'tesseract')
-        wait_before_click: Пауза перед кликом (в секундах)
-        wait_after_click: Пауза после клика перед скриншотом (в секундах)
+        ocr_method: Метод OCR ('ocrspace', 'tesseract' или 'hedged')
+        wait_before_click: Максимальное ожидание перед кликом, пока экран не перестанет меняться (в секундах)
+        wait_after_click: Максимальное ожидание после клика, пока экран не перестанет меняться (в секундах)
         move_duration: Длительность перемещения курсора (в секундах)
     
     Returns:
@@ -49,15 +73,16 @@ def scan_and_parse(x: int, y: int,
         print("-" * 60)
         auto.move_cursor(x, y, duration=move_duration)
         print("✅ Курсор перемещен")
-        time.sleep(wait_before_click)
+        auto.wait_for_stable(screenshot_region, timeout=wait_before_click)
         
         # Шаг 2: Клик
         if click:
             print(f"\n🖱️  ШАГ 2: Делаю клик по ({x}, {y})")
             print("-" * 60)
+            before = auto.capture(screenshot_region)
             auto.click(x, y)
             print("✅ Клик выполнен")
-            time.sleep(wait_after_click)
+            auto.wait_for_stable(screenshot_region, timeout=wait_after_click, before=before)
         else:
             print(f"\n⏭️  ШАГ 2: Клик пропущен")
         
@@ -115,27 +140,220 @@ def scan_and_parse(x: int, y: int,
         }
 
 
-def main():
-    """Главная функция с примерами использования"""
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y', 'да')
+
+
+def _parse_region(value: Any) -> Optional[tuple]:
+    """Область из списка [x, y, w, h] или строки "x y w h" (разделители — пробел или ';')"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        value = value.replace(';', ' ').split()
+    region = tuple(int(v) for v in value)
+    if len(region) != 4:
+        raise ValueError(f"Область должна состоять из 4 чисел (x, y, ширина, высота): {value}")
+    return region
+
+
+def normalize_target(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Привести описание цели к полям scan_and_parse.
+
+    Обязательны x и y; область можно задать полем screenshot_region или region.
+    """
+    if 'x' not in raw or 'y' not in raw:
+        raise ValueError(f"У цели нет координат x/y: {raw}")
+    target = dict(TARGET_DEFAULTS)
+    target['x'] = int(raw['x'])
+    target['y'] = int(raw['y'])
+    for key, value in raw.items():
+        if value in (None, '') or key in ('x', 'y'):
+            continue
+        if key in ('region', 'screenshot_region'):
+            target['screenshot_region'] = _parse_region(value)
+        elif key == 'click':
+            target['click'] = _parse_bool(value)
+        elif key == 'ocr_method':
+            target['ocr_method'] = str(value).lower()
+        elif key in ('wait_before_click', 'wait_after_click', 'move_duration'):
+            target[key] = float(value)
+        elif key in ('id', 'ocr_api_key'):
+            target[key] = str(value)
+        else:
+            raise ValueError(f"Неизвестное поле цели: {key}")
+    if target['ocr_method'] not in OCR_METHODS:
+        raise ValueError(f"Неизвестный метод OCR: {target['ocr_method']}")
+    return target
+
+
+def load_targets(path: str) -> List[Dict[str, Any]]:
+    """
+    Загрузить список целей из JSON (массив объектов или {"targets": [...]}) или CSV (с заголовком).
+
+    Пример CSV:
+        x,y,click,region,ocr_method
+        500,300,true,0 0 800 600,tesseract
+    """
+    path_obj = Path(path)
+    if path_obj.suffix.lower() == '.csv':
+        with open(path_obj, newline='', encoding='utf-8') as f:
+            raw_targets = list(csv.DictReader(f))
+    else:
+        data = json.loads(path_obj.read_text(encoding='utf-8'))
+        raw_targets = data.get('targets', []) if isinstance(data, dict) else data
+    if not isinstance(raw_targets, list):
+        raise ValueError(f"Файл целей {path} должен содержать массив целей")
+    return [normalize_target(raw) for raw in raw_targets]
+
+
+def _ocr_job(auto: MouseAutomation, image, filename: str, target: Dict[str, Any]) -> Dict[str, Any]:
+    """Сохранить захваченное изображение и распознать текст (выполняется в пуле OCR)"""
+    started = time.perf_counter()
+    result = {'screenshot_path': None, 'text': '', 'success': False, 'error': None}
+    try:
+        result['screenshot_path'] = auto.save_image(image, filename)
+        result['text'] = auto.recognize(result['screenshot_path'], target['ocr_method'], target.get('ocr_api_key'))
+        result['success'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    result['ocr_seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def scan_batch(targets: Iterable[Dict[str, Any]],
+               ocr_workers: int = 2,
+               auto: Optional[MouseAutomation] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Пакетный режим: перемещения, клики и скриншоты выполняются строго по очереди
+    одним экземпляром MouseAutomation, а OCR цели N идёт в пуле потоков,
+    пока выполняются действия для цели N+1.
+
+    Args:
+        targets: Цели (словари с полями scan_and_parse, см. normalize_target)
+        ocr_workers: Число потоков OCR
+        auto: Готовый экземпляр MouseAutomation (по умолчанию создается один на весь пакет)
+
+    Yields:
+        Результаты в порядке целей, по мере готовности:
+        {'index', 'id', 'x', 'y', 'screenshot_path', 'text', 'success', 'error', 'ui_seconds', 'ocr_seconds'}
+    """
+    if auto is None:
+        auto = MouseAutomation(use_applescript=False)
+
+    # Не больше двух захваченных, но ещё не распознанных скриншотов на поток OCR
+    max_in_flight = max(1, ocr_workers) * 2
+    batch_stamp = time.strftime("%Y%m%d_%H%M%S")
+    pending = deque()
+
+    def finished(record: Dict[str, Any], future) -> Dict[str, Any]:
+        record.update(future.result())
+        return record
+
+    with ThreadPoolExecutor(max_workers=max(1, ocr_workers), thread_name_prefix="ocr") as pool:
+        for index, target in enumerate(targets):
+            target = normalize_target(target)
+            record = {'index': index, 'id': target.get('id'), 'x': target['x'], 'y': target['y']}
+            started = time.perf_counter()
+            try:
+                auto.move_cursor(target['x'], target['y'], duration=target['move_duration'])
+                auto.wait_for_stable(target['screenshot_region'], timeout=target['wait_before_click'])
+                if target['click']:
+                    before = auto.capture(target['screenshot_region'])
+                    auto.click(target['x'], target['y'])
+                    auto.wait_for_stable(target['screenshot_region'], timeout=target['wait_after_click'],
+                                         before=before)
+                image = auto.capture(target['screenshot_region'])
+            except Exception as e:
+                record.update({'screenshot_path': None, 'text': '', 'success': False, 'error': str(e),
+                               'ui_seconds': round(time.perf_counter() - started, 3), 'ocr_seconds': 0.0})
+                pending.append((record, None))
+            else:
+                record['ui_seconds'] = round(time.perf_counter() - started, 3)
+                filename = f"batch_{batch_stamp}_{index:04d}.png"
+                pending.append((record, pool.submit(_ocr_job, auto, image, filename, target)))
+
+            # Отдаем готовые результаты по порядку, не дожидаясь конца пакета
+            while pending and (pending[0][1] is None or pending[0][1].done() or len(pending) > max_in_flight):
+                record, future = pending.popleft()
+                yield record if future is None else finished(record, future)
+
+        while pending:
+            record, future = pending.popleft()
+            yield record if future is None else finished(record, future)
+
+
+def run_batch(targets_path: str, output: Optional[str] = None, ocr_workers: int = 2) -> int:
+    """
+    Выполнить пакет целей из файла и записать результаты в JSONL.
+
+    Сообщения о ходе работы выводятся в stderr, чтобы stdout оставался чистым JSONL.
+
+    Returns:
+        Число целей, для которых OCR завершился с ошибкой
+    """
+    targets = load_targets(targets_path)
+    out = open(output, 'w', encoding='utf-8') if output and output != '-' else sys.stdout
+    failed = 0
+    try:
+        with redirect_stdout(sys.stderr):
+            print(f"📋 Пакет: {len(targets)} целей, потоков OCR: {ocr_workers}")
+            started = time.perf_counter()
+            for result in scan_batch(targets, ocr_workers=ocr_workers):
+                failed += not result['success']
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+            print(f"✅ Пакет завершен за {time.perf_counter() - started:.1f} c, ошибок: {failed}")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return failed
+
+
+def batch_main(argv: List[str]) -> None:
+    """Разбор аргументов пакетного режима (python scan_and_parse.py --batch ...)"""
+    parser = argparse.ArgumentParser(prog="scan_and_parse.py --batch",
+                                     description="Пакетный режим: много целей за один запуск")
+    parser.add_argument("targets", help="файл целей (.json или .csv)")
+    parser.add_argument("--workers", type=int, default=2, help="число потоков OCR")
+    parser.add_argument("--output", "-o", default="-", help="файл JSONL с результатами (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+    try:
+        failed = run_batch(args.targets, args.output, args.workers)
+    except (ValueError, OSError) as e:
+        print(f"❌ Ошибка файла целей: {e}", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(1 if failed else 0)
+
+
+def read_target_args(argv: List[str], prog: str = 'scan_and_parse.py') -> Dict[str, Any]:
+    """
+    Параметры одного запуска из аргументов командной строки (<x> <y> [click] [ocr_method])
+    или, если координаты не заданы, из интерактивного ввода
     
+    Returns:
+        Словарь с полями x, y, click, screenshot_region, ocr_method
+    """
     # Инициализируем переменные по умолчанию
     screenshot_region = None
     ocr_method = 'ocrspace'
     
-    if len(sys.argv) >= 3:
+    if len(argv) >= 2:
         # Использование из командной строки
         try:
-            x = int(sys.argv[1])
-            y = int(sys.argv[2])
-            click = sys.argv[3].lower() == 'true' if len(sys.argv) > 3 else True
-            if len(sys.argv) > 4:
-                ocr_method = sys.argv[4].lower()
-                if ocr_method not in ['ocrspace', 'tesseract']:
+            x = int(argv[0])
+            y = int(argv[1])
+            click = argv[2].lower() == 'true' if len(argv) > 2 else True
+            if len(argv) > 3:
+                ocr_method = argv[3].lower()
+                if ocr_method not in OCR_METHODS:
                     print("⚠️  Неизвестный метод OCR, использую ocrspace")
                     ocr_method = 'ocrspace'
         except (ValueError, IndexError):
-            print("Использование: python scan_and_parse.py <x> <y> [click=true/false] [ocr_method=ocrspace/tesseract]")
-            print("Пример: python scan_and_parse.py 500 300 true ocrspace")
+            print(f"Использование: python {prog} <x> <y> [click=true/false] [ocr_method=ocrspace/tesseract/hedged]")
+            print(f"Пример: python {prog} 500 300 true ocrspace")
             sys.exit(1)
     else:
         # Интерактивный режим
@@ -161,22 +379,23 @@ def main():
                     print("⚠️  Неверный формат, использую весь экран")
                     screenshot_region = None
             
-            ocr_input = input("Метод OCR (ocrspace/tesseract, по умолчанию ocrspace): ").strip().lower()
-            ocr_method = ocr_input if ocr_input in ['ocrspace', 'tesseract'] else 'ocrspace'
+            ocr_input = input("Метод OCR (ocrspace/tesseract/hedged, по умолчанию ocrspace): ").strip().lower()
+            ocr_method = ocr_input if ocr_input in OCR_METHODS else 'ocrspace'
         except (ValueError, KeyboardInterrupt):
             print("\n❌ Отменено пользователем")
             sys.exit(1)
     
-    # Выполняем автоматизацию
-    result = scan_and_parse(
-        x=x,
-        y=y,
-        click=click,
-        screenshot_region=screenshot_region,
-        ocr_method=ocr_method
-    )
-    
-    # Выводим итоговый результат
+    return {
+        'x': x,
+        'y': y,
+        'click': click,
+        'screenshot_region': screenshot_region,
+        'ocr_method': ocr_method,
+    }
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    """Вывести итоговый результат запуска"""
     print("\n" + "="*60)
     print("📊 ИТОГОВЫЙ РЕЗУЛЬТАТ")
     print("="*60)
@@ -211,5 +430,21 @@ def main():
     print("="*60)
 
 
+def main():
+    """Главная функция с примерами использования"""
+    
+    if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+        batch_main(sys.argv[2:])
+        return
+    
+    target = read_target_args(sys.argv[1:])
+    
+    # Выполняем автоматизацию
+    result = scan_and_parse(**target)
+    
+    # Выводим итоговый результат
+    print_result(result)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Тонкий клиент демона автоматизации (см. automation_daemon.py)
+
+Принимает те же аргументы, что и scan_and_parse.py, но выполняет запуск
+в уже работающем демоне: без старта тяжёлых модулей и прогрева OCR.
+
+Адрес демона — переменная SCAN_DAEMON: "127.0.0.1:8765" (по умолчанию)
+или "unix:/tmp/scan-daemon.sock". По TCP демон принимает только запросы
+с токеном (заголовок X-Scan-Daemon-Token): клиент берёт его из SCAN_DAEMON_TOKEN
+или из файла ~/.scan-daemon-token, который демон создаёт при запуске.
+
+Примеры:
+    python scan_client.py 500 300 true tesseract
+    python scan_client.py              # интерактивный режим, как у scan_and_parse.py
+    python scan_client.py status       # состояние демона
+"""
+
+import http.client
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+DAEMON_ENV = "SCAN_DAEMON"
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+# Токен доступа к демону по TCP: переменная окружения, файл по умолчанию и заголовок запроса
+TOKEN_ENV = "SCAN_DAEMON_TOKEN"
+TOKEN_FILE = Path.home() / ".scan-daemon-token"
+TOKEN_HEADER = "X-Scan-Daemon-Token"
+
+
+class DaemonError(Exception):
+    """Демон вернул ошибку (status — HTTP-код ответа)"""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_address(address: Optional[str] = None) -> Union[str, Tuple[str, int]]:
+    """
+    Разобрать адрес демона.
+
+    Returns:
+        Путь к Unix-сокету (str) или пара (host, port)
+    """
+    address = address or os.getenv(DAEMON_ENV) or DEFAULT_ADDRESS
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def load_token() -> Optional[str]:
+    """Токен демона: из SCAN_DAEMON_TOKEN, иначе из ~/.scan-daemon-token (None — нет ни того, ни другого)"""
+    token = os.getenv(TOKEN_ENV)
+    if token:
+        return token.strip()
+    try:
+        return TOKEN_FILE.read_text(encoding="utf-8").strip() or None
+    except OSError:
+        return None
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP поверх Unix-сокета"""
+
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class DaemonClient:
+    """Клиент HTTP API демона: каждый метод API — POST /<действие> с JSON-телом"""
+
+    def __init__(self, address: Optional[str] = None, timeout: float = 180.0,
+                 token: Optional[str] = None):
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self.token = token
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if isinstance(self.address, str):
+            return _UnixHTTPConnection(self.address, self.timeout)
+        return http.client.HTTPConnection(*self.address, timeout=self.timeout)
+
+    def call(self, action: str, **params) -> Any:
+        """
+        Выполнить действие в демоне (move, click, screenshot, ocr, scan, status).
+
+        Raises:
+            DaemonError: демон отклонил запрос или действие завершилось ошибкой
+            OSError: демон недоступен
+        """
+        headers = {}
+        if not isinstance(self.address, str):
+            token = self.token or load_token()
+            if token:
+                headers[TOKEN_HEADER] = token
+        conn = self._connection()
+        try:
+            if action == "status":
+                conn.request("GET", "/status", headers=headers)
+            else:
+                body = json.dumps(params).encode("utf-8")
+                headers["Content-Type"] = "application/json"
+                conn.request("POST", f"/{action}", body=body, headers=headers)
+            resp = conn.getresponse()
+            data = json.loads(resp.read() or b"{}")
+        finally:
+            conn.close()
+        if not data.get("ok"):
+            raise DaemonError(data.get("error", f"HTTP {resp.status}"), resp.status)
+        return data.get("result")
+
+    def scan(self, **target) -> Dict[str, Any]:
+        """Полный цикл scan_and_parse в демоне; результат в том же формате"""
+        return self.call("scan", **target)
+
+
+def main():
+    client = DaemonClient()
+
+    if sys.argv[1:] == ["status"]:
+        try:
+            print(json.dumps(client.call("status"), ensure_ascii=False, indent=2))
+        except DaemonError as e:
+            hint = f" Проверьте {TOKEN_ENV} или {TOKEN_FILE}." if e.status == 401 else ""
+            print(f"❌ Демон вернул ошибку (HTTP {e.status}): {e}.{hint}")
+            sys.exit(1)
+        except OSError as e:
+            print(f"❌ Демон недоступен ({e}). Запустите: python automation_daemon.py")
+            sys.exit(2)
+        return
+
+    # Разбор аргументов и вывод результата — как у scan_and_parse.py
+    from scan_and_parse import print_result, read_target_args
+
+    target = read_target_args(sys.argv[1:], prog="scan_client.py")
+    try:
+        result = client.scan(**target)
+    except DaemonError as e:
+        result = {"screenshot_path": None, "text": "", "success": False, "error": str(e)}
+    except OSError as e:
+        print(f"❌ Демон недоступен ({e}). Запустите: python automation_daemon.py")
+        sys.exit(2)
+    print_result(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Архив скриншотов: без повторов, сжатый, с ограничением объёма
+
+- Скриншоты адресуются перцептивным хэшем (dHash): почти одинаковые кадры
+  (тот же экран, мигнул курсор, сменились часы) хранятся один раз,
+  а каждое сохранение — это запись в индексе со ссылкой на общий файл.
+  Хэш только отбирает кандидатов: повтором кадр считается после попиксельной
+  сверки, иначе новая строка таблицы (узкая горизонтальная полоса) терялась бы,
+  а в защищённых областях (таблица оповещения) не должно измениться ничего.
+- Хэширование, сверка и сжатие (WebP без потерь, а если Pillow собран без WebP —
+  оптимизированный PNG) выполняются в фоновом потоке: вызывающий код не ждёт.
+- Индекс (SQLite) позволяет найти скриншоты по времени и по unique_id строки таблицы.
+- Старые файлы удаляются по возрасту и/или по общему объёму архива.
+
+Структура каталога:
+    index.db                 — индекс
+    objects/ab/<хэш>.webp    — сами скриншоты
+    clips/                   — прочие файлы (например, GIF «кадры до события»), на них тоже действует очистка
+
+Примеры:
+    python screen_archive.py screens stats
+    python screen_archive.py screens find --row 3f2a9c...
+    python screen_archive.py screens find --since "2026-10-01 00:00" --limit 20
+    python screen_archive.py screens prune --max-size 500M --max-days 14
+"""
+
+import argparse
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_HASH_SIZE = 16
+DEFAULT_MAX_DISTANCE = 12
+# Сколько последних кадров (в оттенках серого) держать в памяти для сверки кандидатов
+GRAY_CACHE = 4
+
+
+def parse_size(value: str) -> int:
+    """Размер в байтах из строки вида 512K, 8M, 2G (без суффикса — байты)"""
+    value = value.strip().upper()
+    multiplier = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(value[-1:], 1)
+    if multiplier > 1:
+        value = value[:-1]
+    return int(float(value) * multiplier)
+
+
+def dhash(image, hash_size: int = DEFAULT_HASH_SIZE) -> int:
+    """
+    Разностный перцептивный хэш: яркость уменьшенного кадра сравнивается с соседом справа.
+
+    Returns:
+        Целое число из hash_size * hash_size бит
+    """
+    from PIL import Image
+
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR, reducing_gap=2.0)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+Box = Tuple[int, int, int, int]
+
+
+class ScreenArchive:
+    """Архив скриншотов с дедупликацией по перцептивному хэшу"""
+
+    def __init__(self, root: Union[str, Path],
+                 max_bytes: Optional[int] = None,
+                 max_age_days: Optional[float] = None,
+                 image_format: str = "webp",
+                 hash_size: int = DEFAULT_HASH_SIZE,
+                 max_distance: int = DEFAULT_MAX_DISTANCE,
+                 max_changed: float = 0.0002):
+        """
+        Args:
+            root: Каталог архива
+            max_bytes: Предельный объём архива, в байтах (None — без ограничения)
+            max_age_days: Сколько дней хранить скриншоты (None — без ограничения)
+            image_format: "webp" (без потерь) или "png" (оптимизированный)
+            hash_size: Сторона сетки dHash (хэш из hash_size² бит)
+            max_distance: Сколько бит хэша могут различаться у кадров-кандидатов в повторы
+            max_changed: Какая доля пикселей может отличаться у повтора
+                         (мигнул курсор, сменились часы); в защищённых областях
+                         (см. put) не может отличаться ни один
+        """
+        from PIL import features
+
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        if image_format == "webp" and not features.check("webp"):
+            image_format = "png"
+        self.image_format = image_format
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self.max_changed = max_changed
+
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        self.clips_dir = self.root / "clips"
+        self.clips_dir.mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.db"), timeout=30.0,
+                                     isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            " phash TEXT PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " width INTEGER NOT NULL,"
+            " height INTEGER NOT NULL,"
+            " bytes INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " phash TEXT NOT NULL,"
+            " captured_at REAL NOT NULL,"
+            " label TEXT);"
+            "CREATE TABLE IF NOT EXISTS entry_rows ("
+            " row_id TEXT NOT NULL,"
+            " entry_id INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS entries_time ON entries (captured_at);"
+            "CREATE INDEX IF NOT EXISTS entries_phash ON entries (phash);"
+            "CREATE INDEX IF NOT EXISTS entry_rows_row ON entry_rows (row_id);"
+        )
+        # Хэши держим в памяти: поиск кандидатов — XOR и подсчёт бит
+        self._hashes: Dict[str, Tuple[int, int, int]] = {}
+        with self._lock:
+            for phash, width, height in self._conn.execute("SELECT phash, width, height FROM objects"):
+                self._hashes[phash] = (int(phash.split("_")[0], 16), width, height)
+        self._grays: "OrderedDict[str, object]" = OrderedDict()
+        self._pending = 0
+        # Хэширование, сверка и сжатие — в одном фоновом потоке, по порядку
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        self.prune()
+
+    # --- запись ---
+
+    def put(self, image,
+            captured_at: Optional[float] = None,
+            row_ids: Iterable[str] = (),
+            label: Optional[str] = None,
+            protect: Iterable[Box] = ()) -> Future:
+        """
+        Сохранить скриншот в фоне. Если такой кадр уже есть, файл не пишется —
+        добавляется только запись в индексе.
+
+        Args:
+            image: Изображение PIL.Image (не меняйте его после вызова)
+            captured_at: Время снимка (по умолчанию — сейчас)
+            row_ids: unique_id строк таблицы, к которым относится снимок
+            label: Произвольная метка (имя файла, область и т.п.)
+            protect: Области (x, y, width, height), где любое изменение делает кадр новым —
+                     например, таблица, по которой сработало оповещение: иначе кадр
+                     с одной изменившейся цифрой суммы сочли бы повтором
+
+        Returns:
+            Future со словарём {'id', 'phash', 'path', 'duplicate'}:
+            .result() — дождаться записи, .add_done_callback() — узнать о ней из фонового потока
+        """
+        with self._lock:
+            self._pending += 1
+        future = self._writer.submit(self._put, image, captured_at or time.time(), list(row_ids), label,
+                                     list(protect))
+        future.add_done_callback(self._written)
+        return future
+
+    def _written(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    @property
+    def pending(self) -> int:
+        """Сколько снимков ждут записи в фоне"""
+        return self._pending
+
+    def _duplicate_of(self, image, gray, bits: int, protect: List[Box]) -> Optional[str]:
+        from PIL import ImageChops
+
+        width, height = image.size
+        with self._lock:
+            candidates = sorted(
+                (bin(bits ^ other).count("1"), phash) for phash, (other, w, h) in self._hashes.items()
+                if (w, h) == (width, height))
+        limit = self.max_changed * width * height
+        for distance, phash in candidates[:3]:
+            if distance > self.max_distance:
+                break
+            other = self._grays.get(phash)
+            if other is None:
+                with self._lock:
+                    row = self._conn.execute("SELECT path FROM objects WHERE phash = ?", (phash,)).fetchone()
+                if row is None or not (self.root / row[0]).exists():
+                    continue
+                from PIL import Image
+                with Image.open(self.root / row[0]) as stored:
+                    other = stored.convert("L")
+            self._remember(phash, other)
+            mask = ImageChops.difference(gray, other).point(lambda v: 255 if v > 32 else 0)
+            if mask.histogram()[255] > limit:
+                continue
+            if any(mask.crop((x, y, x + w, y + h)).getbbox() for x, y, w, h in protect):
+                continue
+            return phash
+        return None
+
+    def _remember(self, phash: str, gray) -> None:
+        self._grays[phash] = gray
+        self._grays.move_to_end(phash)
+        while len(self._grays) > GRAY_CACHE:
+            self._grays.popitem(last=False)
+
+    def _put(self, image, captured_at: float, row_ids: List[str], label: Optional[str],
+             protect: List[Box]) -> Dict:
+        now = time.time()
+        bits = dhash(image, self.hash_size)
+        gray = image.convert("L")
+        phash = self._duplicate_of(image, gray, bits, protect)
+        duplicate = phash is not None
+        if duplicate:
+            with self._lock:
+                relative = self._conn.execute("SELECT path FROM objects WHERE phash = ?", (phash,)).fetchone()[0]
+        else:
+            phash = f"{bits:0{self.hash_size * self.hash_size // 4}x}"
+            with self._lock:
+                # Хэш совпал, а кадры разные — различаем суффиксом
+                n = 1
+                while phash in self._hashes:
+                    n += 1
+                    phash = f"{bits:0{self.hash_size * self.hash_size // 4}x}_{n}"
+            relative = f"objects/{phash[:2]}/{phash}.{self.image_format}"
+            path = self.root / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp = path.with_name(path.name + ".tmp")
+            if self.image_format == "webp":
+                image.save(str(temp), "WEBP", lossless=True, method=4)
+            else:
+                image.save(str(temp), "PNG", optimize=True)
+            temp.replace(path)
+            self._remember(phash, gray)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if duplicate:
+                    self._conn.execute("UPDATE objects SET last_used_at = ? WHERE phash = ?", (now, phash))
+                else:
+                    self._conn.execute(
+                        "INSERT INTO objects (phash, path, width, height, bytes, created_at, last_used_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (phash, relative, image.width, image.height, path.stat().st_size, now, now))
+                    self._hashes[phash] = (bits, image.width, image.height)
+                entry_id = self._conn.execute(
+                    "INSERT INTO entries (phash, captured_at, label) VALUES (?, ?, ?)",
+                    (phash, captured_at, label)).lastrowid
+                self._conn.executemany("INSERT INTO entry_rows (row_id, entry_id) VALUES (?, ?)",
+                                       [(row_id, entry_id) for row_id in row_ids])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if not duplicate:
+            self.prune()
+        return {"id": entry_id, "phash": phash, "path": str(self.root / relative), "duplicate": duplicate}
+
+    def clip_path(self, name: str) -> Path:
+        """Путь для произвольного файла в архиве (clips/), на который действует очистка"""
+        return self.clips_dir / name
+
+    # --- поиск ---
+
+    def find(self, since: Optional[float] = None,
+             until: Optional[float] = None,
+             row_id: Optional[str] = None,
+             limit: Optional[int] = None) -> List[Dict]:
+        """
+        Найти сохранённые скриншоты (новые первыми).
+
+        Args:
+            since: Не раньше этого времени (time.time())
+            until: Не позже этого времени
+            row_id: Только снимки, относящиеся к строке с этим unique_id (можно префикс)
+            limit: Максимум записей
+
+        Returns:
+            [{'id', 'captured_at', 'label', 'path', 'phash', 'row_ids'}, ...]
+        """
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("e.captured_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("e.captured_at <= ?")
+            params.append(until)
+        if row_id:
+            conditions.append("e.id IN (SELECT entry_id FROM entry_rows WHERE row_id LIKE ?)")
+            params.append(row_id + "%")
+        query = ("SELECT e.id, e.captured_at, e.label, o.path, e.phash FROM entries e"
+                 " JOIN objects o ON o.phash = e.phash")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY e.captured_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            result = []
+            for entry_id, captured_at, label, path, phash in rows:
+                row_ids = [r for (r,) in self._conn.execute(
+                    "SELECT row_id FROM entry_rows WHERE entry_id = ?", (entry_id,))]
+                result.append({"id": entry_id, "captured_at": captured_at, "label": label,
+                               "path": str(self.root / path), "phash": phash, "row_ids": row_ids})
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            objects, stored_bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM objects").fetchone()
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        clips = [p.stat().st_size for p in self.clips_dir.iterdir() if p.is_file()]
+        return {"entries": entries, "objects": objects, "bytes": stored_bytes + sum(clips), "clips": len(clips)}
+
+    # --- очистка ---
+
+    def _delete_objects(self, phashes: List[str]) -> None:
+        if not phashes:
+            return
+        with self._lock:
+            paths = [self.root / path for (path,) in self._conn.execute(
+                f"SELECT path FROM objects WHERE phash IN ({','.join('?' * len(phashes))})", phashes)]
+            self._conn.execute("BEGIN IMMEDIATE")
+            for phash in phashes:
+                self._conn.execute("DELETE FROM entry_rows WHERE entry_id IN (SELECT id FROM entries WHERE phash = ?)",
+                                   (phash,))
+                self._conn.execute("DELETE FROM entries WHERE phash = ?", (phash,))
+                self._conn.execute("DELETE FROM objects WHERE phash = ?", (phash,))
+            self._conn.execute("COMMIT")
+            for phash in phashes:
+                self._hashes.pop(phash, None)
+                self._grays.pop(phash, None)
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    def prune(self) -> int:
+        """
+        Удалить скриншоты старше max_age_days, затем самые давно использованные,
+        пока архив больше max_bytes.
+
+        Returns:
+            Сколько файлов удалено
+        """
+        if self.max_bytes is None and self.max_age_days is None:
+            return 0
+        # (время последнего использования, размер, hash скриншота или путь к прочему файлу)
+        with self._lock:
+            items: List[Tuple[float, int, object]] = [
+                (used, size, phash) for phash, used, size in self._conn.execute(
+                    "SELECT phash, last_used_at, bytes FROM objects")]
+        for path in self.clips_dir.iterdir():
+            if path.is_file():
+                stat = path.stat()
+                items.append((stat.st_mtime, stat.st_size, path))
+        items.sort(key=lambda item: item[0])
+
+        removed = []
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            while items and items[0][0] < cutoff:
+                removed.append(items.pop(0))
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in items)
+            while items and total > self.max_bytes:
+                item = items.pop(0)
+                total -= item[1]
+                removed.append(item)
+
+        self._delete_objects([key for _, _, key in removed if isinstance(key, str)])
+        for _, _, key in removed:
+            if isinstance(key, Path):
+                key.unlink(missing_ok=True)
+        return len(removed)
+
+    def close(self) -> None:
+        """Дождаться фонового сжатия и закрыть индекс"""
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архив скриншотов: поиск, статистика, очистка")
+    parser.add_argument("root", help="каталог архива (например, screens)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="объём и число снимков")
+    find = sub.add_parser("find", help="найти снимки по времени или строке")
+    find.add_argument("--row", help="unique_id строки (можно начало)")
+    find.add_argument("--since", help='не раньше, "YYYY-MM-DD HH:MM"')
+    find.add_argument("--until", help='не позже, "YYYY-MM-DD HH:MM"')
+    find.add_argument("--limit", type=int, default=50)
+    prune = sub.add_parser("prune", help="удалить старое по возрасту и объёму")
+    prune.add_argument("--max-size", help="предельный объём, например 500M или 2G")
+    prune.add_argument("--max-days", type=float, help="сколько дней хранить")
+    args = parser.parse_args()
+
+    def timestamp(value: Optional[str]) -> Optional[float]:
+        return time.mktime(time.strptime(value, "%Y-%m-%d %H:%M")) if value else None
+
+    if args.command == "prune":
+        archive = ScreenArchive(args.root, parse_size(args.max_size) if args.max_size else None, args.max_days)
+        print(f"Удалено файлов: {archive.prune()}")
+    else:
+        archive = ScreenArchive(args.root)
+    if args.command == "find":
+        for item in archive.find(timestamp(args.since), timestamp(args.until), args.row, args.limit):
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(item["captured_at"]))
+            rows = f" строки: {', '.join(r[:8] for r in item['row_ids'])}" if item["row_ids"] else ""
+            print(f"{when}  {item['path']}  {item['label'] or ''}{rows}")
+    stats = archive.stats()
+    print(f"Снимков: {stats['entries']}, файлов: {stats['objects']} (+{stats['clips']} прочих), "
+          f"объём: {stats['bytes'] / 1024 / 1024:.1f} МБ")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Локальные заглушки Telegram Bot API и OCR.space для нагрузочных тестов без сети
+
+Заглушки отвечают в формате настоящих API и умеют вести себя как настоящие
+под нагрузкой: задержка ответа (с разбросом), доля ошибок 500, ограничение
+частоты запросов (429 с retry_after) и ограничение размера загружаемого файла
+(1 МБ на файл у бесплатного OCR.space).
+
+Telegram:
+    GET/POST /bot<token>/getUpdates       — подписчики с chat_id 1..N
+    POST     /bot<token>/sendPhoto
+    POST     /bot<token>/sendMediaGroup
+OCR.space:
+    POST     /parse/image                 — ParsedText из --ocr-text
+
+Клиенты переключаются на заглушки переменными окружения:
+    TELEGRAM_API_URL=http://127.0.0.1:8081  (см. notify_outbox)
+    OCRSPACE_URL=http://127.0.0.1:8082/parse/image  (см. automation)
+
+Примеры:
+    python stub_servers.py
+    python stub_servers.py --latency 0.3 --jitter 0.2 --error-rate 0.05 --rate-limit 30
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Бесплатный OCR.space не принимает файлы больше 1 МБ
+OCRSPACE_MAX_UPLOAD = 1024 * 1024
+# Telegram принимает фото до 10 МБ
+TELEGRAM_MAX_UPLOAD = 10 * 1024 * 1024
+
+DEFAULT_OCR_TEXT = "Amount Time\n$15,250.00 8:02 PM\n$1,000.00 8:05 PM"
+
+
+class StubConfig:
+    """Поведение заглушки под нагрузкой"""
+
+    def __init__(self, latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_limit: float = 0.0,
+                 burst: int = 5,
+                 max_upload: Optional[int] = None,
+                 retry_after: int = 1,
+                 subscribers: int = 3,
+                 ocr_text: str = DEFAULT_OCR_TEXT,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency: Задержка каждого ответа, в секундах
+            jitter: Случайная добавка к задержке (равномерно от 0 до jitter), в секундах
+            error_rate: Доля запросов, на которые отвечать 500 (0..1)
+            rate_limit: Допустимая частота запросов в секунду (0 — без ограничения)
+            burst: Сколько запросов можно сделать подряд сверх частоты
+            max_upload: Максимальный размер загружаемого файла, в байтах (None — по умолчанию для API)
+            retry_after: Значение retry_after в ответах 429, в секундах
+            subscribers: Сколько подписчиков возвращает getUpdates
+            ocr_text: Текст, который «распознаёт» OCR.space
+            seed: Зерно генератора случайных чисел (для воспроизводимых прогонов)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.max_upload = max_upload
+        self.retry_after = retry_after
+        self.subscribers = subscribers
+        self.ocr_text = ocr_text
+        self.seed = seed
+
+
+class _TokenBucket:
+    """Ограничение частоты: rate запросов в секунду, до burst подряд"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class StubServer(ThreadingHTTPServer):
+    """HTTP-сервер заглушки со счётчиками запросов"""
+
+    daemon_threads = True
+
+    def __init__(self, address, handler, config: StubConfig, default_max_upload: int, verbose: bool = False):
+        super().__init__(address, handler)
+        self.config = config
+        self.max_upload = config.max_upload if config.max_upload is not None else default_max_upload
+        self.verbose = verbose
+        self.bucket = _TokenBucket(config.rate_limit, config.burst)
+        self.random = random.Random(config.seed)
+        self._random_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def roll(self) -> float:
+        with self._random_lock:
+            return self.random.random()
+
+    def start(self) -> "StubServer":
+        """Обслуживать запросы в фоновом потоке"""
+        threading.Thread(target=self.serve_forever, name=self.RequestHandlerClass.__name__,
+                         daemon=True).start()
+        return self
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _form(self, body: bytes) -> Dict[str, Any]:
+        """Поля multipart/form-data: текст — строкой, файлы — байтами"""
+        match = re.search(r'boundary="?([^";]+)"?', self.headers.get("Content-Type", ""))
+        if not match:
+            return {}
+        form = {}
+        for part in body.split(b"--" + match.group(1).encode("latin-1"))[1:]:
+            head, sep, payload = part.partition(b"\r\n\r\n")
+            if not sep:
+                continue  # завершающий "--"
+            disposition = head.decode("utf-8", "replace")
+            name = re.search(r'name="([^"]*)"', disposition)
+            if not name:
+                continue
+            payload = payload[:-2] if payload.endswith(b"\r\n") else payload
+            is_file = re.search(r'filename="', disposition) is not None
+            form[name.group(1)] = payload if is_file else payload.decode("utf-8", "replace")
+        return form
+
+    def _admit(self, form: Dict[str, Any]) -> Optional[str]:
+        """
+        Общие для заглушек проверки (размер — у каждого файла отдельно, как в настоящих API).
+        Returns: причина отказа или None.
+        """
+        server: StubServer = self.server
+        config = server.config
+        server.count("requests")
+        delay = config.latency + (server.roll() * config.jitter if config.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if not server.bucket.take():
+            server.count("rate_limited")
+            return "rate_limited"
+        if any(isinstance(value, bytes) and len(value) > server.max_upload for value in form.values()):
+            server.count("too_large")
+            return "too_large"
+        if config.error_rate and server.roll() < config.error_rate:
+            server.count("errors")
+            return "error"
+        return None
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            print(f"[{self.log_date_time_string()}] {type(self).__name__} {format % args}")
+
+
+class TelegramStubHandler(_StubHandler):
+    """Заглушка Telegram Bot API"""
+
+    server_version = "TelegramStub/1.0"
+
+    def do_GET(self):
+        self._handle(b"")
+
+    def do_POST(self):
+        self._handle(self._read_body())
+
+    def _handle(self, body: bytes) -> None:
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        if len(parts) != 2 or not parts[0].startswith("bot"):
+            self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            return
+        method = parts[1]
+
+        form = self._form(body)
+        refusal = self._admit(form)
+        config = self.server.config
+        if refusal == "rate_limited":
+            self._reply(429, {"ok": False, "error_code": 429,
+                              "description": f"Too Many Requests: retry after {config.retry_after}",
+                              "parameters": {"retry_after": config.retry_after}})
+            return
+        if refusal == "too_large":
+            self._reply(413, {"ok": False, "error_code": 413, "description": "Request Entity Too Large"})
+            return
+        if refusal == "error":
+            self._reply(500, {"ok": False, "error_code": 500, "description": "Internal Server Error"})
+            return
+
+        if method == "getUpdates":
+            updates = [{"update_id": n, "message": {"message_id": n, "chat": {"id": n, "type": "private"},
+                                                    "text": "/start"}}
+                       for n in range(1, config.subscribers + 1)]
+            self._reply(200, {"ok": True, "result": updates})
+        elif method == "sendPhoto":
+            if not isinstance(form.get("photo"), bytes) or "chat_id" not in form:
+                self._reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: photo is required"})
+                return
+            self.server.count("photos")
+            self._reply(200, {"ok": True, "result": {"message_id": 1, "chat": {"id": int(form["chat_id"])}}})
+        elif method == "sendMediaGroup":
+            try:
+                media: List[Dict] = json.loads(form.get("media") or "[]")
+            except ValueError:
+                media = []
+            if not 2 <= len(media) <= 10:
+                self._reply(400, {"ok": False, "error_code": 400,
+                                  "description": "Bad Request: media must include 2-10 items"})
+                return
+            self.server.count("photos", len(media))
+            self.server.count("media_groups")
+            self._reply(200, {"ok": True, "result": [{"message_id": n + 1} for n in range(len(media))]})
+        else:
+            self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"})
+
+
+class OCRSpaceStubHandler(_StubHandler):
+    """Заглушка OCR.space /parse/image"""
+
+    server_version = "OCRSpaceStub/1.0"
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0].rstrip("/") != "/parse/image":
+            self._reply(404, {"OCRExitCode": 99, "IsErroredOnProcessing": True, "ErrorMessage": ["Not Found"]})
+            return
+        form = self._form(self._read_body())
+        refusal = self._admit(form)
+        if refusal == "rate_limited":
+            # Настоящий OCR.space при превышении лимита отвечает 403 с текстом
+            self._reply(403, {"OCRExitCode": 99, "IsErroredOnProcessing": True,
+                              "ErrorMessage": ["You may only perform this action upto maximum number of times"]})
+            return
+        if refusal == "too_large":
+            limit_kb = self.server.max_upload // 1024
+            self._reply(200, {"OCRExitCode": 4, "IsErroredOnProcessing": True,
+                              "ErrorMessage": [f"File failed validation. File size exceeds the maximum "
+                                               f"permissible file size limit of {limit_kb} KB"]})
+            return
+        if refusal == "error":
+            self._reply(500, {"OCRExitCode": 99, "IsErroredOnProcessing": True,
+                              "ErrorMessage": ["Internal Server Error"]})
+            return
+
+        if not isinstance(form.get("file"), bytes):
+            self._reply(200, {"OCRExitCode": 99, "IsErroredOnProcessing": True,
+                              "ErrorMessage": ["No file uploaded or URL provided"]})
+            return
+        self.server.count("images")
+        self._reply(200, {"OCRExitCode": 1, "IsErroredOnProcessing": False,
+                          "ParsedResults": [{"ParsedText": self.server.config.ocr_text, "FileParseExitCode": 1}],
+                          "ProcessingTimeInMilliseconds": "0"})
+
+
+def start_telegram_stub(config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0,
+                        verbose: bool = False) -> StubServer:
+    """Запустить заглушку Telegram в фоне (port=0 — любой свободный). Адрес — server.url"""
+    return StubServer((host, port), TelegramStubHandler, config or StubConfig(),
+                      TELEGRAM_MAX_UPLOAD, verbose).start()
+
+
+def start_ocrspace_stub(config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0,
+                        verbose: bool = False) -> StubServer:
+    """Запустить заглушку OCR.space в фоне (port=0 — любой свободный). Адрес — server.url + "/parse/image" """
+    return StubServer((host, port), OCRSpaceStubHandler, config or StubConfig(),
+                      OCRSPACE_MAX_UPLOAD, verbose).start()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """Общие параметры поведения заглушек (используются и в load_test.py)"""
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500 (0..1)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="запросов в секунду (0 — без ограничения)")
+    parser.add_argument("--burst", type=int, default=5, help="сколько запросов подряд сверх частоты")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429, с")
+    parser.add_argument("--max-upload", type=int, help="максимальный размер файла, байт "
+                                                       "(по умолчанию 10 МБ у Telegram и 1 МБ у OCR.space)")
+    parser.add_argument("--subscribers", type=int, default=3, help="сколько подписчиков вернёт getUpdates")
+    parser.add_argument("--seed", type=int, help="зерно случайных чисел")
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      rate_limit=args.rate_limit, burst=args.burst, max_upload=args.max_upload,
+                      retry_after=args.retry_after, subscribers=args.subscribers,
+                      ocr_text=getattr(args, "ocr_text", DEFAULT_OCR_TEXT), seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальные заглушки Telegram и OCR.space")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--telegram-port", type=int, default=8081)
+    parser.add_argument("--ocrspace-port", type=int, default=8082)
+    parser.add_argument("--ocr-text", default=DEFAULT_OCR_TEXT, help="текст, который вернёт OCR.space")
+    parser.add_argument("--quiet", action="store_true", help="не печатать каждый запрос")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    telegram = start_telegram_stub(config, args.host, args.telegram_port, verbose=not args.quiet)
+    ocrspace = start_ocrspace_stub(config, args.host, args.ocrspace_port, verbose=not args.quiet)
+
+    print("=" * 60)
+    print("🧪 ЗАГЛУШКИ API ЗАПУЩЕНЫ")
+    print(f"Telegram:  TELEGRAM_API_URL={telegram.url}")
+    print(f"OCR.space: OCRSPACE_URL={ocrspace.url}/parse/image")
+    print(f"Задержка: {args.latency} c (+до {args.jitter} c), ошибки: {args.error_rate:.0%}, "
+          f"лимит: {args.rate_limit or 'нет'} запр/с")
+    print("Нажмите Ctrl+C, чтобы остановить.")
+    print("=" * 60)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\nTelegram: {telegram.snapshot()}")
+        print(f"OCR.space: {ocrspace.snapshot()}")
+        telegram.shutdown()
+        ocrspace.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Поиск элементов интерфейса на скриншоте по шаблону
+
+Нормированная взаимная корреляция (NCC) на NumPy:
+- числитель считается через БПФ, знаменатель — через интегральные изображения,
+  поэтому стоимость не зависит от размера шаблона;
+- поиск идёт от грубого к точному: сначала по уменьшенным копиям (пирамиде)
+  скриншота и шаблона, затем уточнение в небольшом окне в полном разрешении;
+- шаблон можно искать в нескольких масштабах (если интерфейс увеличен/уменьшен);
+- пирамиды шаблонов кэшируются, пирамида скриншота строится один раз
+  на все шаблоны пакетного поиска;
+- сначала проверяется окрестность последней найденной позиции,
+  и только если там шаблона нет — весь скриншот.
+
+Результат — словарь: {'name', 'x', 'y', 'width', 'height', 'center', 'score', 'scale'}.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+TemplateSource = Union[str, Path, "np.ndarray", object]  # путь, массив или PIL.Image
+
+# Шаблон на грубом уровне пирамиды должен оставаться не меньше такого размера
+MIN_COARSE_SIZE = 8
+
+
+def to_gray(image) -> np.ndarray:
+    """Перевести изображение (PIL.Image, путь или массив) в массив яркостей float64"""
+    if isinstance(image, np.ndarray):
+        array = image.astype(np.float64)
+        if array.ndim == 3:
+            array = array[..., :3] @ np.array([0.299, 0.587, 0.114])
+        return array
+    if isinstance(image, (str, Path)):
+        from PIL import Image
+        image = Image.open(image)
+    return np.asarray(image.convert("L"), dtype=np.float64)
+
+
+def _downsample(array: np.ndarray) -> np.ndarray:
+    """Уменьшить в 2 раза усреднением блоков 2x2"""
+    h, w = array.shape[0] // 2 * 2, array.shape[1] // 2 * 2
+    a = array[:h, :w]
+    return (a[0::2, 0::2] + a[1::2, 0::2] + a[0::2, 1::2] + a[1::2, 1::2]) * 0.25
+
+
+def _fast_len(n: int) -> int:
+    """Ближайший сверху размер вида 2^a * 3^b * 5^c (на таких размерах БПФ быстрее)"""
+    best = 1 << max(0, (n - 1).bit_length())
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            size = p35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+class _PreparedTemplate:
+    """Шаблон в одном масштабе на одном уровне пирамиды: центрированный и с нормой"""
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        self.h, self.w = array.shape
+        self.zero_mean = array - array.mean()
+        self.norm = float(np.sqrt((self.zero_mean ** 2).sum()))
+
+
+class _PreparedImage:
+    """
+    Изображение, в котором ищется шаблон: интегральные изображения и спектры
+    считаются один раз и переиспользуются для всех шаблонов и масштабов
+    """
+
+    def __init__(self, array: np.ndarray):
+        self.array = array
+        H, W = array.shape
+        self.integral = np.zeros((H + 1, W + 1))
+        self.integral[1:, 1:] = array.cumsum(0).cumsum(1)
+        self.integral_sq = np.zeros((H + 1, W + 1))
+        self.integral_sq[1:, 1:] = (array * array).cumsum(0).cumsum(1)
+        self._spectra: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def spectrum(self, size: Tuple[int, int]) -> np.ndarray:
+        spectrum = self._spectra.get(size)
+        if spectrum is None:
+            spectrum = self._spectra[size] = np.fft.rfft2(self.array, size)
+        return spectrum
+
+
+def match_template(image: Union[np.ndarray, _PreparedImage], template: _PreparedTemplate) -> np.ndarray:
+    """
+    Карта NCC для всех положений шаблона, целиком лежащих внутри изображения.
+
+    Returns:
+        Массив (H - h + 1, W - w + 1) со значениями от -1 до 1
+    """
+    if not isinstance(image, _PreparedImage):
+        image = _PreparedImage(image)
+    H, W = image.array.shape
+    h, w = template.h, template.w
+    if h > H or w > W or template.norm == 0:
+        return np.zeros((max(0, H - h + 1), max(0, W - w + 1)))
+
+    # Числитель: корреляция с центрированным шаблоном через БПФ
+    size = (_fast_len(H), _fast_len(W))
+    spectrum = image.spectrum(size) * np.conj(np.fft.rfft2(template.zero_mean, size))
+    numerator = np.fft.irfft2(spectrum, size)[:H - h + 1, :W - w + 1]
+
+    # Знаменатель: дисперсия окна изображения через интегральные изображения
+    def window_sum(s):
+        return s[h:, w:] - s[:-h, w:] - s[h:, :-w] + s[:-h, :-w]
+
+    sums = window_sum(image.integral)
+    variance = window_sum(image.integral_sq) - sums * sums / (h * w)
+    denominator = np.sqrt(np.maximum(variance, 0.0)) * template.norm
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(denominator > 1e-6 * template.norm, numerator / denominator, 0.0)
+    return np.clip(scores, -1.0, 1.0)
+
+
+class _TemplatePyramid:
+    """Кэш шаблона: масштабы и уровни пирамиды считаются по мере надобности"""
+
+    def __init__(self, gray: np.ndarray):
+        self.gray = gray
+        self._prepared: Dict[Tuple[float, int], _PreparedTemplate] = {}
+
+    def get(self, scale: float, level: int) -> _PreparedTemplate:
+        key = (scale, level)
+        prepared = self._prepared.get(key)
+        if prepared is None:
+            if level == 0:
+                array = self.gray
+                if scale != 1.0:
+                    from PIL import Image
+                    h, w = self.gray.shape
+                    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+                    resized = Image.fromarray(self.gray.astype(np.float32), mode="F").resize(size, Image.BILINEAR)
+                    array = np.asarray(resized, dtype=np.float64)
+            else:
+                array = _downsample(self.get(scale, level - 1).array)
+            prepared = self._prepared[key] = _PreparedTemplate(array)
+        return prepared
+
+
+class ScreenPyramid:
+    """Скриншот и его уменьшенные копии (строятся лениво, один раз на снимок)"""
+
+    def __init__(self, image, offset: Tuple[int, int] = (0, 0)):
+        """
+        Args:
+            image: Скриншот (PIL.Image или массив)
+            offset: Координаты левого верхнего угла скриншота на экране
+        """
+        self.image = image
+        self.levels: List[np.ndarray] = []
+        self.offset = offset
+        self._prepared: Dict[int, _PreparedImage] = {}
+
+    def level(self, n: int) -> np.ndarray:
+        if not self.levels:
+            self.levels.append(to_gray(self.image))
+        while len(self.levels) <= n:
+            self.levels.append(_downsample(self.levels[-1]))
+        return self.levels[n]
+
+    def prepared(self, n: int) -> _PreparedImage:
+        """Уровень пирамиды с кэшем интегральных изображений и спектров"""
+        prepared = self._prepared.get(n)
+        if prepared is None:
+            prepared = self._prepared[n] = _PreparedImage(self.level(n))
+        return prepared
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        if self.levels:
+            return self.levels[0].shape
+        if isinstance(self.image, np.ndarray):
+            return self.image.shape[:2]
+        return self.image.size[1], self.image.size[0]
+
+    def crop(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """
+        Фрагмент скриншота в полном разрешении; если весь скриншот ещё не переведён
+        в оттенки серого, переводится только фрагмент (поиск рядом с последней позицией)
+        """
+        if self.levels or isinstance(self.image, np.ndarray):
+            return self.level(0)[y0:y1, x0:x1]
+        return to_gray(self.image.crop((x0, y0, x1, y1)))
+
+
+class TemplateLocator:
+    """Поиск шаблонов на скриншотах с кэшем пирамид и последних позиций"""
+
+    def __init__(self, threshold: float = 0.8,
+                 scales: Sequence[float] = (1.0,),
+                 max_levels: int = 3,
+                 search_margin: int = 48,
+                 candidates: int = 3):
+        """
+        Args:
+            threshold: Минимальный NCC, при котором шаблон считается найденным
+            scales: Масштабы шаблона, в которых он ищется (например (0.8, 1.0, 1.25))
+            max_levels: Сколько раз можно уменьшать изображение в 2 раза при грубом поиске
+            search_margin: На сколько пикселей расширять окрестность последней позиции
+            candidates: Сколько лучших мест грубого поиска уточнять в полном разрешении
+        """
+        self.threshold = threshold
+        self.scales = tuple(scales)
+        self.max_levels = max_levels
+        self.search_margin = search_margin
+        self.candidates = candidates
+        self._templates: Dict[str, _TemplatePyramid] = {}
+        self._last: Dict[str, Dict] = {}
+
+    def _template(self, template: TemplateSource, name: str) -> _TemplatePyramid:
+        pyramid = self._templates.get(name)
+        if pyramid is None:
+            gray = to_gray(template)
+            if gray.std() == 0:
+                raise ValueError(f"Шаблон '{name}' однотонный — искать его корреляцией бессмысленно")
+            pyramid = self._templates[name] = _TemplatePyramid(gray)
+        return pyramid
+
+    @staticmethod
+    def _name(template: TemplateSource, name: Optional[str]) -> str:
+        if name is not None:
+            return name
+        if isinstance(template, (str, Path)):
+            return str(template)
+        return f"template-{id(template)}"
+
+    def _levels_for(self, prepared: _PreparedTemplate, screen_shape: Tuple[int, int]) -> int:
+        level = 0
+        h, w = prepared.h, prepared.w
+        H, W = screen_shape
+        # Уменьшаем, пока шаблон остаётся различимым, а экран — заметно больше шаблона
+        while (level < self.max_levels and min(h, w) >> (level + 1) >= MIN_COARSE_SIZE
+               and H * W > 16 * h * w):
+            level += 1
+        return level
+
+    def _refine(self, pyramid: ScreenPyramid, prepared: _PreparedTemplate,
+                x: int, y: int, radius: int) -> Tuple[float, int, int]:
+        """Уточнить положение в полном разрешении в окне ±radius"""
+        H, W = pyramid.shape
+        x0, y0 = max(0, x - radius), max(0, y - radius)
+        x1 = min(W, x + radius + prepared.w)
+        y1 = min(H, y + radius + prepared.h)
+        scores = match_template(pyramid.crop(x0, y0, x1, y1), prepared)
+        if scores.size == 0:
+            return -1.0, x, y
+        iy, ix = np.unravel_index(int(scores.argmax()), scores.shape)
+        return float(scores[iy, ix]), x0 + int(ix), y0 + int(iy)
+
+    def _search_scale(self, pyramid: ScreenPyramid, template: _TemplatePyramid,
+                      scale: float) -> Tuple[float, int, int, _PreparedTemplate]:
+        full = template.get(scale, 0)
+        screen_shape = pyramid.shape
+        if full.h > screen_shape[0] or full.w > screen_shape[1]:
+            return -1.0, 0, 0, full
+        level = self._levels_for(full, screen_shape)
+        if level == 0:
+            scores = match_template(pyramid.prepared(0), full)
+            iy, ix = np.unravel_index(int(scores.argmax()), scores.shape)
+            return float(scores[iy, ix]), int(ix), int(iy), full
+
+        coarse = match_template(pyramid.prepared(level), template.get(scale, level))
+        factor = 1 << level
+        best = (-1.0, 0, 0)
+        # Несколько лучших мест грубого поиска (с подавлением соседей)
+        flat = coarse.ravel()
+        order = np.argpartition(flat, -min(flat.size, self.candidates * 8))[-self.candidates * 8:]
+        taken: List[Tuple[int, int]] = []
+        for index in order[np.argsort(flat[order])[::-1]]:
+            cy, cx = divmod(int(index), coarse.shape[1])
+            if any(abs(cy - ty) <= 2 and abs(cx - tx) <= 2 for ty, tx in taken):
+                continue
+            taken.append((cy, cx))
+            found = self._refine(pyramid, full, cx * factor, cy * factor, factor + 2)
+            if found[0] > best[0]:
+                best = found
+            if len(taken) >= self.candidates:
+                break
+        return best[0], best[1], best[2], full
+
+    def _result(self, name: str, score: float, x: int, y: int,
+                prepared: _PreparedTemplate, scale: float, offset: Tuple[int, int]) -> Dict:
+        sx, sy = x + offset[0], y + offset[1]
+        return {
+            "name": name,
+            "x": sx,
+            "y": sy,
+            "width": prepared.w,
+            "height": prepared.h,
+            "center": (sx + prepared.w // 2, sy + prepared.h // 2),
+            "score": round(score, 4),
+            "scale": scale,
+        }
+
+    def locate_in(self, pyramid: ScreenPyramid, template: TemplateSource,
+                  name: Optional[str] = None, threshold: Optional[float] = None) -> Optional[Dict]:
+        """
+        Найти шаблон на уже построенной пирамиде скриншота.
+
+        Returns:
+            Словарь с координатами на экране или None, если совпадение хуже порога
+        """
+        name = self._name(template, name)
+        threshold = self.threshold if threshold is None else threshold
+        cached = self._template(template, name)
+        height, width = pyramid.shape
+
+        # Сначала — окрестность последней найденной позиции в том же масштабе
+        last = self._last.get(name)
+        if last is not None:
+            prepared = cached.get(last["scale"], 0)
+            lx, ly = last["x"] - pyramid.offset[0], last["y"] - pyramid.offset[1]
+            if 0 <= lx < width and 0 <= ly < height:
+                score, x, y = self._refine(pyramid, prepared, lx, ly, self.search_margin)
+                if score >= threshold:
+                    result = self._result(name, score, x, y, prepared, last["scale"], pyramid.offset)
+                    self._last[name] = result
+                    return result
+
+        best = None
+        for scale in self.scales:
+            score, x, y, prepared = self._search_scale(pyramid, cached, scale)
+            if best is None or score > best[0]:
+                best = (score, x, y, prepared, scale)
+        if best is None or best[0] < threshold:
+            return None
+        result = self._result(name, best[0], best[1], best[2], best[3], best[4], pyramid.offset)
+        self._last[name] = result
+        return result
+
+    def locate(self, screenshot, template: TemplateSource, name: Optional[str] = None,
+               offset: Tuple[int, int] = (0, 0), threshold: Optional[float] = None) -> Optional[Dict]:
+        """Найти один шаблон на скриншоте (PIL.Image или массив)"""
+        return self.locate_in(ScreenPyramid(screenshot, offset), template, name, threshold)
+
+    def locate_all(self, screenshot, templates: Dict[str, TemplateSource],
+                   offset: Tuple[int, int] = (0, 0),
+                   threshold: Optional[float] = None) -> Dict[str, Optional[Dict]]:
+        """Найти несколько шаблонов на одном скриншоте (пирамида скриншота строится один раз)"""
+        pyramid = ScreenPyramid(screenshot, offset)
+        return {name: self.locate_in(pyramid, template, name, threshold) for name, template in templates.items()}
+
+    def forget(self, name: Optional[str] = None) -> None:
+        """Сбросить последние позиции (все или одного шаблона)"""
+        if name is None:
+            self._last.clear()
+        else:
+            self._last.pop(name, None)
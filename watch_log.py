@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Журнал наблюдателя: уровни, структурированные записи, буферизованный вывод
+и живая строка состояния
+
+Раньше каждая итерация печатала весь массив строк таблицы и весь распознанный
+текст — с тысячами строк это заметная работа CPU и терминала и километры логов.
+WatchLog:
+
+- записи с уровнем (debug/info/warning/error), именем события и полями; ниже
+  порога (WATCHDOG_LOG_LEVEL, по умолчанию info) запись отбрасывается сразу —
+  дорогие сообщения передавайте функцией (`log.debug("ocr.text", lambda: ...)`),
+  тогда они даже не формируются;
+- вывод буферизуется и сбрасывается пачкой: по интервалу, при заполнении буфера,
+  при предупреждении или ошибке и при закрытии;
+- если задан WATCHDOG_LOG_FILE, те же записи пишутся туда в JSONL (все уровни
+  от порога, со всеми полями) — для разбора без парсинга текста;
+- status() обновляет одну строку состояния: в терминале она перерисовывается
+  на месте (\\r), а если вывод не в терминал — печатается обычной строкой
+  не чаще, чем раз в STATUS_EVERY секунд;
+- capture_prints() направляет в журнал обычные print() других модулей (очередь
+  Telegram, хранилище строк и т.д.), чтобы они не разрывали строку состояния:
+  строки с "⚠️" становятся предупреждениями, остальные — info.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Iterator, List, Optional, TextIO, Tuple, Union
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+LEVEL_ENV = "WATCHDOG_LOG_LEVEL"
+FILE_ENV = "WATCHDOG_LOG_FILE"
+
+# Как часто сбрасывать буфер (с) и сколько записей держать до сброса
+FLUSH_INTERVAL = 1.0
+BUFFER_LINES = 200
+
+# Строка состояния не в терминале — не чаще раза в столько секунд
+STATUS_EVERY = 60.0
+
+Message = Union[str, Callable[[], str]]
+
+
+class WatchLog:
+    """Журнал с уровнями, буфером и строкой состояния"""
+
+    def __init__(self, level: Optional[str] = None,
+                 stream: Optional[TextIO] = None,
+                 file: Optional[str] = None,
+                 live_status: Optional[bool] = None):
+        """
+        Args:
+            level: Порог вывода (debug/info/warning/error), по умолчанию из WATCHDOG_LOG_LEVEL или info
+            stream: Куда выводить (по умолчанию sys.stdout на момент записи)
+            file: Файл JSONL для структурированных записей (по умолчанию из WATCHDOG_LOG_FILE)
+            live_status: Перерисовывать строку состояния на месте (по умолчанию — если вывод в терминал)
+        """
+        level = (level or os.getenv(LEVEL_ENV) or "info").lower()
+        if level not in LEVELS:
+            raise ValueError(f"Неизвестный уровень журнала: {level} (возможны: {', '.join(LEVELS)})")
+        self.level = LEVELS[level]
+        self._stream = stream
+        self._live = live_status
+        self._lock = threading.RLock()
+        self._lines: List[str] = []
+        self._records: List[str] = []
+        self._last_flush = time.monotonic()
+        self._status = ""
+        self._status_shown = False
+        self._status_changed = False
+        self._status_printed_at = 0.0
+        file = file if file is not None else os.getenv(FILE_ENV)
+        self._file = open(file, "a", encoding="utf-8") if file else None
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream or sys.stdout
+
+    def _is_live(self) -> bool:
+        if self._live is not None:
+            return self._live
+        return bool(getattr(self.stream, "isatty", lambda: False)())
+
+    @property
+    def level_name(self) -> str:
+        return next(name for name, value in LEVELS.items() if value == self.level)
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS[level] >= self.level
+
+    # --- записи ---
+
+    def log(self, level: str, event: str, message: Message = "", **fields: Any) -> None:
+        """
+        Записать событие.
+
+        Args:
+            level: debug, info, warning или error
+            event: Имя события ("tick.new_rows", "alert.queued", ...)
+            message: Текст для человека или функция, которая его вернёт (вызывается,
+                     только если уровень проходит порог)
+            fields: Поля структурированной записи
+        """
+        if LEVELS[level] < self.level:
+            return
+        text = message() if callable(message) else message
+        with self._lock:
+            if text:
+                self._lines.append(text)
+            if self._file is not None:
+                record = {"ts": round(time.time(), 3), "level": level, "event": event}
+                if text:
+                    record["msg"] = text
+                record.update(fields)
+                self._records.append(json.dumps(record, ensure_ascii=False, default=str))
+            if (LEVELS[level] >= LEVELS["warning"] or len(self._lines) >= BUFFER_LINES
+                    or time.monotonic() - self._last_flush >= FLUSH_INTERVAL):
+                self.flush()
+
+    def debug(self, event: str, message: Message = "", **fields: Any) -> None:
+        self.log("debug", event, message, **fields)
+
+    def info(self, event: str, message: Message = "", **fields: Any) -> None:
+        self.log("info", event, message, **fields)
+
+    def warning(self, event: str, message: Message = "", **fields: Any) -> None:
+        self.log("warning", event, message, **fields)
+
+    def error(self, event: str, message: Message = "", **fields: Any) -> None:
+        self.log("error", event, message, **fields)
+
+    # --- строка состояния ---
+
+    def status(self, line: str) -> None:
+        """Обновить строку состояния (и заодно сбросить буфер)"""
+        with self._lock:
+            self._status_changed = line != self._status
+            self._status = line
+            if not self._is_live() and time.monotonic() - self._status_printed_at >= STATUS_EVERY:
+                self._lines.append(line)
+                self._status_printed_at = time.monotonic()
+            self.flush()
+
+    # --- вывод ---
+
+    def flush(self) -> None:
+        with self._lock:
+            stream = self.stream
+            live = self._is_live()
+            if self._lines or (live and self._status_changed):
+                parts = []
+                if live and self._status_shown:
+                    parts.append("\r\x1b[K")  # стираем строку состояния, пишем записи, рисуем её заново
+                if self._lines:
+                    parts.append("\n".join(self._lines) + "\n")
+                if live and self._status:
+                    parts.append(self._status)
+                    self._status_shown = True
+                stream.write("".join(parts))
+                stream.flush()
+                self._lines = []
+                self._status_changed = False
+            if self._records:
+                self._file.write("\n".join(self._records) + "\n")
+                self._file.flush()
+                self._records = []
+            self._last_flush = time.monotonic()
+
+    @contextlib.contextmanager
+    def capture_prints(self) -> Iterator[None]:
+        """Внутри блока print() пишет в журнал (событие "print"), а не прямо в sys.stdout"""
+        original = sys.stdout
+        own_stream = self._stream is None
+        if own_stream:
+            self._stream = original
+        sys.stdout = _PrintCatcher(self)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stdout = original
+            if own_stream:
+                self.flush()
+                self._stream = None
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            if self._is_live() and self._status_shown:
+                self.stream.write("\n")
+                self.stream.flush()
+                self._status_shown = False
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _PrintCatcher:
+    """Файлоподобный объект для sys.stdout: полные строки print() уходят в журнал"""
+
+    def __init__(self, log: WatchLog):
+        self._log = log
+        self._partial = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            *lines, self._partial = (self._partial + text).split("\n")
+        for line in lines:
+            if line.strip():
+                self._log.log("warning" if line.lstrip().startswith("⚠️") else "info", "print", line)
+        return len(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            line, self._partial = self._partial, ""
+        if line.strip():
+            self._log.info("print", line)
+
+    def isatty(self) -> bool:
+        return False
+
+
+_default: Optional[WatchLog] = None
+_default_lock = threading.Lock()
+
+
+def get_log() -> WatchLog:
+    """Общий журнал процесса (настройки — из переменных окружения при первом обращении)"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = WatchLog()
+            atexit.register(_default.flush)  # недописанный буфер не теряется при выходе
+        return _default
+
+
+class RateMeter:
+    """Скорость событий (например, новых строк в секунду) за скользящее окно"""
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._started = time.monotonic()
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._total = 0
+
+    def add(self, count: int) -> None:
+        now = time.monotonic()
+        self._events.append((now, count))
+        self._total += count
+        self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._events and self._events[0][0] < now - self.window:
+            self._total -= self._events.popleft()[1]
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        self._trim(now)
+        # В первую минуту окно — время с запуска, иначе скорость была бы занижена
+        return self._total / max(1.0, min(self.window, now - self._started))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Координатор наблюдателей: запускает по одному процессу `mouse_watchdog.py`
+на каждый дисплей (DISPLAY, например виртуальные Xvfb :1, :2, ...).
+
+Все воркеры пишут в одно общее хранилище SQLite (WAL), поэтому строки
+не теряются и не дублируются, а оповещение по строке уходит ровно один раз,
+даже если её одновременно распознали несколько воркеров.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from row_store import STORE_ENV, WORKER_ENV, JsonRowStore, SqliteRowStore
+
+PROJECT_DIR = Path(__file__).resolve().parent
+WATCHDOG_SCRIPT = PROJECT_DIR / "mouse_watchdog.py"
+TABLE_ROWS_FILE = PROJECT_DIR / "table_rows.json"
+
+
+def _import_legacy_rows(db_path: Path) -> None:
+    """Перенести строки из table_rows.json в новую базу (только если база пустая)"""
+    store = SqliteRowStore(db_path)
+    try:
+        if len(store) == 0 and TABLE_ROWS_FILE.exists():
+            legacy = JsonRowStore(TABLE_ROWS_FILE)
+            imported = store.add_new(list(legacy))
+            print(f"Импортировано {len(imported)} строк из {TABLE_ROWS_FILE} в {db_path}.")
+    finally:
+        store.close()
+
+
+def _start_worker(display: str, db_path: Path, watchdog_args: List[str]) -> subprocess.Popen:
+    """Запустить один воркер наблюдателя на указанном дисплее"""
+    env = os.environ.copy()
+    env["DISPLAY"] = display
+    env[STORE_ENV] = f"sqlite:{db_path}"
+    env[WORKER_ENV] = "display" + display.replace(":", "").replace(".", "_")
+    print(f"▶️  Запускаю воркер на DISPLAY={display}")
+    return subprocess.Popen([sys.executable, str(WATCHDOG_SCRIPT), *watchdog_args], env=env)
+
+
+def run_coordinator(displays: List[str],
+                    db_path: Path,
+                    interval_seconds: float = 10.0,
+                    move_radius: int = 50,
+                    regions_file: Optional[str] = None,
+                    restart_delay: float = 5.0) -> None:
+    """
+    Запустить воркеры и следить за ними, перезапуская упавшие.
+
+    Args:
+        displays: Список дисплеев (значения DISPLAY), по одному воркеру на дисплей
+        db_path: Путь к общей базе SQLite
+        interval_seconds: Интервал наблюдателя, в секундах
+        move_radius: Радиус движения мыши, в пикселях
+        regions_file: JSON-файл с областями (передаётся каждому воркеру)
+        restart_delay: Пауза перед перезапуском упавшего воркера, в секундах
+    """
+    if len(set(displays)) != len(displays):
+        raise ValueError(f"Дисплеи не должны повторяться: {displays}")
+
+    _import_legacy_rows(db_path)
+
+    watchdog_args = [str(interval_seconds), str(move_radius)]
+    if regions_file:
+        watchdog_args.append(regions_file)
+
+    print("=" * 60)
+    print("🧭 КООРДИНАТОР НАБЛЮДАТЕЛЕЙ ЗАПУЩЕН")
+    print(f"Дисплеи: {', '.join(displays)}")
+    print(f"Общее хранилище: {db_path}")
+    print("Нажмите Ctrl+C, чтобы остановить все воркеры.")
+    print("=" * 60)
+
+    workers: Dict[str, subprocess.Popen] = {
+        display: _start_worker(display, db_path, watchdog_args) for display in displays
+    }
+    restart_at: Dict[str, float] = {}
+
+    try:
+        while True:
+            time.sleep(1.0)
+            now = time.monotonic()
+            for display, proc in workers.items():
+                if proc.poll() is None:
+                    continue
+                if display not in restart_at:
+                    print(f"⚠️  Воркер DISPLAY={display} завершился с кодом {proc.returncode}, "
+                          f"перезапуск через {restart_delay} c")
+                    restart_at[display] = now + restart_delay
+                elif now >= restart_at[display]:
+                    del restart_at[display]
+                    workers[display] = _start_worker(display, db_path, watchdog_args)
+    except KeyboardInterrupt:
+        print("\n🛑 Останавливаю воркеры...")
+    finally:
+        for proc in workers.values():
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in workers.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        print("Выход.")
+
+
+def main():
+    """
+    Запуск из командной строки.
+
+    Примеры:
+        python watchdog_coordinator.py :1 :2 :3
+        python watchdog_coordinator.py :1 :2 --db rows.db --interval 5 --regions regions.json
+    """
+    parser = argparse.ArgumentParser(description="Запуск наблюдателей на нескольких дисплеях с общим хранилищем")
+    parser.add_argument("displays", nargs="+", help="значения DISPLAY, например :1 :2")
+    parser.add_argument("--db", default=str(PROJECT_DIR / "table_rows.db"),
+                        help="путь к общей базе SQLite (по умолчанию table_rows.db рядом со скриптом)")
+    parser.add_argument("--interval", type=float, default=10.0, help="интервал наблюдателя, c")
+    parser.add_argument("--radius", type=int, default=50, help="радиус движения мыши, px")
+    parser.add_argument("--regions", default=None, help="JSON-файл с областями")
+    args = parser.parse_args()
+
+    run_coordinator(args.displays, Path(args.db), args.interval, args.radius, args.regions)
+
+
+if __name__ == "__main__":
+    main()